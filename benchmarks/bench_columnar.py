@@ -0,0 +1,55 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from questradeapi import Session
+from questradeapi.columnar import convert_candles
+
+from memory import retained
+
+CANDLES = 1000000
+
+@pytest.fixture(scope='module')
+def payload():
+    '''Response body of a million one-minute candlesticks.'''
+    start = datetime(2018, 1, 1, tzinfo=timezone.utc)
+    minute = timedelta(minutes=1)
+    candles = []
+    for i in range(CANDLES):
+        price = 100 + i % 1000 / 100
+        candles.append({
+            'start': (start + i * minute).isoformat(),
+            'end': (start + (i + 1) * minute).isoformat(),
+            'low': price - 0.05, 'high': price + 0.05,
+            'open': price, 'close': price + 0.01,
+            'volume': 1000 + i % 100, 'VWAP': price
+        })
+    return json.dumps({'candles': candles}).encode('utf-8')
+
+def _dicts(decode, payload):
+    return decode(payload)['candles']
+
+def _columns(decode, payload):
+    return convert_candles(decode(payload)['candles'], 'numpy')
+
+@pytest.mark.benchmark(group='candles-1M')
+@pytest.mark.parametrize('representation', ['dicts', 'numpy'])
+def test_decode_candles(benchmark, payload, representation):
+    decode = Session('', rate_limiter=False).json_decoder
+    func = _dicts if representation == 'dicts' else _columns
+    benchmark.pedantic(func, (decode, payload), rounds=3)
+
+def test_candles_memory(payload):
+    decode = Session('', rate_limiter=False).json_decoder
+    candles, dicts = retained(_dicts, decode, payload)
+    del candles
+    columns, arrays = retained(_columns, decode, payload)
+    assert len(columns['close']) == CANDLES
+    print('\nbytes per candle: dicts {:.0f}, numpy {:.0f}'.format(
+        dicts / CANDLES, arrays / CANDLES))
+    # Eight 8-byte columns against a dict with eight keys and two strings.
+    assert arrays / CANDLES == pytest.approx(64, rel=0.01)
+    assert dicts > 10 * arrays
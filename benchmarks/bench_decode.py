@@ -0,0 +1,52 @@
+import json
+
+import pytest
+import requests
+
+from questradeapi.replay import RecordingTransport
+
+from memory import retained
+from workloads import SYMBOL
+
+def _response_json(content):
+    '''Decodes a body as sessions did before, with requests.'''
+    response = requests.models.Response()
+    response._content = content
+    return response.json()
+
+def _decoders():
+    decoders = [('response.json', _response_json), ('json', json.loads)]
+    try:
+        import orjson
+    except ImportError:
+        pass
+    else:
+        decoders.append(('orjson', orjson.loads))
+    return decoders
+
+DECODERS = _decoders()
+
+@pytest.fixture(scope='module')
+def payloads(simulator):
+    '''Bodies of large responses, recorded from the simulator.'''
+    transport = RecordingTransport()
+    session = simulator.session(transport=transport, rate_limiter=False)
+    # A single request for the 1,000 symbols, rather than chunks.
+    session.MAX_IDS_LENGTH = 10 ** 6
+    session.get_quotes(ids=list(range(1, 1001)))
+    session.get_option_chain(SYMBOL)
+    session.close()
+    bodies = [interaction['body'].encode('utf-8')
+        for interaction in transport.interactions[1:]]
+    return dict(zip(['quotes_1000', 'option_chain'], bodies))
+
+@pytest.mark.benchmark(group='decode')
+@pytest.mark.parametrize('decoder', [name for name, _ in DECODERS])
+@pytest.mark.parametrize('payload', ['quotes_1000', 'option_chain'])
+def test_decode(benchmark, payloads, payload, decoder):
+    decode = dict(DECODERS)[decoder]
+    content = payloads[payload]
+    _, size = retained(decode, content)
+    benchmark.extra_info['bytes'] = len(content)
+    benchmark.extra_info['decoded_bytes'] = size
+    benchmark(decode, content)
@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from questradeapi.greeks import black_scholes, implied_volatility
+
+CONTRACTS = 2000
+
+@pytest.fixture(scope='module')
+def chain():
+    '''Prices of a synthetic chain: 50 expiries of 20 strikes, calls and
+    puts.'''
+    strike = np.tile(np.repeat(np.linspace(80, 120, 20), 2), 50)
+    option_type = np.tile(['Call', 'Put'], CONTRACTS // 2)
+    t = np.repeat(np.linspace(0.05, 2, 50), 40)
+    volatility = 0.25 + 0.4 * ((strike - 100) / 100) ** 2
+    prices = black_scholes(100, strike, t, volatility, option_type,
+        0.02)['value']
+    return prices, strike, t, option_type
+
+def _greeks(prices, strike, t, option_type):
+    volatility = implied_volatility(prices, 100, strike, t, option_type, 0.02)
+    return black_scholes(100, strike, t, volatility, option_type, 0.02)
+
+@pytest.mark.benchmark(group='greeks')
+def test_vectorized(benchmark, chain):
+    greeks = benchmark(_greeks, *chain)
+    assert not np.isnan(greeks['delta']).any()
+
+@pytest.mark.benchmark(group='greeks')
+def test_scalar(benchmark, chain):
+    contracts = list(zip(*[array.tolist() for array in chain]))
+
+    def scalar():
+        return [_greeks(*contract) for contract in contracts]
+
+    benchmark.pedantic(scalar, rounds=3)
+
+@pytest.mark.benchmark(group='greeks')
+def test_vectorized_large_chain(benchmark, chain):
+    # Tens of thousands of contracts, as for the chains of many underlyings.
+    large = [np.tile(array, 20) for array in chain]
+    benchmark(_greeks, *large)
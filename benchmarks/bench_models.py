@@ -0,0 +1,59 @@
+import json
+import sys
+
+import pytest
+
+from questradeapi import Session
+from questradeapi.models import Quote
+
+from memory import retained
+
+QUOTES = 100000
+
+@pytest.fixture(scope='module')
+def payload():
+    '''Response body of 100,000 quotes.'''
+    quotes = []
+    for i in range(QUOTES):
+        price = 100 + i % 1000 / 100
+        quotes.append({
+            'symbol': 'SYM{}'.format(i), 'symbolId': i, 'tier': '',
+            'bidPrice': price - 0.01, 'bidSize': 100,
+            'askPrice': price + 0.01, 'askSize': 100,
+            'lastTradePriceTrHrs': price, 'lastTradePrice': price,
+            'lastTradeSize': 100, 'lastTradeTick': 'Equal',
+            'lastTradeTime': '2018-06-01T15:59:59.000000-04:00',
+            'volume': 1000000 + i, 'openPrice': price, 'highPrice': price,
+            'lowPrice': price, 'delay': 0, 'isHalted': False,
+            'high52w': price * 1.2, 'low52w': price * 0.8, 'VWAP': price
+        })
+    return json.dumps({'quotes': quotes}).encode('utf-8')
+
+def _dicts(decode, payload):
+    return decode(payload)['quotes']
+
+def _models(decode, payload):
+    return Quote.from_list(decode(payload)['quotes'])
+
+@pytest.mark.benchmark(group='quotes-100k')
+@pytest.mark.parametrize('representation', ['dicts', 'models'])
+def test_decode_quotes(benchmark, payload, representation):
+    decode = Session('', rate_limiter=False).json_decoder
+    func = _dicts if representation == 'dicts' else _models
+    benchmark.pedantic(func, (decode, payload), rounds=5)
+
+def test_quotes_memory(payload):
+    decode = Session('', rate_limiter=False).json_decoder
+    quotes, dicts = retained(_dicts, decode, payload)
+    del quotes
+    quotes, models = retained(_models, decode, payload)
+    assert len(quotes) == QUOTES
+    assert not hasattr(quotes[0], '__dict__')
+    print('\nbytes per quote: dicts {:.0f}, models {:.0f}'.format(
+        dicts / QUOTES, models / QUOTES))
+    # Both hold the same values, so the models save the size of a decoded
+    # dictionary less that of their slots.
+    record = _dicts(decode, payload)[0]
+    saving = sys.getsizeof(record) - sys.getsizeof(quotes[0])
+    assert dicts - models == pytest.approx(saving * QUOTES, rel=0.01)
+    assert models < dicts / 2
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from questradeapi import QuoteBoard
+
+SYMBOLS = 500
+
+def _quotes(price):
+    return [{
+        'symbol': 'SYM{}'.format(id), 'symbolId': id, 'bidPrice': price,
+        'bidSize': 100, 'askPrice': price + 0.01, 'askSize': 100,
+        'lastTradePriceTrHrs': price, 'lastTradePrice': price,
+        'lastTradeSize': 100, 'lastTradeTime': '2019-01-02T14:30:00+00:00',
+        'volume': 1000, 'openPrice': price, 'highPrice': price,
+        'lowPrice': price, 'VWAP': price, 'delay': 0, 'isHalted': False
+    } for id in range(1, SYMBOLS + 1)]
+
+@pytest.fixture
+def board(tmp_path):
+    board = QuoteBoard.create(str(tmp_path / 'quotes'), capacity=SYMBOLS)
+    board.publish(_quotes(10.0))
+    reader = QuoteBoard(board.path)
+    yield board, reader
+    reader.close()
+    board.close()
+
+@pytest.mark.benchmark(group='quoteboard-read')
+def test_read_quote(benchmark, board):
+    _, reader = board
+    benchmark(reader.get, 250)
+
+@pytest.mark.benchmark(group='quoteboard-read')
+def test_read_all_quotes(benchmark, board):
+    _, reader = board
+    benchmark(reader.get_quotes)
+
+@pytest.mark.benchmark(group='quoteboard-read')
+def test_read_quote_while_written(benchmark, board):
+    # Reads retried because they overlap a write of the same slot.
+    writer, reader = board
+    stopped = threading.Event()
+    quotes = _quotes(11.0)[249:250]
+
+    def write():
+        while not stopped.is_set():
+            writer.publish(quotes)
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        benchmark(reader.get, 250)
+    finally:
+        stopped.set()
+        thread.join()
+
+@pytest.mark.benchmark(group='quoteboard-write')
+def test_publish_quotes(benchmark, board):
+    writer, _ = board
+    quotes = _quotes(11.0)
+    benchmark(writer.publish, quotes)
@@ -0,0 +1,22 @@
+import pytest
+
+from questradeapi.simulator import Simulator
+
+@pytest.fixture(scope='module')
+def remote():
+    '''Simulator answering after a delay, as a remote server does.'''
+    with Simulator(rate_limits=None, latency=0.02, latency_sigma=0,
+        symbols=5000, seed=0) as simulator:
+        yield simulator
+
+@pytest.mark.benchmark(group='quote-refresh')
+@pytest.mark.parametrize('workers', [1, 4])
+@pytest.mark.parametrize('symbols', [100, 1000, 5000])
+def test_quote_refresh(benchmark, remote, symbols, workers):
+    session = remote.session(rate_limiter=False, max_workers=workers)
+    ids = list(range(1, symbols + 1))
+    try:
+        response = benchmark(session.get_quotes, ids=ids)
+    finally:
+        session.close()
+    assert len(response['quotes']) == symbols
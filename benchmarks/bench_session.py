@@ -0,0 +1,11 @@
+import pytest
+
+from workloads import CALLS, WORKFLOWS
+
+@pytest.mark.parametrize('name', list(CALLS))
+def test_call(benchmark, session, name):
+    benchmark(CALLS[name], session)
+
+@pytest.mark.parametrize('name', list(WORKFLOWS))
+def test_workflow(benchmark, session, name):
+    benchmark(WORKFLOWS[name], session)
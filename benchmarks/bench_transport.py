@@ -0,0 +1,25 @@
+import pytest
+import requests
+
+class ConnectionPerCall():
+    ''' Transport opening a new connection for every request, as sessions did
+    before they pooled their connections.'''
+
+    def request(self, method, url, **kwargs):
+        return requests.request(method, url, **kwargs)
+
+    def close(self):
+        pass
+
+@pytest.mark.benchmark(group='transport')
+@pytest.mark.parametrize('transport', ['pooled', 'connection_per_call'])
+def test_call_latency(benchmark, simulator, transport):
+    kwargs = {'rate_limiter': False}
+    if transport == 'connection_per_call':
+        kwargs['transport'] = ConnectionPerCall()
+    session = simulator.session(**kwargs)
+    session.get_time()
+    try:
+        benchmark(session.get_time)
+    finally:
+        session.close()
@@ -0,0 +1,52 @@
+'''
+Fixtures of the benchmarks.
+
+The session benchmarks replay traffic recorded against a local
+:obj:`questradeapi.simulator.Simulator`, so that they measure the client alone
+and run offline. The others measure local computations. The benchmarks
+require pytest-benchmark::
+
+    python -m pytest benchmarks
+
+Pass ``--latency`` to replay the responses with a delay, e.g. to measure the
+concurrency of the bulk workflows.
+'''
+
+import pytest
+
+from questradeapi import Session
+from questradeapi.replay import RecordingTransport, ReplayTransport
+from questradeapi.simulator import Simulator
+
+from workloads import CALLS, WORKFLOWS
+
+def pytest_addoption(parser):
+    parser.addoption('--latency', type=float, default=0.0,
+        help='number of seconds replayed responses are delayed by')
+
+@pytest.fixture(scope='session')
+def cassette():
+    '''Interactions of every workload, recorded against a simulator.'''
+    transport = RecordingTransport()
+    with Simulator(rate_limits=None, seed=0) as simulator:
+        session = simulator.session(transport=transport, rate_limiter=False)
+        for workload in list(CALLS.values()) + list(WORKFLOWS.values()):
+            workload(session)
+        session.close()
+    return transport.interactions
+
+@pytest.fixture(scope='session')
+def simulator():
+    '''Simulator without rate limits, for the benchmarks sending requests.'''
+    with Simulator(rate_limits=None, seed=0) as simulator:
+        yield simulator
+
+@pytest.fixture
+def session(cassette, request):
+    '''Logged in session replaying the recorded interactions.'''
+    latency = request.config.getoption('--latency')
+    session = Session('refresh token', transport=ReplayTransport(
+        cassette, latency=latency), rate_limiter=False)
+    session.get_time()
+    yield session
+    session.close()
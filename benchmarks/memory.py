@@ -0,0 +1,27 @@
+'''
+Measurement of the memory held by the results of the benchmarked functions.
+'''
+
+import gc
+import tracemalloc
+
+def retained(func, *args, **kwargs):
+    '''Calls a function and measures the memory held by its result.
+
+    Returns
+    -------
+    :obj:`tuple`
+        Result of the call, and number of bytes allocated by the call and
+        still in use once it returned.
+
+    '''
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func(*args, **kwargs)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return result, size
@@ -0,0 +1,124 @@
+'''
+Workloads of the benchmarks.
+
+Each workload is a function calling a session. The workloads are first run
+against a :obj:`questradeapi.simulator.Simulator` to record their traffic,
+then against the recording to measure them.
+'''
+
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from questradeapi import AccountSnapshot, OptionChainIndex, OrderBatch
+from questradeapi.utils import (create_bracket_order_component,
+    create_insert_order_leg_data, create_option_id_filter,
+    create_strategy_variant_leg, create_strategy_variant_request)
+
+# Accounts and symbols of a simulator with the default settings.
+ACCOUNT = '10000000'
+OTHER_ACCOUNT = '10000001'
+SYMBOL = 8
+SYMBOLS = list(range(1, 101))
+# Enough symbols for their ids to be split in several requests.
+MANY_SYMBOLS = list(range(1, 3001))
+OPTIONS = [100001, 100002, 100003, 100004]
+
+# Requests must be identical when recorded and replayed, so times are fixed.
+END = datetime(2018, 6, 1, tzinfo=timezone.utc)
+START = END - timedelta(days=1)
+
+ORDER = dict(account_id=ACCOUNT, symbol_id=SYMBOL, quantity=10,
+    iceberg_quantity=None, limit_price=50.5, stop_price=None,
+    all_or_none=False, anonymous=False, order_type='Limit',
+    time_in_force='Day', action='Buy', primary_route='AUTO',
+    secondary_route='AUTO')
+COMPONENTS = [
+    create_bracket_order_component(10, 'Buy', 50.5, None, 'Limit', 'Day',
+        'Primary'),
+    create_bracket_order_component(10, 'Sell', 55, None, 'Limit',
+        'GoodTillCanceled', 'Profit'),
+]
+BRACKET = dict(account_id=ACCOUNT, symbol_id=SYMBOL, primary_route='AUTO',
+    secondary_route='AUTO', components=COMPONENTS)
+ORDER_LEGS = [
+    create_insert_order_leg_data(OPTIONS[0], 'Buy', 1),
+    create_insert_order_leg_data(OPTIONS[2], 'Sell', 1),
+]
+STRATEGY = dict(account_id=ACCOUNT, symbol_id=SYMBOL, limit_price=1.5,
+    order_type='Limit', time_in_force='Day', primary_route='AUTO',
+    secondary_route='AUTO', legs=ORDER_LEGS, strategy='VerticalCallSpread')
+VARIANTS = [
+    create_strategy_variant_request(1, 'VerticalCallSpread', [
+        create_strategy_variant_leg(OPTIONS[0], 'Buy', 1),
+        create_strategy_variant_leg(OPTIONS[2], 'Sell', 1),
+    ]),
+]
+
+def _place_and_cancel(session, spec):
+    response = session.post_order(**spec)
+    session.delete_order(spec['account_id'], response['orderId'])
+
+def _order_batch(session):
+    # Orders distinct from those of CALLS, so that the recorded responses
+    # list the order ids they cancel.
+    specs = [dict(ORDER, quantity=q) for q in range(100, 120)]
+    specs.append(dict(BRACKET, type='bracket', symbol_id=SYMBOL + 1))
+    batch = OrderBatch(session, specs)
+    batch.submit(check_impact=True)
+    batch.cancel()
+
+def _account_snapshot(session):
+    # Another account than the one the orders are placed in, so that every
+    # refresh sends the same requests.
+    snapshot = AccountSnapshot(session, [OTHER_ACCOUNT])
+    snapshot.refresh()
+    snapshot.refresh()
+
+def _option_chain_quotes(session):
+    index = OptionChainIndex.from_session(session, SYMBOL)
+    index.quote(index.select())
+
+def _histories(session):
+    start = END - timedelta(days=90)
+    list(session.iter_executions_history(ACCOUNT, start, END))
+    list(session.iter_orders_history(OTHER_ACCOUNT, start, END))
+    list(session.iter_activities_history(ACCOUNT, start, END))
+
+# One workload per API call of the session.
+CALLS = OrderedDict([
+    ('get_time', lambda s: s.get_time()),
+    ('get_accounts', lambda s: s.get_accounts()),
+    ('get_positions', lambda s: s.get_positions(ACCOUNT)),
+    ('get_balances', lambda s: s.get_balances(ACCOUNT)),
+    ('get_executions', lambda s: s.get_executions(ACCOUNT, START, END)),
+    ('get_orders', lambda s: s.get_orders(OTHER_ACCOUNT)),
+    ('get_activities', lambda s: s.get_activities(ACCOUNT, START, END)),
+    ('get_symbols', lambda s: s.get_symbols(ids=SYMBOLS[:10])),
+    ('get_symbols_search', lambda s: s.get_symbols_search('SYM1')),
+    ('get_option_chain', lambda s: s.get_option_chain(SYMBOL)),
+    ('get_markets', lambda s: s.get_markets()),
+    ('get_quotes', lambda s: s.get_quotes(id=SYMBOL)),
+    ('get_quotes_options', lambda s: s.get_quotes_options(ids=OPTIONS)),
+    ('get_quotes_options_filters', lambda s: s.get_quotes_options(
+        filters=[create_option_id_filter('Call', SYMBOL, None, None, None)])),
+    ('get_quotes_strategies', lambda s: s.get_quotes_strategies(VARIANTS)),
+    ('get_candles', lambda s: s.get_candles(SYMBOL, START, END, 'OneHour')),
+    ('post_order_impact', lambda s: s.post_order(impact=True, **ORDER)),
+    ('post_order_and_delete_order',
+        lambda s: _place_and_cancel(s, ORDER)),
+    ('post_bracket_order', lambda s: s.post_bracket_order(**BRACKET)),
+    ('post_multi_leg_strategy_order',
+        lambda s: s.post_multi_leg_strategy_order(**STRATEGY)),
+])
+
+# Workflows sending many requests.
+WORKFLOWS = OrderedDict([
+    ('refresh_access_token', lambda s: s.refresh_access_token()),
+    ('get_quotes_chunked', lambda s: s.get_quotes(ids=MANY_SYMBOLS)),
+    ('get_candles_range', lambda s: list(s.get_candles_range(SYMBOL,
+        END - timedelta(days=7), END, 'OneMinute'))),
+    ('history_windows', _histories),
+    ('order_batch', _order_batch),
+    ('account_snapshot', _account_snapshot),
+    ('option_chain_quotes', _option_chain_quotes),
+])
@@ -5,3 +5,12 @@ TODO: Add documentation here!
 '''
 
 from .session import Session
+from .asyncsession import AsyncSession
+from .exceptions import CircuitOpenError, QuestradeAPIError
+from .impact import ImpactEstimator
+from .options import OptionChainIndex
+from .orders import OrderBatch
+from .quoteboard import QuoteBoard, QuotePublisher
+from .snapshot import AccountSnapshot
+from .store import CandleStore
+from .stream import OrderEventStream, QuoteStream
@@ -0,0 +1,140 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .session import Session
+
+class AsyncSession():
+    ''' An asyncio flavour of :obj:`Session`.
+
+    Every public API call of :obj:`Session` is mirrored by a coroutine of the
+    same name and signature. Calls are dispatched to a pool of worker threads
+    sharing the pooled connections of a single underlying :obj:`Session`, so
+    many calls can be in flight at once without blocking the event loop.
+
+    Attributes
+    ----------
+    session : :obj:`Session`
+        Underlying session performing the requests.
+    executor : :obj:`concurrent.futures.ThreadPoolExecutor`
+        Worker threads the requests are dispatched to.
+
+    '''
+
+    def __init__(self, refresh_token, max_workers=10, **kwargs):
+        '''Constructor.
+
+        Parameters
+        ----------
+        refresh_token : :obj:`str`
+            Initial refresh token used to get an access token.
+        max_workers : :obj:`int`, optional
+            Maximum number of requests in flight at once. Also used as the
+            connection pool size of the underlying session.
+        **kwargs
+            Additional keyword arguments passed to :obj:`Session`.
+
+        '''
+        kwargs.setdefault('pool_size', max_workers)
+        self.session = Session(refresh_token, **kwargs)
+        self.executor = ThreadPoolExecutor(max_workers)
+
+    def _run(self, func, *args, **kwargs):
+        '''Runs a blocking call in the executor.
+
+        Returns
+        -------
+        :obj:`asyncio.Future`
+            Future resolved with the result of the call.
+
+        '''
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(
+            self.executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    def close(self):
+        '''Stops the worker threads and closes the underlying session.'''
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        # Waiting for the worker threads blocks, so it must not be done on
+        # the event loop nor on the executor it waits for.
+        await asyncio.get_event_loop().run_in_executor(None, self.close)
+
+    async def gather_accounts(self, method, ids, concurrency=10, **kwargs):
+        '''Calls an account method for many accounts concurrently.
+
+        Parameters
+        ----------
+        method : :obj:`str` or coroutine function
+            Name of the method to call (e.g. ``'get_positions'``) or the
+            coroutine function itself.
+        ids : :obj:`list` of :obj:`str`
+            Account numbers.
+        concurrency : :obj:`int`, optional
+            Maximum number of calls in flight at once. Calls are run by the
+            worker threads of :attr:`executor`, so no more than its
+            `max_workers` are ever in flight, whatever `concurrency`.
+        **kwargs
+            Additional keyword arguments passed to each call.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`dict`
+            Responses, in the same order as `ids`.
+
+        '''
+        if isinstance(method, str):
+            method = getattr(self, method)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(id):
+            async with semaphore:
+                return await method(id, **kwargs)
+
+        return await asyncio.gather(*(call(id) for id in ids))
+
+def _mirror(name):
+    '''Creates a coroutine method delegating to the :obj:`Session` method of
+    the given name.'''
+    method = getattr(Session, name)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await self._run(getattr(self.session, name), *args, **kwargs)
+
+    return wrapper
+
+_MIRRORED_METHODS = (
+    'do_get',
+    'do_post',
+    'do_delete',
+    'get_time',
+    'get_accounts',
+    'get_positions',
+    'get_balances',
+    'get_executions',
+    'get_orders',
+    'get_activities',
+    'get_symbols',
+    'get_symbols_search',
+    'get_option_chain',
+    'get_markets',
+    'get_quotes',
+    'get_quotes_options',
+    'get_quotes_strategies',
+    'get_candles',
+    'post_order',
+    'delete_order',
+    'post_bracket_order',
+    'post_multi_leg_strategy_order',
+)
+
+for _name in _MIRRORED_METHODS:
+    setattr(AsyncSession, _name, _mirror(_name))
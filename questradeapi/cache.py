@@ -0,0 +1,233 @@
+import copy
+import shelve
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache():
+    ''' Cache of API responses for reference data that rarely changes, such as
+    symbols, markets and option chains.
+
+    Entries expire after a time-to-live depending on the endpoint they were
+    retrieved from, and the least recently used entries are evicted once the
+    cache is full. Entries can optionally be backed by a file so that they
+    survive a restart; the file holds the same entries as the memory, so its
+    size is bounded by `maxsize` too.
+
+    Values are copied when they are added and looked up, so callers may modify
+    the responses they are returned without altering the cache.
+
+    Attributes
+    ----------
+    ttls : :obj:`dict`
+        Time-to-live in seconds of the entries of each kind of endpoint.
+    maxsize : :obj:`int`
+        Maximum number of entries kept in memory.
+    hits : :obj:`int`
+        Number of lookups served from the cache.
+    misses : :obj:`int`
+        Number of lookups not found in the cache.
+
+    '''
+
+    SYMBOLS = 'symbols'
+    OPTIONS = 'options'
+    MARKETS = 'markets'
+
+    TTLS = {
+        SYMBOLS: 24 * 60 * 60,
+        OPTIONS: 24 * 60 * 60,
+        MARKETS: 60 * 60
+    }
+
+    def __init__(self, ttls=None, maxsize=10000, path=None):
+        '''Constructor.
+
+        Parameters
+        ----------
+        ttls : :obj:`dict`, optional
+            Time-to-live in seconds of the entries of each kind of endpoint,
+            overriding the defaults of :attr:`TTLS`.
+        maxsize : :obj:`int`, optional
+            Maximum number of entries kept in memory and in the backing file.
+        path : :obj:`str`, optional
+            Path of a :mod:`shelve` file backing the cache. Its valid entries
+            are loaded, least recently set first, and the ones exceeding
+            `maxsize` are removed.
+
+        '''
+        self.ttls = dict(self.TTLS)
+        self.ttls.update(ttls or {})
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._shelf = None
+        if path:
+            self._shelf = shelve.open(path)
+            self._load()
+
+    def _load(self):
+        '''Loads the entries of the backing file.'''
+        now = time.time()
+        entries = []
+        for key in list(self._shelf.keys()):
+            entry = self._shelf[key]
+            if entry[0] < now:
+                del self._shelf[key]
+            else:
+                entries.append((entry[0], key, entry))
+        # Entries expiring first were set first, unless their kinds have
+        # different time-to-lives.
+        entries.sort(key=lambda item: item[:2])
+        for _, key, entry in entries:
+            self._store(key, entry)
+
+    @classmethod
+    def kind(cls, endpoint):
+        '''Returns the kind of an endpoint, which determines its time-to-live.
+
+        Parameters
+        ----------
+        endpoint : :obj:`str`
+            The webservice endpoint.
+
+        Returns
+        -------
+        :obj:`str`
+            One of :attr:`SYMBOLS`, :attr:`OPTIONS` or :attr:`MARKETS`.
+
+        '''
+        endpoint = endpoint.strip('/')
+        if endpoint.startswith('v1/symbols'):
+            if endpoint.endswith('/options'):
+                return cls.OPTIONS
+            return cls.SYMBOLS
+        return cls.MARKETS
+
+    @staticmethod
+    def key(endpoint, params=None):
+        '''Builds the normalized cache key of a request.
+
+        Parameters are sorted, and so are the values of comma-separated
+        lists, so that equivalent requests share the same key.
+
+        Parameters
+        ----------
+        endpoint : :obj:`str`
+            The webservice endpoint.
+        params : :obj:`dict`, optional
+            The parameters of the request.
+
+        Returns
+        -------
+        :obj:`str`
+            Cache key.
+
+        '''
+        parts = []
+        for name, value in sorted((params or {}).items()):
+            if isinstance(value, (list, tuple)):
+                value = ','.join(map(str, value))
+            value = ','.join(sorted(str(value).split(',')))
+            parts.append('{}={}'.format(name, value))
+        return endpoint.strip('/') + '?' + '&'.join(parts)
+
+    def get(self, key):
+        '''Looks up an entry.
+
+        Parameters
+        ----------
+        key : :obj:`str`
+            Cache key.
+
+        Returns
+        -------
+        object
+            Cached value, or ``None`` if there is no valid entry.
+
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def set(self, key, value, endpoint):
+        '''Adds an entry.
+
+        Parameters
+        ----------
+        key : :obj:`str`
+            Cache key.
+        value : object
+            Value to cache.
+        endpoint : :obj:`str`
+            Endpoint the value was retrieved from, used to determine its
+            time-to-live.
+
+        '''
+        entry = (
+            time.time() + self.ttls[self.kind(endpoint)], copy.deepcopy(value))
+        with self._lock:
+            self._store(key, entry)
+            if self._shelf is not None:
+                self._shelf[key] = entry
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            if self._shelf is not None:
+                del self._shelf[evicted]
+
+    def _discard(self, key):
+        self._entries.pop(key, None)
+        if self._shelf is not None and key in self._shelf:
+            del self._shelf[key]
+
+    def invalidate(self, prefix=''):
+        '''Removes entries.
+
+        Parameters
+        ----------
+        prefix : :obj:`str`, optional
+            Only remove the entries whose key starts with this prefix, e.g.
+            ``'v1/symbols'``. Removes all the entries by default.
+
+        '''
+        with self._lock:
+            for key in list(self._entries):
+                if key.startswith(prefix):
+                    self._discard(key)
+
+    def stats(self):
+        '''Returns the hit and miss counters.
+
+        Returns
+        -------
+        :obj:`dict`
+            Dictionary with the ``hits``, ``misses`` and ``size`` of the cache.
+
+        '''
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries)
+            }
+
+    def close(self):
+        '''Closes the backing file, if any.'''
+        with self._lock:
+            if self._shelf is not None:
+                self._shelf.close()
+                self._shelf = None
@@ -0,0 +1,173 @@
+'''
+Conversion of candlestick and quote lists to columnar structures.
+
+NumPy, pandas and pyarrow are optional dependencies: they are only imported
+when the corresponding format is requested.
+'''
+
+import calendar
+
+from .utils import _import_optional
+
+FORMATS = ('numpy', 'pandas', 'arrow')
+
+CANDLE_COLUMNS = (
+    ('start', 'ns'),
+    ('end', 'ns'),
+    ('low', 'f8'),
+    ('high', 'f8'),
+    ('open', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8'),
+    ('VWAP', 'f8'),
+)
+
+QUOTE_COLUMNS = (
+    ('symbol', 'str'),
+    ('symbolId', 'i8'),
+    ('bidPrice', 'f8'),
+    ('bidSize', 'f8'),
+    ('askPrice', 'f8'),
+    ('askSize', 'f8'),
+    ('lastTradePriceTrHrs', 'f8'),
+    ('lastTradePrice', 'f8'),
+    ('lastTradeSize', 'f8'),
+    ('lastTradeTime', 'ns'),
+    ('volume', 'f8'),
+    ('openPrice', 'f8'),
+    ('highPrice', 'f8'),
+    ('lowPrice', 'f8'),
+    ('VWAP', 'f8'),
+    ('delay', 'i8'),
+    ('isHalted', 'bool'),
+)
+
+# Sentinel used for missing timestamps, equal to NumPy's NaT.
+NAT = -2 ** 63
+
+_MISSING = {
+    'f8': float('nan'),
+    'i8': 0,
+    'ns': NAT,
+    'bool': False,
+    'str': None,
+}
+
+def timestamp_ns(value):
+    ''' Converts an ISO 8601 timestamp returned by the API to nanoseconds since
+    the epoch.
+
+    Parameters
+    ----------
+    value : :obj:`str`
+        Timestamp such as ``'2014-10-24T20:06:40.131000-04:00'``.
+
+    Returns
+    -------
+    :obj:`int`
+        Nanoseconds since the epoch, or :data:`NAT` if `value` is empty.
+
+    '''
+    if not value:
+        return NAT
+    seconds = calendar.timegm((
+        int(value[0:4]), int(value[5:7]), int(value[8:10]),
+        int(value[11:13]), int(value[14:16]), int(value[17:19])
+    ))
+    rest = value[19:]
+    nanoseconds = 0
+    if rest.startswith('.'):
+        digits = 1
+        while digits < len(rest) and rest[digits].isdigit():
+            digits += 1
+        nanoseconds = int(rest[1:digits].ljust(9, '0')[:9])
+        rest = rest[digits:]
+    if rest and rest != 'Z':
+        offset = int(rest[1:3]) * 3600 + int(rest[4:6]) * 60
+        seconds -= offset if rest[0] == '+' else -offset
+    return seconds * 1000000000 + nanoseconds
+
+def _columns(records, spec):
+    '''Transposes a list of records into lists of column values.'''
+    columns = {}
+    for name, kind in spec:
+        missing = _MISSING[kind]
+        values = [record.get(name) for record in records]
+        if kind == 'ns':
+            values = [timestamp_ns(value) for value in values]
+        else:
+            values = [missing if value is None else value for value in values]
+        columns[name] = values
+    return columns
+
+def convert(records, spec, format):
+    ''' Converts a list of records to a columnar structure.
+
+    Parameters
+    ----------
+    records : :obj:`list` of :obj:`dict`
+        Records returned by the API.
+    spec : :obj:`tuple`
+        Name and type of the columns to extract, e.g. :data:`CANDLE_COLUMNS`.
+    format : :obj:`str`, {'numpy', 'pandas', 'arrow'}
+        Output format.
+
+    Returns
+    -------
+    :obj:`dict` of :obj:`numpy.ndarray`, :obj:`pandas.DataFrame` or \
+    :obj:`pyarrow.Table`
+        Columns of the records. Timestamps are UTC nanoseconds since the epoch
+        (``datetime64[ns]`` for pandas and arrow).
+
+    '''
+    if format not in FORMATS:
+        raise ValueError('Unknown format {!r}, expected one of {}.'.format(
+            format, ', '.join(FORMATS)))
+    columns = _columns(records, spec)
+
+    if format == 'arrow':
+        pa = _import_optional('pyarrow')
+        types = {
+            'f8': pa.float64(),
+            'i8': pa.int64(),
+            'ns': pa.timestamp('ns', tz='UTC'),
+            'bool': pa.bool_(),
+            'str': pa.string(),
+        }
+        arrays = []
+        for name, kind in spec:
+            values = columns[name]
+            if kind == 'ns':
+                values = [None if value == NAT else value for value in values]
+            arrays.append(pa.array(values, type=types[kind]))
+        return pa.Table.from_arrays(arrays, names=[name for name, _ in spec])
+
+    np = _import_optional('numpy')
+    dtypes = {
+        'f8': np.float64,
+        'i8': np.int64,
+        'ns': np.int64,
+        'bool': np.bool_,
+        'str': object,
+    }
+    arrays = {
+        name: np.array(columns[name], dtype=dtypes[kind])
+        for name, kind in spec
+    }
+    if format == 'numpy':
+        return arrays
+
+    pd = _import_optional('pandas')
+    for name, kind in spec:
+        if kind == 'ns':
+            arrays[name] = pd.to_datetime(
+                arrays[name].view('datetime64[ns]'), utc=True)
+    return pd.DataFrame(arrays, columns=[name for name, _ in spec])
+
+def convert_candles(candles, format):
+    ''' Converts candlesticks to a columnar structure. See :func:`convert`.'''
+    return convert(candles, CANDLE_COLUMNS, format)
+
+def convert_quotes(quotes, format):
+    ''' Converts Level 1 quotes to a columnar structure. See :func:`convert`.'''
+    return convert(quotes, QUOTE_COLUMNS, format)
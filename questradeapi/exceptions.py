@@ -0,0 +1,56 @@
+class QuestradeAPIError(Exception):
+    ''' Raised when the Questrade API answers a request with an error.
+
+    Attributes
+    ----------
+    code : :obj:`int`
+        Questrade error code, if any.
+    message : :obj:`str`
+        Description of the error.
+    response : :obj:`dict`
+        Full error response returned by the server.
+
+    '''
+
+    def __init__(self, response):
+        '''Constructor.
+
+        Parameters
+        ----------
+        response : :obj:`dict`
+            Error response returned by the server.
+
+        '''
+        self.response = response
+        self.code = response.get('code')
+        self.message = response.get('message', 'Unknown error')
+        super().__init__('{} (code {})'.format(self.message, self.code))
+
+class CircuitOpenError(Exception):
+    ''' Raised instead of sending a request to a server that is failing.
+
+    Attributes
+    ----------
+    host : :obj:`str`
+        Server the request was meant for.
+    retry_in : :obj:`float`
+        Number of seconds before requests to the server are attempted again.
+
+    '''
+
+    def __init__(self, host, retry_in):
+        '''Constructor.
+
+        Parameters
+        ----------
+        host : :obj:`str`
+            Server the request was meant for.
+        retry_in : :obj:`float`
+            Number of seconds before requests to the server are attempted
+            again.
+
+        '''
+        self.host = host
+        self.retry_in = retry_in
+        super().__init__('Circuit open for {}, retry in {:.1f}s'.format(
+            host, retry_in))
@@ -0,0 +1,340 @@
+'''
+Vectorized option pricing, implied volatilities and Greeks.
+
+Contracts are priced with the generalized Black-Scholes model, either on the
+spot price of the underlying (Black-Scholes, with a continuous dividend
+yield) or on its forward price (Black-76). Every function operates on NumPy
+arrays, so that whole option chains are processed at once.
+
+NumPy is an optional dependency: it is only imported when a function of this
+module is called.
+
+Units follow the conventions of trading platforms: times are in years,
+volatilities and rates are fractions (``0.25`` for 25%), theta is the change
+of value per calendar day and vega the change of value per volatility point.
+'''
+
+from datetime import datetime, time, timezone
+
+from .utils import _import_optional
+
+BLACK_SCHOLES = 'black_scholes'
+BLACK76 = 'black76'
+
+# Options expire at the close, 16:00 Eastern time. Daylight saving time is
+# ignored, the difference being negligible except on the last day.
+EXPIRY_TIME = time(21, 0)
+
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 5.0
+
+def _norm_cdf(np, x):
+    '''Cumulative distribution function of the standard normal distribution,
+    with double precision accuracy (Hart, 1968, as given by West, 2005).'''
+    a = np.abs(x)
+    e = np.exp(-a * a / 2)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        n = (((((0.0352624965998911 * a + 0.700383064443688) * a
+            + 6.37396220353165) * a + 33.912866078383) * a
+            + 112.079291497871) * a + 221.213596169931) * a \
+            + 220.206867912376
+        d = ((((((0.0883883476483184 * a + 1.75566716318264) * a
+            + 16.064177579207) * a + 86.7807322029461) * a
+            + 296.564248779674) * a + 637.333633378831) * a
+            + 793.826512519948) * a + 440.413735824752
+        tail = e / (a + 1 / (a + 2 / (a + 3 / (a + 4 / (a + 0.65))))) \
+            / 2.506628274631
+        c = np.where(a < 7.07106781186547, e * n / d, tail)
+    c = np.where(a > 37, 0.0, c)
+    return np.where(x > 0, 1 - c, c)
+
+def _norm_pdf(np, x):
+    return np.exp(-x * x / 2) / 2.5066282746310002
+
+def _inputs(np, price, strike, time_to_expiry, rate, dividend, option_type,
+    model):
+    '''Converts the inputs to arrays and computes the cost of carry.'''
+    price = np.asarray(price, dtype=np.float64)
+    strike = np.asarray(strike, dtype=np.float64)
+    time_to_expiry = np.asarray(time_to_expiry, dtype=np.float64)
+    rate = np.asarray(rate, dtype=np.float64)
+    if model == BLACK_SCHOLES:
+        carry = rate - np.asarray(dividend, dtype=np.float64)
+    elif model == BLACK76:
+        carry = np.zeros_like(rate)
+    else:
+        raise ValueError("Unknown model {!r}, expected {!r} or {!r}.".format(
+            model, BLACK_SCHOLES, BLACK76))
+    is_call = np.asarray(option_type) == 'Call'
+    return price, strike, time_to_expiry, rate, carry, is_call
+
+def _price(np, price, strike, t, rate, carry, is_call, volatility):
+    '''Prices contracts, returning the intermediate terms reused by the
+    Greeks.'''
+    sqrt_t = np.sqrt(t)
+    v = volatility * sqrt_t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(price / strike) + (carry + volatility ** 2 / 2) * t) / v
+    d2 = d1 - v
+    carry_factor = np.exp((carry - rate) * t)
+    discount = np.exp(-rate * t)
+    sign = np.where(is_call, 1.0, -1.0)
+    value = sign * (price * carry_factor * _norm_cdf(np, sign * d1)
+        - strike * discount * _norm_cdf(np, sign * d2))
+    return value, d1, d2, sqrt_t, carry_factor, discount, sign
+
+def black_scholes(price, strike, time_to_expiry, volatility, option_type,
+    rate=0.0, dividend=0.0, model=BLACK_SCHOLES):
+    ''' Computes the value and Greeks of European options.
+
+    Every parameter but `model` may be an array, arrays are broadcast
+    together.
+
+    Parameters
+    ----------
+    price : :obj:`float` or :obj:`numpy.ndarray`
+        Price of the underlying, or its forward price for Black-76.
+    strike : :obj:`float` or :obj:`numpy.ndarray`
+        Strike prices.
+    time_to_expiry : :obj:`float` or :obj:`numpy.ndarray`
+        Times to expiry, in years.
+    volatility : :obj:`float` or :obj:`numpy.ndarray`
+        Annualized volatilities.
+    option_type : :obj:`str` or :obj:`numpy.ndarray`, {'Call', 'Put'}
+        Option types.
+    rate : :obj:`float` or :obj:`numpy.ndarray`, optional
+        Continuously compounded risk-free rate.
+    dividend : :obj:`float` or :obj:`numpy.ndarray`, optional
+        Continuous dividend yield. Ignored by Black-76.
+    model : :obj:`str`, {'black_scholes', 'black76'}, optional
+        Pricing model.
+
+    Returns
+    -------
+    :obj:`dict` of :obj:`numpy.ndarray`
+        Arrays ``'value'``, ``'delta'``, ``'gamma'``, ``'theta'`` (per
+        calendar day) and ``'vega'`` (per volatility point).
+
+    '''
+    np = _import_optional('numpy')
+    price, strike, t, rate, carry, is_call = _inputs(
+        np, price, strike, time_to_expiry, rate, dividend, option_type, model)
+    volatility = np.asarray(volatility, dtype=np.float64)
+    value, d1, d2, sqrt_t, carry_factor, discount, sign = _price(
+        np, price, strike, t, rate, carry, is_call, volatility)
+    density = _norm_pdf(np, d1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = carry_factor * density / (price * volatility * sqrt_t)
+        theta = (
+            -price * carry_factor * density * volatility / (2 * sqrt_t)
+            - sign * (carry - rate) * price * carry_factor
+            * _norm_cdf(np, sign * d1)
+            - sign * rate * strike * discount * _norm_cdf(np, sign * d2)
+        )
+    return {
+        'value': value,
+        'delta': sign * carry_factor * _norm_cdf(np, sign * d1),
+        'gamma': gamma,
+        'theta': theta / 365,
+        'vega': price * carry_factor * density * sqrt_t / 100,
+    }
+
+def implied_volatility(option_price, price, strike, time_to_expiry,
+    option_type, rate=0.0, dividend=0.0, model=BLACK_SCHOLES, tol=1e-8,
+    max_iterations=100):
+    ''' Computes the implied volatilities of European options.
+
+    Newton's method is run on every contract at once. The volatility of each
+    contract is kept bracketed, and a bisection step is taken instead of the
+    Newton step whenever the latter leaves the bracket, so that deep in or
+    out of the money contracts, whose vega vanishes, still converge.
+
+    Parameters
+    ----------
+    option_price : :obj:`float` or :obj:`numpy.ndarray`
+        Prices of the options, usually the middle of the bid and ask.
+    price : :obj:`float` or :obj:`numpy.ndarray`
+        Price of the underlying, or its forward price for Black-76.
+    strike : :obj:`float` or :obj:`numpy.ndarray`
+        Strike prices.
+    time_to_expiry : :obj:`float` or :obj:`numpy.ndarray`
+        Times to expiry, in years.
+    option_type : :obj:`str` or :obj:`numpy.ndarray`, {'Call', 'Put'}
+        Option types.
+    rate : :obj:`float` or :obj:`numpy.ndarray`, optional
+        Continuously compounded risk-free rate.
+    dividend : :obj:`float` or :obj:`numpy.ndarray`, optional
+        Continuous dividend yield. Ignored by Black-76.
+    model : :obj:`str`, {'black_scholes', 'black76'}, optional
+        Pricing model.
+    tol : :obj:`float`, optional
+        Tolerance on the option price.
+    max_iterations : :obj:`int`, optional
+        Maximum number of iterations.
+
+    Returns
+    -------
+    :obj:`numpy.ndarray`
+        Implied volatilities. NaN where the option price violates the
+        no-arbitrage bounds or the volatility exceeds
+        :data:`MAX_VOLATILITY`. Where the vega vanishes, typically deep in
+        the money close to expiry, the price hardly depends on the
+        volatility and the result is only as accurate as `tol` allows.
+
+    '''
+    np = _import_optional('numpy')
+    price, strike, t, rate, carry, is_call = _inputs(
+        np, price, strike, time_to_expiry, rate, dividend, option_type, model)
+    target = np.asarray(option_price, dtype=np.float64)
+    arrays = np.broadcast_arrays(
+        price, strike, t, rate, carry, is_call, target)
+    shape = arrays[0].shape
+    price, strike, t, rate, carry, is_call, target = [
+        array.ravel() for array in arrays]
+
+    forward_value = price * np.exp((carry - rate) * t)
+    strike_value = strike * np.exp(-rate * t)
+    intrinsic = np.maximum(
+        np.where(is_call, forward_value - strike_value,
+            strike_value - forward_value), 0)
+    upper = np.where(is_call, forward_value, strike_value)
+    valid = (target > intrinsic) & (target < upper) & (t > 0) \
+        & np.isfinite(target)
+
+    low = np.full(target.shape, MIN_VOLATILITY)
+    high = np.full(target.shape, MAX_VOLATILITY)
+    # Brenner and Subrahmanyam's approximation, exact at the money.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volatility = np.clip(
+            np.sqrt(2 * np.pi / t) * target / forward_value,
+            MIN_VOLATILITY, MAX_VOLATILITY)
+    volatility = np.where(valid, volatility, np.nan)
+
+    converged = np.zeros(target.shape, dtype=bool)
+    # Only the contracts still iterating are computed at each iteration.
+    active = np.flatnonzero(valid)
+    for _ in range(max_iterations):
+        if not active.size:
+            break
+        current = volatility[active]
+        value, d1, _, sqrt_t, carry_factor, _, _ = _price(
+            np, price[active], strike[active], t[active], rate[active],
+            carry[active], is_call[active], current)
+        vega = price[active] * carry_factor * _norm_pdf(np, d1) * sqrt_t
+        difference = value - target[active]
+        done = np.abs(difference) <= tol
+        converged[active[done]] = True
+        current_low = np.where(difference < 0, current, low[active])
+        current_high = np.where(difference > 0, current, high[active])
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = current - difference / vega
+        bisect = ~((step > current_low) & (step < current_high))
+        step = np.where(bisect, (current_low + current_high) / 2, step)
+        low[active] = current_low
+        high[active] = current_high
+        volatility[active] = np.where(done, current, step)
+        # Stop once the price is reached or the bracket has collapsed.
+        active = active[~done & (current_high - current_low > 1e-12)]
+
+    # A collapsed bracket at either bound means the price was not reachable.
+    reached = converged | (
+        (volatility > MIN_VOLATILITY * 1.001)
+        & (volatility < MAX_VOLATILITY * 0.999))
+    return np.where(valid & reached, volatility, np.nan).reshape(shape)
+
+def time_to_expiry(expiries, now=None):
+    ''' Computes the times to expiry of contracts.
+
+    Parameters
+    ----------
+    expiries : :obj:`list` of :obj:`date`
+        Expiry dates. Contracts expire at :data:`EXPIRY_TIME` (UTC).
+    now : :obj:`datetime`, optional
+        Current time, naive datetimes being in UTC. Defaults to now.
+
+    Returns
+    -------
+    :obj:`numpy.ndarray`
+        Times to expiry in years, floored at zero.
+
+    '''
+    np = _import_optional('numpy')
+    if now is None:
+        now = datetime.now(timezone.utc)
+    elif now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    seconds = np.array([
+        (datetime.combine(expiry, EXPIRY_TIME).replace(tzinfo=timezone.utc)
+            - now).total_seconds()
+        for expiry in expiries
+    ], dtype=np.float64)
+    return np.maximum(seconds, 0) / (365 * 86400)
+
+def chain_greeks(contracts, quotes, underlying_price, rate=0.0, dividend=0.0,
+    model=BLACK_SCHOLES, now=None):
+    ''' Computes the implied volatilities and Greeks of option contracts from
+    their quotes.
+
+    The price of each option is the middle of its bid and ask, or its last
+    trade price if it has no two-sided market.
+
+    Parameters
+    ----------
+    contracts : :obj:`list` of :obj:`questradeapi.options.OptionContract`
+        Contracts, as returned by
+        :meth:`questradeapi.OptionChainIndex.select`.
+    quotes : :obj:`list` of :obj:`dict`
+        Option quote structures of the contracts, as returned by
+        :meth:`questradeapi.OptionChainIndex.quote`, in any order.
+    underlying_price : :obj:`float`
+        Price of the underlying, or its forward price for Black-76.
+    rate : :obj:`float`, optional
+        Continuously compounded risk-free rate.
+    dividend : :obj:`float`, optional
+        Continuous dividend yield. Ignored by Black-76.
+    model : :obj:`str`, {'black_scholes', 'black76'}, optional
+        Pricing model.
+    now : :obj:`datetime`, optional
+        Time at which the Greeks are computed. Defaults to now.
+
+    Returns
+    -------
+    :obj:`dict` of :obj:`numpy.ndarray`
+        Arrays ``'symbolId'``, ``'strike'``, ``'time'``, ``'price'``,
+        ``'volatility'``, ``'delta'``, ``'gamma'``, ``'theta'`` and
+        ``'vega'``, in the order of `contracts`. Contracts without quote or
+        implied volatility have NaN values.
+
+    '''
+    np = _import_optional('numpy')
+    by_id = {quote['symbolId']: quote for quote in quotes}
+    prices = np.full(len(contracts), np.nan)
+    for i, contract in enumerate(contracts):
+        quote = by_id.get(contract.symbol_id)
+        if quote is None:
+            continue
+        bid, ask = quote.get('bidPrice'), quote.get('askPrice')
+        if bid and ask:
+            prices[i] = (bid + ask) / 2
+        elif quote.get('lastTradePrice'):
+            prices[i] = quote['lastTradePrice']
+
+    strike = np.array([c.strike for c in contracts], dtype=np.float64)
+    option_type = np.array([c.option_type for c in contracts])
+    t = time_to_expiry([c.expiry for c in contracts], now)
+    volatility = implied_volatility(prices, underlying_price, strike, t,
+        option_type, rate, dividend, model)
+    greeks = black_scholes(underlying_price, strike, t, volatility,
+        option_type, rate, dividend, model)
+    return {
+        'symbolId': np.array(
+            [c.symbol_id for c in contracts], dtype=np.int64),
+        'strike': strike,
+        'time': t,
+        'price': prices,
+        'volatility': volatility,
+        'delta': greeks['delta'],
+        'gamma': greeks['gamma'],
+        'theta': greeks['theta'],
+        'vega': greeks['vega'],
+    }
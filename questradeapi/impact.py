@@ -0,0 +1,280 @@
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from .exceptions import QuestradeAPIError
+from .orders import OrderBatch
+from .singleflight import SingleFlight
+
+ImpactEstimate = namedtuple('ImpactEstimate', ('impact', 'source'))
+ImpactEstimate.__doc__ = '''Estimated impact of an order.
+
+Attributes
+----------
+impact : :obj:`dict`
+    Impact structure, as returned by the server for ``impact=True`` orders.
+source : :obj:`str`, {'server', 'cache', 'interpolated'}
+    Whether the impact was requested, found in the cache or interpolated
+    from cached impacts of the same order with other quantities.
+'''
+
+class ImpactEstimator():
+    ''' Estimates the impact of draft orders for order previews.
+
+    Orders are specified as for :obj:`questradeapi.OrderBatch`. Impacts are
+    requested with ``impact=True`` and cached for `ttl` seconds, keyed by the
+    normalized order specification. Identical requests in flight at the same
+    time are sent once.
+
+    Requests made with a `draft` identifier are debounced: they wait
+    `debounce` seconds and are dropped if a newer request for the same draft
+    is made meanwhile, so that typing a quantity only sends the last value.
+
+    With `interpolate`, the impact of an order differing from cached orders
+    only by its quantity is computed locally: effects are interpolated
+    linearly between the two closest cached quantities, or scaled from a
+    single one with commissions left unchanged.
+
+    Example
+    -------
+    .. code-block:: python
+
+        estimator = ImpactEstimator(sess, interpolate=True)
+        estimate = estimator.estimate(spec, draft='ticket-1')
+        if estimate is not None:
+            print(estimate.impact['buyingPowerEffect'], estimate.source)
+
+    Attributes
+    ----------
+    session : :obj:`questradeapi.Session`
+        Session used to request the impacts.
+    ttl : :obj:`float`
+        Number of seconds impacts are cached.
+    debounce : :obj:`float`
+        Number of seconds debounced requests wait for a newer request.
+    interpolate : :obj:`bool`
+        Whether impacts of quantity changes are interpolated.
+
+    '''
+
+    QUANTITY = 'quantity'
+    # Numeric properties of impacts that are proportional to the quantity,
+    # and the properties holding the account value after the order.
+    EFFECTS = {
+        'buyingPowerEffect': 'buyingPowerResult',
+        'maintExcessEffect': 'maintExcessResult',
+        'estimatedCommissions': None,
+    }
+
+    def __init__(self, session, ttl=5, debounce=0.25, interpolate=False,
+        maxsize=1000):
+        '''Constructor.
+
+        Parameters
+        ----------
+        session : :obj:`questradeapi.Session`
+            Session used to request the impacts.
+        ttl : :obj:`float`, optional
+            Number of seconds impacts are cached.
+        debounce : :obj:`float`, optional
+            Number of seconds debounced requests wait for a newer request.
+        interpolate : :obj:`bool`, optional
+            Whether impacts of quantity changes are interpolated.
+        maxsize : :obj:`int`, optional
+            Maximum number of cached impacts.
+
+        '''
+        self.session = session
+        self.ttl = ttl
+        self.debounce = debounce
+        self.interpolate = interpolate
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        # Latest request of each draft, in the order they were made.
+        self._drafts = OrderedDict()
+        self._generations = itertools.count(1)
+        self._draft_changed = threading.Condition(self._lock)
+
+    @staticmethod
+    def _key(spec, exclude=()):
+        '''Normalizes an order specification into a cache key.'''
+        return json.dumps(
+            {
+                name: value for name, value in spec.items()
+                if value is not None and name not in exclude
+            },
+            sort_keys=True, default=str
+        )
+
+    def _get(self, key):
+        '''Returns a cached impact, or ``None`` if missing or expired.'''
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _set(self, key, spec, impact):
+        base = self._key(spec, (self.QUANTITY,))
+        with self._lock:
+            self._cache[key] = (
+                time.monotonic() + self.ttl, impact, spec, base)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def _request(self, key, spec):
+        '''Requests the impact of an order and caches it.'''
+        kwargs = dict(spec)
+        method = getattr(
+            self.session, OrderBatch.METHODS[kwargs.pop('type', 'order')])
+        impact = method(impact=True, **kwargs)
+        if 'code' in impact:
+            raise QuestradeAPIError(impact)
+        self._set(key, spec, impact)
+        return impact
+
+    def _interpolate(self, spec):
+        '''Computes the impact of an order from cached impacts of the same
+        order with other quantities.
+
+        Returns
+        -------
+        :obj:`dict`
+            Interpolated impact, or ``None`` if no cached impact can be used.
+
+        '''
+        if spec.get('type', 'order') != 'order' or not spec.get(self.QUANTITY):
+            return None
+        base = self._key(spec, (self.QUANTITY,))
+        now = time.monotonic()
+        with self._lock:
+            points = {}
+            for expires, impact, cached, cached_base in self._cache.values():
+                if expires >= now and cached_base == base \
+                    and cached.get(self.QUANTITY):
+                    points[cached[self.QUANTITY]] = impact
+        if not points:
+            return None
+
+        quantity = spec[self.QUANTITY]
+        nearest = sorted(points, key=lambda q: abs(q - quantity))[:2]
+        reference = points[nearest[0]]
+        impact = dict(reference)
+        for effect, result in self.EFFECTS.items():
+            if not isinstance(reference.get(effect), (int, float)):
+                continue
+            if len(nearest) == 2 and isinstance(
+                points[nearest[1]].get(effect), (int, float)):
+                (q0, q1) = nearest
+                v0, v1 = points[q0][effect], points[q1][effect]
+                value = v0 + (v1 - v0) * (quantity - q0) / (q1 - q0)
+            elif result is None:
+                # Commissions are mostly flat for a single point of reference.
+                value = reference[effect]
+            else:
+                value = reference[effect] * quantity / nearest[0]
+            impact[effect] = value
+            if result is not None and isinstance(
+                reference.get(result), (int, float)):
+                impact[result] = reference[result] - reference[effect] + value
+        return impact
+
+    def _touch_draft(self, draft):
+        '''Records a new request for a draft, superseding the previous ones.
+
+        Drafts whose last request is older than the debounce delay are
+        forgotten, since no request waits for them anymore.
+
+        Returns
+        -------
+        :obj:`int`
+            Generation of the request, unique across drafts.
+
+        '''
+        with self._lock:
+            now = time.monotonic()
+            while self._drafts:
+                oldest = next(iter(self._drafts.values()))
+                if oldest[1] + self.debounce >= now:
+                    break
+                self._drafts.popitem(last=False)
+            generation = next(self._generations)
+            self._drafts[draft] = (generation, now)
+            self._drafts.move_to_end(draft)
+            self._draft_changed.notify_all()
+            return generation
+
+    def _wait_for_draft(self, draft, generation):
+        '''Waits for the debounce delay of a draft.
+
+        Returns
+        -------
+        :obj:`bool`
+            Whether no newer request was made for the draft meanwhile.
+
+        '''
+        with self._lock:
+            deadline = time.monotonic() + self.debounce
+            while True:
+                # A forgotten draft had no newer request: one would have
+                # recorded a new generation.
+                latest = self._drafts.get(draft)
+                if latest is not None and latest[0] != generation:
+                    return False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return True
+                self._draft_changed.wait(remaining)
+
+    def estimate(self, spec, draft=None):
+        '''Estimates the impact of an order.
+
+        Parameters
+        ----------
+        spec : :obj:`dict`
+            Specification of the order, see :obj:`questradeapi.OrderBatch`.
+        draft : hashable, optional
+            Identifier of the draft order, such as an order ticket of a user
+            interface, enabling debouncing.
+
+        Returns
+        -------
+        :obj:`ImpactEstimate`
+            Estimated impact, or ``None`` if a newer request was made for the
+            same draft during the debounce delay.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.QuestradeAPIError`
+            If the server returns an error.
+
+        '''
+        if draft is not None:
+            generation = self._touch_draft(draft)
+        key = self._key(spec)
+        impact = self._get(key)
+        if impact is not None:
+            return ImpactEstimate(impact, 'cache')
+        if self.interpolate:
+            impact = self._interpolate(spec)
+            if impact is not None:
+                return ImpactEstimate(impact, 'interpolated')
+        if draft is not None and self.debounce > 0:
+            if not self._wait_for_draft(draft, generation):
+                return None
+        impact = self._flight.do(key, self._request, key, spec)
+        return ImpactEstimate(impact, 'server')
+
+    def clear(self):
+        '''Removes every cached impact.'''
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,339 @@
+'''
+Instrumentation of the requests performed by a :obj:`questradeapi.Session`.
+
+A session calls the hooks of its instrumentation, if any, around every
+request and token refresh. Without instrumentation the hooks are skipped
+entirely.
+'''
+
+import re
+import threading
+from collections import namedtuple
+
+from .utils import _import_optional
+
+RequestEvent = namedtuple('RequestEvent', (
+    'method', 'endpoint', 'status_code', 'attempt', 'start', 'duration',
+    'server_time', 'decode_time', 'bytes_out', 'bytes_in',
+    'rate_limit_remaining', 'error'
+))
+RequestEvent.__doc__ = '''Attempt of a request to the API server.
+
+Attributes
+----------
+method : :obj:`str`
+    HTTP method of the request.
+endpoint : :obj:`str`
+    The webservice endpoint the request was sent to.
+status_code : :obj:`int`
+    HTTP status of the response, or ``None`` if no response was received.
+attempt : :obj:`int`
+    Number of the attempt, starting at 1.
+start : :obj:`float`
+    Unix time at which the request was sent.
+duration : :obj:`float`
+    Seconds between sending the request and decoding the response.
+server_time : :obj:`float`
+    Seconds between sending the request and receiving the response headers,
+    covering connection setup and server processing.
+decode_time : :obj:`float`
+    Seconds spent decoding the response body.
+bytes_out : :obj:`int`
+    Size of the request URL and body.
+bytes_in : :obj:`int`
+    Size of the response body.
+rate_limit_remaining : :obj:`int`
+    Requests remaining in the quota according to the response, if known.
+error : :obj:`Exception`
+    Exception raised by the transport, if any.
+'''
+
+TokenRefreshEvent = namedtuple('TokenRefreshEvent', (
+    'start', 'duration', 'error'
+))
+TokenRefreshEvent.__doc__ = '''Redeem of the refresh token.
+
+Attributes
+----------
+start : :obj:`float`
+    Unix time at which the refresh token was redeemed.
+duration : :obj:`float`
+    Seconds spent redeeming the refresh token.
+error : :obj:`Exception`
+    Exception raised while redeeming, if any.
+'''
+
+class Instrumentation():
+    ''' Base class of session instrumentations. Every hook is a no-op.'''
+
+    def on_request(self, event):
+        '''Called after each attempt of a request.
+
+        Parameters
+        ----------
+        event : :obj:`RequestEvent`
+            Description of the attempt.
+
+        '''
+
+    def on_token_refresh(self, event):
+        '''Called after each redeem of the refresh token.
+
+        Parameters
+        ----------
+        event : :obj:`TokenRefreshEvent`
+            Description of the redeem.
+
+        '''
+
+def endpoint_name(endpoint):
+    ''' Replaces the identifiers in an endpoint by placeholders, so that
+    metrics are aggregated per kind of call rather than per account or symbol.
+
+    Parameters
+    ----------
+    endpoint : :obj:`str`
+        The webservice endpoint.
+
+    Returns
+    -------
+    :obj:`str`
+        Endpoint such as ``'v1/accounts/{id}/positions'``.
+
+    '''
+    return re.sub(r'/\d+(?=/|$)', '/{id}', '/' + endpoint.strip('/'))[1:]
+
+class Histogram():
+    ''' Cumulative histogram, in the Prometheus sense.
+
+    Attributes
+    ----------
+    buckets : :obj:`tuple` of :obj:`float`
+        Upper bounds of the buckets.
+    counts : :obj:`list` of :obj:`int`
+        Number of observations less than or equal to each bound.
+    count : :obj:`int`
+        Total number of observations.
+    sum : :obj:`float`
+        Sum of the observations.
+
+    '''
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        '''Records an observation.'''
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+class MetricsRecorder(Instrumentation):
+    ''' Instrumentation recording request metrics.
+
+    Records, per endpoint, histograms of the request latencies split between
+    server and decoding time, the bytes sent and received, the number of
+    responses of each status, the number of retries and the rate limit
+    headroom, as well as the token refresh latencies. The metrics can be
+    exported in the Prometheus text format with :meth:`to_prometheus`.
+
+    '''
+
+    BUCKETS = (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+    )
+
+    def __init__(self, buckets=None):
+        '''Constructor.
+
+        Parameters
+        ----------
+        buckets : :obj:`tuple` of :obj:`float`, optional
+            Upper bounds in seconds of the latency histogram buckets.
+
+        '''
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self.latency = {}
+        self.server_time = {}
+        self.decode_time = {}
+        self.bytes_out = {}
+        self.bytes_in = {}
+        self.responses = {}
+        self.errors = {}
+        self.retries = {}
+        self.rate_limit_remaining = {}
+        self.token_refresh = Histogram(self.buckets)
+        self.token_refresh_errors = 0
+        self._lock = threading.Lock()
+
+    def _histogram(self, histograms, key):
+        if key not in histograms:
+            histograms[key] = Histogram(self.buckets)
+        return histograms[key]
+
+    def on_request(self, event):
+        endpoint = endpoint_name(event.endpoint)
+        key = (event.method, endpoint)
+        with self._lock:
+            if event.attempt > 1:
+                self.retries[key] = self.retries.get(key, 0) + 1
+            if event.error is not None:
+                self.errors[key] = self.errors.get(key, 0) + 1
+                return
+            self._histogram(self.latency, key).observe(event.duration)
+            self._histogram(self.server_time, key).observe(event.server_time)
+            self._histogram(self.decode_time, key).observe(event.decode_time)
+            self.bytes_out[key] = self.bytes_out.get(key, 0) + event.bytes_out
+            self.bytes_in[key] = self.bytes_in.get(key, 0) + event.bytes_in
+            status = key + (event.status_code,)
+            self.responses[status] = self.responses.get(status, 0) + 1
+            if event.rate_limit_remaining is not None:
+                self.rate_limit_remaining[endpoint] = event.rate_limit_remaining
+
+    def on_token_refresh(self, event):
+        with self._lock:
+            if event.error is not None:
+                self.token_refresh_errors += 1
+            else:
+                self.token_refresh.observe(event.duration)
+
+    def to_prometheus(self, prefix='questradeapi'):
+        '''Exports the metrics in the Prometheus text format.
+
+        Parameters
+        ----------
+        prefix : :obj:`str`, optional
+            Prefix of the metric names.
+
+        Returns
+        -------
+        :obj:`str`
+            Metrics in the Prometheus text exposition format.
+
+        '''
+        lines = []
+
+        def labels(**values):
+            return '{' + ','.join(
+                '{}="{}"'.format(name, value)
+                for name, value in sorted(values.items())
+            ) + '}'
+
+        def histogram(name, help, histograms):
+            name = prefix + '_' + name
+            lines.append('# HELP {} {}'.format(name, help))
+            lines.append('# TYPE {} histogram'.format(name))
+            for (method, endpoint), h in sorted(histograms.items()):
+                for bound, count in zip(h.buckets, h.counts):
+                    lines.append('{}_bucket{} {}'.format(name, labels(
+                        method=method, endpoint=endpoint, le=bound), count))
+                lines.append('{}_bucket{} {}'.format(name, labels(
+                    method=method, endpoint=endpoint, le='+Inf'), h.count))
+                common = labels(method=method, endpoint=endpoint)
+                lines.append('{}_sum{} {}'.format(name, common, h.sum))
+                lines.append('{}_count{} {}'.format(name, common, h.count))
+
+        def counter(name, help, counters, label_names):
+            name = prefix + '_' + name
+            lines.append('# HELP {} {}'.format(name, help))
+            lines.append('# TYPE {} counter'.format(name))
+            for key, value in sorted(counters.items()):
+                lines.append('{}{} {}'.format(
+                    name, labels(**dict(zip(label_names, key))), value))
+
+        with self._lock:
+            histogram('request_duration_seconds',
+                'Request latency, including decoding.', self.latency)
+            histogram('request_server_seconds',
+                'Time until the response headers were received.',
+                self.server_time)
+            histogram('request_decode_seconds',
+                'Time spent decoding the response body.', self.decode_time)
+            counter('request_bytes_out_total', 'Bytes sent.',
+                self.bytes_out, ('method', 'endpoint'))
+            counter('request_bytes_in_total', 'Bytes received.',
+                self.bytes_in, ('method', 'endpoint'))
+            counter('responses_total', 'Responses received per status.',
+                self.responses, ('method', 'endpoint', 'status'))
+            counter('request_errors_total', 'Requests without a response.',
+                self.errors, ('method', 'endpoint'))
+            counter('request_retries_total', 'Retried request attempts.',
+                self.retries, ('method', 'endpoint'))
+
+            name = prefix + '_rate_limit_remaining'
+            lines.append('# HELP {} Requests remaining in the quota.'.format(
+                name))
+            lines.append('# TYPE {} gauge'.format(name))
+            for endpoint, value in sorted(self.rate_limit_remaining.items()):
+                lines.append('{}{} {}'.format(
+                    name, labels(endpoint=endpoint), value))
+
+            name = prefix + '_token_refresh_seconds'
+            h = self.token_refresh
+            lines.append('# HELP {} Refresh token redeem latency.'.format(name))
+            lines.append('# TYPE {} histogram'.format(name))
+            for bound, count in zip(h.buckets, h.counts):
+                lines.append('{}_bucket{} {}'.format(
+                    name, labels(le=bound), count))
+            lines.append('{}_bucket{} {}'.format(
+                name, labels(le='+Inf'), h.count))
+            lines.append('{}_sum {}'.format(name, h.sum))
+            lines.append('{}_count {}'.format(name, h.count))
+            lines.append('# TYPE {}_token_refresh_errors_total counter'.format(
+                prefix))
+            lines.append('{}_token_refresh_errors_total {}'.format(
+                prefix, self.token_refresh_errors))
+        return '\n'.join(lines) + '\n'
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    ''' Instrumentation reporting every request attempt and token refresh as
+    an OpenTelemetry span.
+
+    The `opentelemetry-api` package is required.
+
+    '''
+
+    def __init__(self, tracer=None):
+        '''Constructor.
+
+        Parameters
+        ----------
+        tracer : :obj:`opentelemetry.trace.Tracer`, optional
+            Tracer creating the spans. Defaults to the tracer of this package
+            from the global tracer provider.
+
+        '''
+        trace = _import_optional('opentelemetry.trace')
+        self.tracer = tracer or trace.get_tracer('questradeapi')
+
+    def on_request(self, event):
+        start = int(event.start * 1e9)
+        span = self.tracer.start_span(
+            '{} {}'.format(event.method, endpoint_name(event.endpoint)),
+            start_time=start,
+            attributes={
+                'http.method': event.method,
+                'http.route': endpoint_name(event.endpoint),
+                'http.status_code': event.status_code or 0,
+                'questradeapi.attempt': event.attempt,
+                'questradeapi.server_time': event.server_time,
+                'questradeapi.decode_time': event.decode_time,
+                'questradeapi.bytes_out': event.bytes_out,
+                'questradeapi.bytes_in': event.bytes_in,
+            }
+        )
+        if event.error is not None:
+            span.record_exception(event.error)
+        span.end(end_time=start + int(event.duration * 1e9))
+
+    def on_token_refresh(self, event):
+        start = int(event.start * 1e9)
+        span = self.tracer.start_span('token refresh', start_time=start)
+        if event.error is not None:
+            span.record_exception(event.error)
+        span.end(end_time=start + int(event.duration * 1e9))
@@ -0,0 +1,221 @@
+'''
+Typed, compact representations of the structures returned by the API.
+
+Models store their fields in ``__slots__`` rather than in a per-instance
+dictionary, which makes them several times smaller than the dictionaries
+returned by the API. Timestamps are kept as returned by the API and only
+converted to :obj:`datetime` the first time they are accessed.
+'''
+
+import re
+from datetime import datetime, timedelta, timezone
+
+from .columnar import NAT, timestamp_ns
+
+FORMAT = 'objects'
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def parse_datetime(value):
+    ''' Converts an ISO 8601 timestamp returned by the API to a datetime.
+
+    Parameters
+    ----------
+    value : :obj:`str`
+        Timestamp such as ``'2014-10-24T20:06:40.131000-04:00'``.
+
+    Returns
+    -------
+    :obj:`datetime`
+        Timezone-aware datetime in UTC, or ``None`` if `value` is empty.
+
+    '''
+    ns = timestamp_ns(value)
+    if ns == NAT:
+        return None
+    return _EPOCH + timedelta(microseconds=ns // 1000)
+
+def _attribute(key):
+    '''Converts an API property name to an attribute name.'''
+    if key.isupper():
+        return key.lower()
+    name = re.sub(r'(?<=[a-z0-9])([A-Z])', r'_\1', key).lower()
+    return name + '_' if name in ('yield',) else name
+
+def _timestamp_property(slot):
+    '''Creates a property converting the timestamp stored in a slot to a
+    datetime on first access.'''
+    def get(self):
+        value = getattr(self, slot)
+        if isinstance(value, str):
+            value = parse_datetime(value)
+            setattr(self, slot, value)
+        return value
+    return property(get)
+
+class Model():
+    ''' Base class of the models.
+
+    Models are created from API structures with :meth:`from_dict`. Their
+    attributes are the snake_case names of the structure properties.
+
+    '''
+
+    __slots__ = ()
+
+    _keys = ()
+    _slots = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        '''Creates a model from a structure returned by the API.
+
+        Parameters
+        ----------
+        data : :obj:`dict`
+            Structure returned by the API. Missing properties are ``None``.
+
+        Returns
+        -------
+        :obj:`Model`
+            Model holding the properties of the structure.
+
+        '''
+        model = cls.__new__(cls)
+        for slot, key in zip(cls._slots, cls._keys):
+            setattr(model, slot, data.get(key))
+        return model
+
+    @classmethod
+    def from_list(cls, records):
+        '''Creates models from a list of structures returned by the API.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`Model`
+            Models, in the same order as `records`.
+
+        '''
+        from_dict = cls.from_dict
+        return [from_dict(record) for record in records]
+
+    def to_dict(self):
+        '''Converts the model back to a structure as returned by the API.
+
+        Timestamps are formatted back to ISO 8601, in UTC if they were
+        accessed as datetimes.
+
+        Returns
+        -------
+        :obj:`dict`
+            Structure holding the properties of the model.
+
+        '''
+        data = {}
+        for slot, key in zip(self._slots, self._keys):
+            value = getattr(self, slot)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            data[key] = value
+        return data
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, slot) == getattr(other, slot)
+            for slot in self._slots
+        )
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(_attribute(key), getattr(self, slot))
+            for slot, key in zip(self._slots, self._keys)
+        ))
+
+def _model(name, keys, timestamps=(), doc=None):
+    '''Creates a model class.
+
+    Parameters
+    ----------
+    name : :obj:`str`
+        Name of the class.
+    keys : :obj:`tuple` of :obj:`str`
+        Properties of the API structure.
+    timestamps : :obj:`tuple` of :obj:`str`
+        Properties holding timestamps, converted to datetimes on access.
+    doc : :obj:`str`
+        Docstring of the class.
+
+    '''
+    namespace = {'__doc__': doc, '_keys': keys}
+    slots = []
+    for key in keys:
+        attribute = _attribute(key)
+        if key in timestamps:
+            slot = '_' + attribute
+            namespace[attribute] = _timestamp_property(slot)
+        else:
+            slot = attribute
+        slots.append(slot)
+    namespace['__slots__'] = tuple(slots)
+    namespace['_slots'] = tuple(slots)
+    return type(name, (Model,), namespace)
+
+Quote = _model('Quote', (
+    'symbol', 'symbolId', 'tier', 'bidPrice', 'bidSize', 'askPrice',
+    'askSize', 'lastTradePriceTrHrs', 'lastTradePrice', 'lastTradeSize',
+    'lastTradeTick', 'lastTradeTime', 'volume', 'openPrice', 'highPrice',
+    'lowPrice', 'delay', 'isHalted', 'high52w', 'low52w', 'VWAP'
+), ('lastTradeTime',), 'Level 1 market data quote.')
+
+Candle = _model('Candle', (
+    'start', 'end', 'low', 'high', 'open', 'close', 'volume', 'VWAP'
+), ('start', 'end'), 'Historical OHLC candlestick.')
+
+Position = _model('Position', (
+    'symbol', 'symbolId', 'openQuantity', 'closedQuantity',
+    'currentMarketValue', 'currentPrice', 'averageEntryPrice', 'closedPnl',
+    'openPnl', 'totalCost', 'isRealTime', 'isUnderReorg'
+), (), 'Position held in an account.')
+
+Balance = _model('Balance', (
+    'currency', 'cash', 'marketValue', 'totalEquity', 'buyingPower',
+    'maintenanceExcess', 'isRealTime'
+), (), 'Balance of an account in a given currency.')
+
+Order = _model('Order', (
+    'id', 'symbol', 'symbolId', 'totalQuantity', 'openQuantity',
+    'filledQuantity', 'canceledQuantity', 'side', 'orderType', 'limitPrice',
+    'stopPrice', 'isAllOrNone', 'isAnonymous', 'icebergQuantity',
+    'minQuantity', 'avgExecPrice', 'lastExecPrice', 'source', 'timeInForce',
+    'gtdDate', 'state', 'clientReasonStr', 'chainId', 'creationTime',
+    'updateTime', 'notes', 'primaryRoute', 'secondaryRoute', 'orderRoute',
+    'venueHoldingOrder', 'comissionCharged', 'exchangeOrderId',
+    'isSignificantShareHolder', 'isInsider', 'isLimitOffsetInDollar',
+    'userId', 'placementCommission', 'legs', 'strategyType',
+    'triggerStopPrice', 'orderGroupId', 'orderClass'
+), ('gtdDate', 'creationTime', 'updateTime'), 'Order placed in an account.')
+
+Execution = _model('Execution', (
+    'symbol', 'symbolId', 'quantity', 'side', 'price', 'id', 'orderId',
+    'orderChainId', 'exchangeExecId', 'timestamp', 'notes', 'venue',
+    'totalCost', 'orderPlacementCommission', 'commission', 'executionFee',
+    'secFee', 'canadianExecutionFee', 'parentId'
+), ('timestamp',), 'Execution of an order.')
+
+Symbol = _model('Symbol', (
+    'symbol', 'symbolId', 'prevDayClosePrice', 'highPrice52',
+    'lowPrice52', 'averageVol3Months', 'averageVol20Days',
+    'outstandingShares', 'eps', 'pe', 'dividend', 'yield', 'exDate',
+    'marketCap', 'tradeUnit', 'optionType', 'optionDurationType',
+    'optionRoot', 'optionContractDeliverables', 'underlyings',
+    'optionExerciseType', 'listingExchange', 'description', 'securityType',
+    'optionExpiryDate', 'dividendDate', 'optionStrikePrice', 'isTradable',
+    'isQuotable', 'hasOptions', 'currency', 'minTicks', 'industrySector',
+    'industryGroup', 'industrySubGroup'
+), ('exDate', 'optionExpiryDate', 'dividendDate'),
+'Detailed information about a symbol.')
+
+OptionChain = _model('OptionChain', (
+    'expiryDate', 'description', 'listingExchange', 'optionExerciseType',
+    'chainPerRoot'
+), ('expiryDate',), 'Options of an underlying expiring on a given date.')
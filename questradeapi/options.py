@@ -0,0 +1,401 @@
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime, time
+
+from . import utils
+from .exceptions import QuestradeAPIError
+
+CALL = 'Call'
+PUT = 'Put'
+
+OptionContract = namedtuple('OptionContract', (
+    'symbol_id', 'option_type', 'expiry', 'strike', 'root', 'multiplier'
+))
+OptionContract.__doc__ = '''Option contract of an option chain.
+
+Attributes
+----------
+symbol_id : :obj:`int`
+    Internal symbol identifier of the option.
+option_type : :obj:`str`, {'Call', 'Put'}
+    Option type.
+expiry : :obj:`date`
+    Expiry date.
+strike : :obj:`float`
+    Strike price.
+root : :obj:`str`
+    Option root symbol.
+multiplier : :obj:`int`
+    Number of shares of the underlying per contract.
+'''
+
+def _as_date(value):
+    '''Converts a date, a datetime or an ISO 8601 string to a date.'''
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value[:10], '%Y-%m-%d').date()
+
+class OptionChainIndex():
+    ''' Index of the contracts of an option chain.
+
+    The expiry dates and, for each expiry date, the strike prices are kept
+    sorted, so that contracts are looked up by expiry and strike range with a
+    binary search instead of walking the nested structure returned by
+    :meth:`questradeapi.Session.get_option_chain`.
+
+    Example
+    -------
+    .. code-block:: python
+
+        index = OptionChainIndex.from_session(sess, 8049)
+        calls = index.select(max_expiry=date(2019, 6, 21), option_type='Call',
+            moneyness='OTM', max_distance=0.1)
+        quotes = index.quote(calls)
+
+    Attributes
+    ----------
+    session : :obj:`questradeapi.Session`
+        Session used to quote the contracts, if any.
+    underlying_id : :obj:`int`
+        Internal symbol identifier of the underlying, if known.
+    expiries : :obj:`list` of :obj:`date`
+        Sorted expiry dates of the chain.
+
+    '''
+
+    QUOTE_CHUNK_SIZE = 100
+
+    def __init__(self, chain, session=None, underlying_id=None):
+        '''Constructor.
+
+        Parameters
+        ----------
+        chain : :obj:`dict` or :obj:`list`
+            Response of :meth:`questradeapi.Session.get_option_chain`, or its
+            list of OptionChain structures.
+        session : :obj:`questradeapi.Session`, optional
+            Session used to quote the contracts and the underlying.
+        underlying_id : :obj:`int`, optional
+            Internal symbol identifier of the underlying, required by the
+            moneyness filters if the underlying price is not specified.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.QuestradeAPIError`
+            If `chain` is an error response.
+
+        '''
+        if isinstance(chain, dict):
+            if 'optionChain' not in chain:
+                raise QuestradeAPIError(chain)
+            chain = chain['optionChain']
+        self.session = session
+        self.underlying_id = underlying_id
+
+        contracts = {}
+        # Expiry dates as returned by the API, to filter contracts by.
+        self._expiry_dates = {}
+        for expiry_chain in chain:
+            expiry = _as_date(expiry_chain['expiryDate'])
+            if isinstance(expiry_chain['expiryDate'], str):
+                self._expiry_dates[expiry] = expiry_chain['expiryDate']
+            rows = contracts.setdefault(expiry, [])
+            for root_chain in expiry_chain['chainPerRoot']:
+                root = root_chain.get('root')
+                multiplier = root_chain.get('multiplier')
+                for strike in root_chain['chainPerStrikePrice']:
+                    rows.append((
+                        strike['strikePrice'], root, multiplier,
+                        strike.get('callSymbolId'), strike.get('putSymbolId')
+                    ))
+        self.expiries = sorted(contracts)
+        self._strikes = []
+        self._rows = []
+        for expiry in self.expiries:
+            rows = sorted(contracts[expiry], key=lambda row: row[0])
+            self._strikes.append([row[0] for row in rows])
+            self._rows.append(rows)
+
+    @classmethod
+    def from_session(cls, session, underlying_id):
+        '''Retrieves and indexes the option chain of an underlying.
+
+        Parameters
+        ----------
+        session : :obj:`questradeapi.Session`
+            Session used to retrieve the chain and quote the contracts.
+        underlying_id : :obj:`int`
+            Internal symbol identifier of the underlying.
+
+        Returns
+        -------
+        :obj:`OptionChainIndex`
+            Index of the option chain.
+
+        '''
+        return cls(session.get_option_chain(underlying_id), session,
+            underlying_id)
+
+    def __len__(self):
+        return sum(
+            (row[3] is not None) + (row[4] is not None)
+            for rows in self._rows for row in rows
+        )
+
+    def expiries_between(self, min_expiry=None, max_expiry=None):
+        '''Lists the expiry dates within a range.
+
+        Parameters
+        ----------
+        min_expiry : :obj:`date`, optional
+            Earliest expiry date, inclusive.
+        max_expiry : :obj:`date`, optional
+            Latest expiry date, inclusive.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`date`
+            Sorted expiry dates.
+
+        '''
+        start, end = self._expiry_slice(min_expiry, max_expiry)
+        return self.expiries[start:end]
+
+    def strikes(self, expiry):
+        '''Lists the strike prices of an expiry date.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`float`
+            Sorted strike prices, repeated for each root they are listed in.
+
+        '''
+        i = bisect_left(self.expiries, _as_date(expiry))
+        if i == len(self.expiries) or self.expiries[i] != _as_date(expiry):
+            return []
+        return list(self._strikes[i])
+
+    def _expiry_slice(self, min_expiry, max_expiry):
+        start = 0 if min_expiry is None \
+            else bisect_left(self.expiries, _as_date(min_expiry))
+        end = len(self.expiries) if max_expiry is None \
+            else bisect_right(self.expiries, _as_date(max_expiry))
+        return start, end
+
+    def underlying_price(self):
+        '''Retrieves the last trade price of the underlying.
+
+        Returns
+        -------
+        :obj:`float`
+            Last trade price of the underlying.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.QuestradeAPIError`
+            If the server returns an error.
+        :obj:`ValueError`
+            If the index has no session or underlying id.
+
+        '''
+        if self.session is None or self.underlying_id is None:
+            raise ValueError(
+                'A session and an underlying id are required to quote the '
+                'underlying.')
+        response = self.session.get_quotes(id=self.underlying_id)
+        if not response.get('quotes'):
+            raise QuestradeAPIError(response)
+        return response['quotes'][0]['lastTradePrice']
+
+    def select(self, min_expiry=None, max_expiry=None, min_strike=None,
+        max_strike=None, option_type=None, moneyness=None, max_distance=None,
+        underlying_price=None):
+        '''Looks up the contracts matching the given criteria.
+
+        Parameters
+        ----------
+        min_expiry : :obj:`date`, optional
+            Earliest expiry date, inclusive.
+        max_expiry : :obj:`date`, optional
+            Latest expiry date, inclusive.
+        min_strike : :obj:`float`, optional
+            Lowest strike price, inclusive.
+        max_strike : :obj:`float`, optional
+            Highest strike price, inclusive.
+        option_type : :obj:`str`, {'Call', 'Put'}, optional
+            Only select calls or puts.
+        moneyness : :obj:`str`, {'ITM', 'OTM'}, optional
+            Only select contracts in or out of the money. Contracts struck at
+            the underlying price are out of the money.
+        max_distance : :obj:`float`, optional
+            Only select strike prices within this fraction of the underlying
+            price, e.g. ``0.1`` for 10% above or below.
+        underlying_price : :obj:`float`, optional
+            Price of the underlying used by the moneyness filters. Retrieved
+            with :meth:`underlying_price` if needed and not specified.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`OptionContract`
+            Contracts sorted by expiry date, strike price and type.
+
+        '''
+        if moneyness not in (None, 'ITM', 'OTM'):
+            raise ValueError("moneyness must be 'ITM' or 'OTM'.")
+        if underlying_price is None and (
+            moneyness is not None or max_distance is not None):
+            underlying_price = self.underlying_price()
+        if max_distance is not None:
+            low = underlying_price * (1 - max_distance)
+            high = underlying_price * (1 + max_distance)
+            min_strike = low if min_strike is None else max(min_strike, low)
+            max_strike = high if max_strike is None else min(max_strike, high)
+        types = (option_type,) if option_type is not None else (CALL, PUT)
+
+        # Narrow the strike range of each type to its moneyness. The strike
+        # equal to the underlying price belongs to the out of the money side.
+        ranges = []
+        for type_ in types:
+            low, high = min_strike, max_strike
+            low_exclusive = high_exclusive = False
+            if moneyness is not None:
+                in_the_money = moneyness == 'ITM'
+                if in_the_money == (type_ == CALL):
+                    high = underlying_price if high is None \
+                        else min(high, underlying_price)
+                    high_exclusive = in_the_money
+                else:
+                    low = underlying_price if low is None \
+                        else max(low, underlying_price)
+                    low_exclusive = in_the_money
+            ranges.append((type_, low, high, low_exclusive, high_exclusive))
+
+        contracts = []
+        start, end = self._expiry_slice(min_expiry, max_expiry)
+        for i in range(start, end):
+            expiry = self.expiries[i]
+            strikes = self._strikes[i]
+            rows = self._rows[i]
+            selected = []
+            for type_, low, high, low_exclusive, high_exclusive in ranges:
+                column = 3 if type_ == CALL else 4
+                first = 0 if low is None else (
+                    bisect_right(strikes, low) if low_exclusive
+                    else bisect_left(strikes, low))
+                last = len(strikes) if high is None else (
+                    bisect_left(strikes, high) if high_exclusive
+                    else bisect_right(strikes, high))
+                for row in rows[first:last]:
+                    if row[column] is not None:
+                        selected.append(OptionContract(
+                            row[column], type_, expiry, row[0], row[1], row[2]))
+            selected.sort(key=lambda contract: (
+                contract.strike, contract.option_type))
+            contracts.extend(selected)
+        return contracts
+
+    def option_id_filters(self, contracts, underlying_id=None):
+        '''Creates the OptionIdFilter structures covering contracts.
+
+        One filter is created per expiry date and option type, spanning the
+        strike prices of the contracts. Filters may therefore cover more
+        contracts than the ones given. Expiry dates are formatted as returned
+        by the API, or as midnight in the local time zone for expiry dates
+        that are not in the chain.
+
+        Parameters
+        ----------
+        contracts : :obj:`list` of :obj:`OptionContract`
+            Contracts to cover.
+        underlying_id : :obj:`int`, optional
+            Internal symbol identifier of the underlying. Defaults to the one
+            of the index.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`dict`
+            OptionIdFilter structures, see
+            :func:`questradeapi.utils.create_option_id_filter`.
+
+        '''
+        underlying_id = underlying_id or self.underlying_id
+        bounds = {}
+        for contract in contracts:
+            key = (contract.expiry, contract.option_type)
+            low, high = bounds.get(key, (contract.strike, contract.strike))
+            bounds[key] = (min(low, contract.strike), max(high, contract.strike))
+        return [
+            utils.create_option_id_filter(
+                option_type, underlying_id, self._expiry_date(expiry), low,
+                high)
+            for (expiry, option_type), (low, high) in sorted(bounds.items())
+        ]
+
+    def _expiry_date(self, expiry):
+        '''Formats an expiry date as an ISO 8601 datetime with an offset.'''
+        if expiry in self._expiry_dates:
+            return self._expiry_dates[expiry]
+        return datetime.combine(expiry, time()).astimezone().isoformat()
+
+    def quote(self, contracts, chunk_size=None):
+        '''Retrieves the quotes of contracts.
+
+        The contracts are split in chunks quoted concurrently with
+        :meth:`questradeapi.Session.get_quotes_options`.
+
+        Parameters
+        ----------
+        contracts : :obj:`list` of :obj:`OptionContract` or :obj:`int`
+            Contracts, or internal symbol identifiers of options.
+        chunk_size : :obj:`int`, optional
+            Number of contracts per request. Defaults to
+            :attr:`QUOTE_CHUNK_SIZE`.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`dict`
+            Option quote structures, in the order of the contracts.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.QuestradeAPIError`
+            If the server returns an error for one of the chunks.
+
+        '''
+        if self.session is None:
+            raise ValueError('A session is required to quote contracts.')
+        chunk_size = chunk_size or self.QUOTE_CHUNK_SIZE
+        ids = list(OrderedDict.fromkeys(
+            getattr(contract, 'symbol_id', contract) for contract in contracts))
+        chunks = [
+            ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)
+        ]
+        quotes = []
+        responses = self.session._map(
+            lambda chunk: self.session.get_quotes_options(ids=chunk), chunks)
+        for response in responses:
+            if 'optionQuotes' not in response:
+                raise QuestradeAPIError(response)
+            quotes.extend(response['optionQuotes'])
+        return quotes
+
+    def quote_slice(self, chunk_size=None, **criteria):
+        '''Looks up the contracts matching criteria and retrieves their
+        quotes. See :meth:`select` and :meth:`quote`.
+
+        Parameters
+        ----------
+        chunk_size : :obj:`int`, optional
+            Number of contracts per request.
+        **criteria
+            Criteria passed to :meth:`select`.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`dict`
+            Option quote structures, in the order of the contracts.
+
+        '''
+        return self.quote(self.select(**criteria), chunk_size)
@@ -0,0 +1,280 @@
+import threading
+from collections import namedtuple
+
+import requests
+
+from .exceptions import CircuitOpenError, QuestradeAPIError
+
+OrderResult = namedtuple('OrderResult', (
+    'spec', 'status', 'response', 'impact', 'error'
+))
+OrderResult.__doc__ = '''Outcome of an order of a :obj:`OrderBatch`.
+
+Attributes
+----------
+spec : :obj:`dict`
+    Specification of the order.
+status : :obj:`str`, {'placed', 'failed', 'rejected', 'skipped', 'canceled'}
+    Whether the order was placed, failed to be placed, failed its impact
+    check, was not sent because another order failed, or was placed and then
+    canceled because another order failed.
+response : :obj:`dict`
+    Response to the order placement, if it was sent.
+impact : :obj:`dict`
+    Response to the impact check, if it was performed.
+error : :obj:`Exception`
+    Error of the impact check, placement or cancellation, if any.
+'''
+
+CancelResult = namedtuple('CancelResult', (
+    'account_id', 'order_id', 'response', 'error'
+))
+CancelResult.__doc__ = '''Outcome of the cancellation of an order.
+
+Attributes
+----------
+account_id : :obj:`str`
+    Account number.
+order_id : :obj:`int`
+    Internal identifier of the order.
+response : :obj:`dict`
+    Response to the cancellation, if it was sent.
+error : :obj:`Exception`
+    Error of the cancellation, if any.
+'''
+
+_ERRORS = (requests.exceptions.RequestException, QuestradeAPIError,
+    CircuitOpenError)
+
+def cancel_orders(session, orders):
+    ''' Cancels orders concurrently.
+
+    Parameters
+    ----------
+    session : :obj:`questradeapi.Session`
+        Session used to cancel the orders.
+    orders : :obj:`list` of :obj:`tuple`
+        Account number and internal identifier of each order.
+
+    Returns
+    -------
+    :obj:`list` of :obj:`CancelResult`
+        Outcome of each cancellation, in the order of `orders`.
+
+    '''
+    def cancel(order):
+        account_id, order_id = order
+        try:
+            response = session.delete_order(account_id, order_id)
+        except _ERRORS as e:
+            return CancelResult(account_id, order_id, None, e)
+        if 'orderId' not in response:
+            return CancelResult(account_id, order_id, response,
+                QuestradeAPIError(response))
+        return CancelResult(account_id, order_id, response, None)
+    return list(session._map(cancel, orders))
+
+class OrderBatch():
+    ''' Batch of orders submitted concurrently.
+
+    Each order is specified by a :obj:`dict` of the keyword arguments of the
+    :obj:`questradeapi.Session` method placing it, and an optional ``'type'``
+    key selecting the method:
+
+    * ``'order'`` (default): :meth:`questradeapi.Session.post_order`,
+    * ``'bracket'``: :meth:`questradeapi.Session.post_bracket_order`, with
+      components created by
+      :func:`questradeapi.utils.create_bracket_order_component`,
+    * ``'strategy'``:
+      :meth:`questradeapi.Session.post_multi_leg_strategy_order`, with legs
+      created by :func:`questradeapi.utils.create_insert_order_leg_data`.
+
+    Orders are sent on the session's executor, so at most `max_workers` are in
+    flight at once, and the session's rate limiter keeps them within the
+    account calls quota.
+
+    Example
+    -------
+    .. code-block:: python
+
+        batch = OrderBatch(sess, [
+            dict(account_id='26598145', symbol_id=8049, quantity=10,
+                iceberg_quantity=None, limit_price=150, stop_price=None,
+                all_or_none=False, anonymous=False, order_type='Limit',
+                time_in_force='Day', action='Buy', primary_route='AUTO',
+                secondary_route='AUTO'),
+            dict(type='bracket', account_id='26598145', symbol_id=9291,
+                primary_route='AUTO', secondary_route='AUTO',
+                components=components),
+        ])
+        for result in batch.submit(check_impact=True, cancel_on_failure=True):
+            print(result.status, result.error)
+
+    Attributes
+    ----------
+    session : :obj:`questradeapi.Session`
+        Session used to submit the orders.
+    specs : :obj:`list` of :obj:`dict`
+        Specifications of the orders.
+    results : :obj:`list` of :obj:`OrderResult`
+        Outcome of each order after :meth:`submit`.
+
+    '''
+
+    METHODS = {
+        'order': 'post_order',
+        'bracket': 'post_bracket_order',
+        'strategy': 'post_multi_leg_strategy_order',
+    }
+
+    def __init__(self, session, specs):
+        '''Constructor.
+
+        Parameters
+        ----------
+        session : :obj:`questradeapi.Session`
+            Session used to submit the orders.
+        specs : :obj:`list` of :obj:`dict`
+            Specifications of the orders.
+
+        Raises
+        ------
+        :obj:`ValueError`
+            If a specification has an unknown type, or an ``'impact'`` key:
+            impacts are checked with :meth:`check_impact`.
+
+        '''
+        for spec in specs:
+            if spec.get('type', 'order') not in self.METHODS:
+                raise ValueError('Unknown order type {!r}.'.format(
+                    spec['type']))
+            if 'impact' in spec:
+                raise ValueError(
+                    "Order specifications cannot have an 'impact' key, use "
+                    "check_impact instead.")
+        self.session = session
+        self.specs = list(specs)
+        self.results = []
+
+    def _send(self, spec, impact):
+        '''Sends an order or its impact check.
+
+        Returns
+        -------
+        :obj:`tuple`
+            Response, if any, and error, if any.
+
+        '''
+        kwargs = dict(spec)
+        method = getattr(self.session, self.METHODS[kwargs.pop('type', 'order')])
+        try:
+            response = method(impact=impact, **kwargs)
+        except _ERRORS as e:
+            return None, e
+        # Placements list the orders created, impact checks do not.
+        if 'code' in response or not (impact or 'orders' in response):
+            return response, QuestradeAPIError(response)
+        return response, None
+
+    def check_impact(self):
+        '''Checks the impact of every order concurrently, without placing
+        them.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`tuple`
+            Response, if any, and error, if any, of each impact check.
+
+        '''
+        return list(self.session._map(
+            lambda spec: self._send(spec, True), self.specs))
+
+    def submit(self, check_impact=False, cancel_on_failure=False):
+        '''Places the orders concurrently.
+
+        Parameters
+        ----------
+        check_impact : :obj:`bool`, optional
+            Check the impact of every order first, and place none of them if
+            any check fails.
+        cancel_on_failure : :obj:`bool`, optional
+            If an order fails, stop sending the orders not sent yet and
+            cancel the orders already placed.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`OrderResult`
+            Outcome of each order, in the order of the specifications.
+
+        '''
+        impacts = [(None, None)] * len(self.specs)
+        if check_impact:
+            impacts = self.check_impact()
+            if any(error is not None for _, error in impacts):
+                self.results = [
+                    OrderResult(spec, 'rejected' if error else 'skipped',
+                        None, impact, error)
+                    for spec, (impact, error) in zip(self.specs, impacts)
+                ]
+                return self.results
+
+        failed = threading.Event()
+
+        def place(spec):
+            if cancel_on_failure and failed.is_set():
+                return None, None, False
+            response, error = self._send(spec, False)
+            if error is not None:
+                failed.set()
+            return response, error, True
+
+        placements = list(self.session._map(place, self.specs))
+        results = []
+        for spec, (impact, _), (response, error, sent) in zip(
+            self.specs, impacts, placements):
+            if not sent:
+                status = 'skipped'
+            elif error is not None:
+                status = 'failed'
+            else:
+                status = 'placed'
+            results.append(OrderResult(spec, status, response, impact, error))
+        self.results = results
+
+        if cancel_on_failure and failed.is_set():
+            self.cancel()
+        return self.results
+
+    def cancel(self):
+        '''Cancels the orders of the batch that were placed.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`CancelResult`
+            Outcome of each cancellation.
+
+        '''
+        orders = []
+        for result in self.results:
+            if result.status == 'placed':
+                account_id = result.spec['account_id']
+                for order in result.response['orders']:
+                    orders.append((account_id, order['id']))
+        cancellations = cancel_orders(self.session, orders)
+        errors = {
+            (c.account_id, c.order_id): c.error for c in cancellations
+        }
+        for i, result in enumerate(self.results):
+            if result.status != 'placed':
+                continue
+            account_id = result.spec['account_id']
+            error = next((
+                errors[(account_id, order['id'])]
+                for order in result.response['orders']
+                if errors[(account_id, order['id'])] is not None
+            ), None)
+            if error is None:
+                self.results[i] = result._replace(status='canceled')
+            else:
+                self.results[i] = result._replace(error=error)
+        return cancellations
@@ -0,0 +1,454 @@
+'''
+Distribution of Level 1 quotes to several processes through shared memory.
+
+A single :obj:`QuotePublisher` owns a :obj:`questradeapi.Session` and writes
+the quotes it polls or streams into a :obj:`QuoteBoard`: a memory-mapped file
+with one fixed-size slot per symbol. Any number of processes open the same
+file and read the latest quotes from it, without sending any request, so the
+quota is used once whatever the number of readers.
+
+Each slot is guarded by a sequence counter (a seqlock): the writer makes it
+odd while the slot is being written and even again once done, and readers
+retry until they read the same even value before and after the quote.
+'''
+
+import mmap
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from . import columnar, models
+from .columnar import NAT, QUOTE_COLUMNS, timestamp_ns
+from .exceptions import CircuitOpenError, QuestradeAPIError
+from .stream import QuoteStream
+
+MAGIC = b'QTQB'
+VERSION = 1
+
+# Symbols longer than this are truncated.
+SYMBOL_SIZE = 16
+
+_CODES = {'f8': 'd', 'i8': 'q', 'ns': 'q', 'bool': '?', 'str': '{}s'.format(
+    SYMBOL_SIZE)}
+_HEADER = struct.Struct('<4sIII')
+_COUNTER = struct.Struct('<Q')
+_TIMESTAMP = struct.Struct('<q')
+_QUOTE = struct.Struct('<' + ''.join(_CODES[kind] for _, kind in QUOTE_COLUMNS))
+_SYMBOL_ID = [name for name, _ in QUOTE_COLUMNS].index('symbolId')
+
+# Offsets of the header fields: layout, number of used slots, and time of the
+# last publication.
+_COUNT_OFFSET = 16
+_HEARTBEAT_OFFSET = 24
+HEADER_SIZE = 64
+# Slots are aligned on cache lines, so that writing a slot does not slow down
+# the readers of its neighbours.
+SLOT_SIZE = -(-(_COUNTER.size + _QUOTE.size) // 64) * 64
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MISSING = {'f8': float('nan'), 'i8': 0, 'bool': False}
+_ERRORS = (requests.exceptions.RequestException, QuestradeAPIError,
+    CircuitOpenError)
+
+def _now_ns():
+    return int(time.time() * 1e9)
+
+def _pack(quote):
+    '''Returns the values of a quote structure stored in a slot.'''
+    values = []
+    for name, kind in QUOTE_COLUMNS:
+        value = quote.get(name)
+        if kind == 'ns':
+            value = timestamp_ns(value)
+        elif kind == 'str':
+            value = (value or '').encode('utf-8')[:SYMBOL_SIZE]
+        elif value is None:
+            value = _MISSING[kind]
+        values.append(value)
+    return values
+
+def _unpack(values):
+    '''Returns the quote structure of the values read from a slot.'''
+    quote = {}
+    for (name, kind), value in zip(QUOTE_COLUMNS, values):
+        if kind == 'str':
+            value = value.rstrip(b'\0').decode('utf-8', 'replace')
+        elif kind == 'ns':
+            value = None if value == NAT else (
+                _EPOCH + timedelta(microseconds=value // 1000)).isoformat()
+        elif kind == 'f8' and value != value:
+            value = None
+        quote[name] = value
+    return quote
+
+class QuoteBoard():
+    ''' Latest Level 1 quotes of a set of symbols, in a memory-mapped file
+    shared by several processes.
+
+    A board is created once with :meth:`create`, then opened by path in each
+    process. Only the fields of :data:`questradeapi.columnar.QUOTE_COLUMNS`
+    are kept. Quotes are read straight from the shared mapping, without any
+    copy of the file or any request to the server.
+
+    A board has a single writer: quotes are published by one process, usually
+    with a :obj:`QuotePublisher`. Reads and writes never block each other; a
+    read overlapping a write of the same slot is retried.
+
+    Example
+    -------
+    .. code-block:: python
+
+        # Owner process.
+        board = QuoteBoard.create('/dev/shm/quotes', capacity=500)
+        QuotePublisher(sess, board, ids).start()
+
+        # Worker processes.
+        board = QuoteBoard('/dev/shm/quotes')
+        quote = board.get(8049)
+        if quote is not None and board.age() < 5:
+            print(quote['bidPrice'], quote['askPrice'])
+
+    Attributes
+    ----------
+    path : :obj:`str`
+        Path of the file.
+    capacity : :obj:`int`
+        Maximum number of symbols.
+    writable : :obj:`bool`
+        Whether quotes can be published with this instance.
+
+    '''
+
+    # Number of attempts to read a slot before yielding the CPU to the writer,
+    # and number of seconds before giving up on a writer stuck mid-write.
+    SPIN = 100
+    READ_TIMEOUT = 1.0
+
+    def __init__(self, path, writable=False):
+        '''Constructor.
+
+        Parameters
+        ----------
+        path : :obj:`str`
+            Path of a file created by :meth:`create`.
+        writable : :obj:`bool`, optional
+            Open the board to publish quotes.
+
+        Raises
+        ------
+        :obj:`ValueError`
+            If the file is not a board of this version of the library.
+
+        '''
+        self.path = path
+        self.writable = writable
+        with open(path, 'r+b' if writable else 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0,
+                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, capacity, slot_size = _HEADER.unpack_from(self._mmap)
+        if (magic, version, slot_size) != (MAGIC, VERSION, SLOT_SIZE) \
+            or len(self._mmap) < HEADER_SIZE + capacity * SLOT_SIZE:
+            self._mmap.close()
+            raise ValueError('{} is not a quote board of version {}.'.format(
+                path, VERSION))
+        self.capacity = capacity
+        self._slots = {}
+        self._scanned = 0
+        self._lock = threading.Lock()
+        self._index()
+
+    @classmethod
+    def create(cls, path, capacity):
+        '''Creates an empty board, replacing any file at `path`.
+
+        Parameters
+        ----------
+        path : :obj:`str`
+            Path of the file. A path on a memory file system, such as
+            ``/dev/shm`` on Linux, avoids any disk write.
+        capacity : :obj:`int`
+            Maximum number of symbols.
+
+        Returns
+        -------
+        :obj:`QuoteBoard`
+            Writable board.
+
+        '''
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, capacity, SLOT_SIZE))
+            f.truncate(HEADER_SIZE + capacity * SLOT_SIZE)
+        return cls(path, writable=True)
+
+    def close(self):
+        '''Unmaps the file.'''
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return _COUNTER.unpack_from(self._mmap, _COUNT_OFFSET)[0]
+
+    def _read(self, slot):
+        '''Reads the values of a slot consistently.'''
+        buffer = self._mmap
+        offset = HEADER_SIZE + slot * SLOT_SIZE
+        attempts = 0
+        deadline = None
+        while True:
+            sequence = _COUNTER.unpack_from(buffer, offset)[0]
+            if not sequence & 1:
+                values = _QUOTE.unpack_from(buffer, offset + _COUNTER.size)
+                if _COUNTER.unpack_from(buffer, offset)[0] == sequence:
+                    return values
+            attempts += 1
+            if attempts % self.SPIN == 0:
+                if deadline is None:
+                    deadline = time.monotonic() + self.READ_TIMEOUT
+                elif time.monotonic() > deadline:
+                    raise TimeoutError(
+                        'Slot {} of {} is stuck being written.'.format(
+                            slot, self.path))
+                time.sleep(0)
+
+    def _index(self):
+        '''Maps the symbols published since the last call to their slots.'''
+        count = len(self)
+        for slot in range(self._scanned, count):
+            self._slots[self._read(slot)[_SYMBOL_ID]] = slot
+        self._scanned = count
+
+    def _slot(self, symbol_id):
+        slot = self._slots.get(symbol_id)
+        if slot is None:
+            # The symbol may have been published since the board was opened.
+            self._index()
+            slot = self._slots.get(symbol_id)
+        return slot
+
+    def ids(self):
+        '''Returns the internal identifiers of the symbols published, in the
+        order they were first published.'''
+        self._index()
+        return sorted(self._slots, key=self._slots.get)
+
+    def age(self):
+        '''Returns the number of seconds since quotes were last published, or
+        ``None`` if they never were.'''
+        published = _TIMESTAMP.unpack_from(self._mmap, _HEARTBEAT_OFFSET)[0]
+        if not published:
+            return None
+        return (_now_ns() - published) / 1e9
+
+    def get(self, symbol_id):
+        '''Reads the latest quote of a symbol.
+
+        Parameters
+        ----------
+        symbol_id : :obj:`int`
+            Internal symbol identifier.
+
+        Returns
+        -------
+        :obj:`dict`
+            Quote structure, restricted to the fields of
+            :data:`questradeapi.columnar.QUOTE_COLUMNS`, or ``None`` if no
+            quote was published for the symbol.
+
+        '''
+        slot = self._slot(int(symbol_id))
+        if slot is None:
+            return None
+        return _unpack(self._read(slot))
+
+    def get_quotes(self, id=None, ids=None, format=None):
+        '''Reads the latest quotes of symbols, like
+        :meth:`questradeapi.Session.get_quotes`.
+
+        Parameters
+        ----------
+        id : :obj:`int`, optional
+            Internal symbol identifier. Mutually exclusive with `ids`.
+        ids : :obj:`list` of :obj:`int`, optional
+            List of internal symbol identifiers. Defaults to every symbol
+            published.
+        format : :obj:`str`, {'objects', 'numpy', 'pandas', 'arrow'}, optional
+            Returns :obj:`questradeapi.models.Quote` objects or a columnar
+            structure, see :mod:`questradeapi.columnar`, instead of the
+            response.
+
+        Returns
+        -------
+        :obj:`dict`
+            Response with the ``'quotes'`` published, in the order of `ids`.
+            Symbols without quotes are left out.
+
+        '''
+        if id is not None:
+            ids = [id]
+        elif ids is None:
+            ids = self.ids()
+        quotes = [quote for quote in map(self.get, ids) if quote is not None]
+        if format is None:
+            return {'quotes': quotes}
+        if format == models.FORMAT:
+            return models.Quote.from_list(quotes)
+        return columnar.convert_quotes(quotes, format)
+
+    def publish(self, quotes):
+        '''Writes quotes to their symbols' slots.
+
+        Parameters
+        ----------
+        quotes : :obj:`list` of :obj:`dict`
+            Quote structures, as returned by
+            :meth:`questradeapi.Session.get_quotes`.
+
+        Raises
+        ------
+        :obj:`ValueError`
+            If the board is full or not writable.
+
+        '''
+        if not self.writable:
+            raise ValueError('{} is opened read-only.'.format(self.path))
+        buffer = self._mmap
+        with self._lock:
+            self._index()
+            new = {quote['symbolId'] for quote in quotes} - set(self._slots)
+            if len(self._slots) + len(new) > self.capacity:
+                raise ValueError(
+                    'Cannot publish {} more symbols to {}, full at {}.'.format(
+                        len(new), self.path, self.capacity))
+            for quote in quotes:
+                slot = self._slots.get(quote['symbolId'])
+                if slot is None:
+                    slot = self._slots[quote['symbolId']] = len(self._slots)
+                offset = HEADER_SIZE + slot * SLOT_SIZE
+                sequence = _COUNTER.unpack_from(buffer, offset)[0]
+                _COUNTER.pack_into(buffer, offset, sequence + 1)
+                _QUOTE.pack_into(buffer, offset + _COUNTER.size, *_pack(quote))
+                _COUNTER.pack_into(buffer, offset, sequence + 2)
+            if new:
+                # New slots are written before readers are told about them.
+                self._scanned = len(self._slots)
+                _COUNTER.pack_into(buffer, _COUNT_OFFSET, self._scanned)
+            _TIMESTAMP.pack_into(buffer, _HEARTBEAT_OFFSET, _now_ns())
+
+class QuotePublisher():
+    ''' Publishes the quotes of a session to a :obj:`QuoteBoard`.
+
+    Quotes are either polled with :meth:`questradeapi.Session.get_quotes`
+    every `interval` seconds, in a background thread started by :meth:`start`,
+    or received from a :obj:`questradeapi.QuoteStream` with :meth:`stream`.
+
+    Polling errors do not stop the publisher: the quotes of the failed poll
+    are left as they were, and readers can tell from
+    :meth:`QuoteBoard.age` that they are getting old.
+
+    Attributes
+    ----------
+    session : :obj:`questradeapi.Session`
+        Session used to retrieve the quotes.
+    board : :obj:`QuoteBoard`
+        Writable board the quotes are published to.
+    ids : :obj:`list` of :obj:`int`
+        Internal identifiers of the symbols.
+    interval : :obj:`float`
+        Number of seconds between two polls.
+    errors : :obj:`int`
+        Number of failed polls.
+
+    '''
+
+    def __init__(self, session, board, ids, interval=1.0):
+        '''Constructor.
+
+        Parameters
+        ----------
+        session : :obj:`questradeapi.Session`
+            Session used to retrieve the quotes.
+        board : :obj:`QuoteBoard` or :obj:`str`
+            Writable board, or path of a board to open for writing.
+        ids : :obj:`list` of :obj:`int`
+            Internal identifiers of the symbols.
+        interval : :obj:`float`, optional
+            Number of seconds between two polls.
+
+        '''
+        if not isinstance(board, QuoteBoard):
+            board = QuoteBoard(board, writable=True)
+        self.session = session
+        self.board = board
+        self.ids = list(ids)
+        self.interval = interval
+        self.errors = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        '''Retrieves the quotes once and publishes them.
+
+        Returns
+        -------
+        :obj:`int`
+            Number of quotes published.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.QuestradeAPIError`
+            If the server returns an error.
+
+        '''
+        response = self.session.get_quotes(ids=self.ids)
+        if 'quotes' not in response:
+            raise QuestradeAPIError(response)
+        self.board.publish(response['quotes'])
+        return len(response['quotes'])
+
+    def _run(self):
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            try:
+                self.poll()
+            except _ERRORS:
+                self.errors += 1
+            self._stopped.wait(
+                max(self.interval - (time.monotonic() - started), 0))
+
+    def start(self):
+        '''Polls the quotes in a background thread until :meth:`stop` is
+        called.'''
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        '''Stops polling, waiting for the poll in progress.'''
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    async def stream(self, **kwargs):
+        '''Publishes the quotes received from a
+        :obj:`questradeapi.QuoteStream` until the stream is closed.
+
+        Parameters
+        ----------
+        **kwargs
+            Additional keyword arguments passed to the stream.
+
+        '''
+        stream = QuoteStream(self.session, self.ids, **kwargs)
+        stream.subscribe(lambda quote: self.board.publish([quote]))
+        await stream.run()
@@ -0,0 +1,235 @@
+import threading
+import time
+
+class TokenBucket():
+    ''' A thread-safe token bucket pacing requests at a given rate.
+
+    Attributes
+    ----------
+    rate : :obj:`float`
+        Number of tokens added to the bucket every second.
+    capacity : :obj:`float`
+        Maximum number of tokens the bucket can hold, i.e. the largest burst
+        allowed through without waiting.
+
+    '''
+
+    def __init__(self, rate, capacity=None):
+        '''Constructor.
+
+        Parameters
+        ----------
+        rate : :obj:`float`
+            Number of tokens added to the bucket every second.
+        capacity : :obj:`float`, optional
+            Maximum number of tokens the bucket can hold. Defaults to `rate`.
+
+        '''
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        '''Takes a token from the bucket.
+
+        Tokens are handed out in arrival order: when the bucket is empty the
+        token is borrowed against future refills and the caller is told how
+        long to wait for it.
+
+        Returns
+        -------
+        :obj:`float`
+            Number of seconds the caller must wait before using the token.
+
+        '''
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(-self._tokens / self.rate, self._blocked_until - now)
+            return max(wait, 0)
+
+    def acquire(self):
+        '''Takes a token from the bucket, waiting for it if needed.
+
+        Returns
+        -------
+        :obj:`float`
+            Number of seconds spent waiting.
+
+        '''
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def block(self, seconds):
+        '''Prevents tokens from being used for the given number of seconds.'''
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0)
+            self._blocked_until = max(self._blocked_until, now + seconds)
+
+class RateLimiter():
+    ''' Client-side rate limiter following Questrade's request quotas.
+
+    Questrade enforces separate quotas for account calls and market data
+    calls. Each category is paced by its own :obj:`TokenBucket` at the
+    documented per-second limit. The ``X-RateLimit-Remaining`` and
+    ``X-RateLimit-Reset`` response headers report the hourly quota: requests
+    keep the per-second pace while the quota allows it, the last requests of
+    the quota are spread until it resets, and none are sent once it is used
+    up.
+
+    Attributes
+    ----------
+    buckets : :obj:`dict`
+        :obj:`TokenBucket` of each category.
+    throttled_time : :obj:`dict`
+        Total number of seconds requests of each category waited on the
+        limiter.
+    throttled_requests : :obj:`dict`
+        Number of requests of each category that had to wait.
+
+    '''
+
+    ACCOUNT = 'account'
+    MARKET = 'market'
+
+    LIMITS = {
+        ACCOUNT: 30,
+        MARKET: 20
+    }
+
+    # Number of seconds requests wait after exceeding the per-second limit,
+    # unless the response has a ``Retry-After`` header.
+    THROTTLE_BACKOFF = 1
+
+    def __init__(self, limits=None):
+        '''Constructor.
+
+        Parameters
+        ----------
+        limits : :obj:`dict`, optional
+            Maximum number of requests per second of each category. Defaults
+            to :attr:`LIMITS`.
+
+        '''
+        self.limits = dict(self.LIMITS)
+        self.limits.update(limits or {})
+        self.buckets = {
+            category: TokenBucket(rate)
+            for category, rate in self.limits.items()
+        }
+        self.throttled_time = dict.fromkeys(self.limits, 0.0)
+        self.throttled_requests = dict.fromkeys(self.limits, 0)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def classify(cls, endpoint):
+        '''Returns the quota category of an endpoint.
+
+        Parameters
+        ----------
+        endpoint : :obj:`str`
+            The webservice endpoint.
+
+        Returns
+        -------
+        :obj:`str`
+            Either :attr:`MARKET` or :attr:`ACCOUNT`.
+
+        '''
+        endpoint = endpoint.lstrip('/')
+        if endpoint.startswith(('v1/markets', 'v1/symbols')):
+            return cls.MARKET
+        return cls.ACCOUNT
+
+    def acquire(self, endpoint):
+        '''Waits until a request to the given endpoint can be sent.
+
+        Parameters
+        ----------
+        endpoint : :obj:`str`
+            The webservice endpoint the request is sent to.
+
+        Returns
+        -------
+        :obj:`float`
+            Number of seconds spent waiting.
+
+        '''
+        category = self.classify(endpoint)
+        waited = self.buckets[category].acquire()
+        if waited > 0:
+            with self._lock:
+                self.throttled_time[category] += waited
+                self.throttled_requests[category] += 1
+        return waited
+
+    def update(self, endpoint, status_code, headers):
+        '''Tunes the limiter from the response to a request.
+
+        Parameters
+        ----------
+        endpoint : :obj:`str`
+            The webservice endpoint the request was sent to.
+        status_code : :obj:`int`
+            HTTP status of the response.
+        headers : :obj:`dict`
+            Headers of the response.
+
+        '''
+        category = self.classify(endpoint)
+        bucket = self.buckets[category]
+        try:
+            remaining = int(headers['X-RateLimit-Remaining'])
+            reset_in = max(float(headers['X-RateLimit-Reset']) - time.time(), 0)
+        except (KeyError, TypeError, ValueError):
+            remaining, reset_in = None, None
+
+        limit = self.limits[category]
+        if remaining == 0:
+            # The hourly quota is used up.
+            bucket.block(reset_in if reset_in else self.THROTTLE_BACKOFF)
+        elif status_code == 429:
+            # The quota is not used up: the per-second limit was exceeded.
+            try:
+                backoff = float(headers['Retry-After'])
+            except (KeyError, TypeError, ValueError):
+                backoff = self.THROTTLE_BACKOFF
+            bucket.block(backoff)
+        elif remaining is not None and remaining < limit and reset_in > 0:
+            # Less than a second of requests is left at the full pace.
+            bucket.rate = min(limit, remaining / reset_in)
+        else:
+            bucket.rate = limit
+
+    def stats(self):
+        '''Returns the throttling metrics of each category.
+
+        Returns
+        -------
+        :obj:`dict`
+            Dictionary mapping each category to its ``throttled_time``,
+            ``throttled_requests`` and current ``rate``.
+
+        '''
+        with self._lock:
+            return {
+                category: {
+                    'throttled_time': self.throttled_time[category],
+                    'throttled_requests': self.throttled_requests[category],
+                    'rate': self.buckets[category].rate
+                }
+                for category in self.limits
+            }
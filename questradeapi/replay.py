@@ -0,0 +1,275 @@
+'''
+Recording and replay of the HTTP traffic of a :obj:`questradeapi.Session`.
+
+A :obj:`RecordingTransport` captures the requests sent by a session and the
+responses received to a cassette file, with the tokens scrubbed. A
+:obj:`ReplayTransport` serves these responses back, so that sessions can be
+exercised offline, e.g. in tests and benchmarks.
+'''
+
+import gzip
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+SCRUBBED = '***'
+
+# Secrets scrubbed from request parameters and response bodies.
+SECRET_PARAMS = ('refresh_token',)
+SECRET_FIELDS = ('access_token', 'refresh_token')
+# Response headers not worth recording.
+IGNORED_HEADERS = ('Set-Cookie', 'Date')
+
+def _key(method, url, params, body=None):
+    '''Identifies a request regardless of the API server it was sent to and
+    of the secrets it holds.'''
+    params = {
+        name: SCRUBBED if name in SECRET_PARAMS else value
+        for name, value in (params or {}).items()
+        if value is not None
+    }
+    key = '{} {} {}'.format(
+        method.upper(),
+        urlparse(url).path.lstrip('/'),
+        json.dumps(params, sort_keys=True, default=str)
+    )
+    if body is not None:
+        key += ' ' + json.dumps(body, sort_keys=True, default=str)
+    return key
+
+def _scrub(content):
+    '''Replaces the tokens of a response body.'''
+    try:
+        data = json.loads(content.decode('utf-8'))
+    except ValueError:
+        return content.decode('utf-8', 'replace')
+    if isinstance(data, dict) and any(name in data for name in SECRET_FIELDS):
+        for name in SECRET_FIELDS:
+            if name in data:
+                data[name] = SCRUBBED
+        return json.dumps(data)
+    return content.decode('utf-8')
+
+def load_cassette(path):
+    '''Reads the interactions of a cassette file.
+
+    Parameters
+    ----------
+    path : :obj:`str`
+        Path of the gzip-compressed cassette.
+
+    Returns
+    -------
+    :obj:`list` of :obj:`dict`
+        Recorded interactions.
+
+    '''
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)['interactions']
+
+def save_cassette(path, interactions):
+    '''Writes interactions to a cassette file.
+
+    Parameters
+    ----------
+    path : :obj:`str`
+        Path of the gzip-compressed cassette.
+    interactions : :obj:`list` of :obj:`dict`
+        Recorded interactions.
+
+    '''
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump({'version': 1, 'interactions': interactions}, f,
+            separators=(',', ':'))
+
+class RecordingTransport():
+    ''' Transport recording the traffic of a session.
+
+    Requests are performed by an underlying transport. Each request and its
+    response are recorded, without the ``Authorization`` header, the refresh
+    token parameter and the tokens returned by the login server.
+
+    Example
+    -------
+    .. code-block:: python
+
+        transport = RecordingTransport(path='questrade.cassette.gz')
+        with Session(refresh_token, transport=transport) as sess:
+            sess.get_accounts()
+        # The cassette is written when the session closes the transport.
+
+    Attributes
+    ----------
+    transport : :obj:`requests.Session`
+        Transport performing the requests.
+    path : :obj:`str`
+        Path of the cassette written by :meth:`close`, if any.
+    interactions : :obj:`list` of :obj:`dict`
+        Recorded interactions.
+
+    '''
+
+    def __init__(self, transport=None, path=None):
+        '''Constructor.
+
+        Parameters
+        ----------
+        transport : :obj:`requests.Session`, optional
+            Transport performing the requests. Defaults to a new
+            :obj:`requests.Session`.
+        path : :obj:`str`, optional
+            Path of the cassette written by :meth:`close`.
+
+        '''
+        self.transport = transport or requests.Session()
+        self.path = path
+        self.interactions = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, params=None, **kwargs):
+        r = self.transport.request(method, url, params=params, **kwargs)
+        interaction = {
+            'key': _key(method, url, params, kwargs.get('json')),
+            'status': r.status_code,
+            'headers': {
+                name: value for name, value in r.headers.items()
+                if name not in IGNORED_HEADERS
+            },
+            'body': _scrub(r.content or b''),
+            'elapsed': r.elapsed.total_seconds()
+                if getattr(r, 'elapsed', None) is not None else 0,
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+        return r
+
+    def save(self, path=None):
+        '''Writes the recorded interactions to a cassette file.
+
+        Parameters
+        ----------
+        path : :obj:`str`, optional
+            Path of the cassette. Defaults to :attr:`path`.
+
+        '''
+        with self._lock:
+            save_cassette(path or self.path, list(self.interactions))
+
+    def close(self):
+        '''Closes the underlying transport and writes the cassette, if a path
+        was given.'''
+        self.transport.close()
+        if self.path is not None:
+            self.save()
+
+class ReplayResponse():
+    ''' Response served by a :obj:`ReplayTransport`, exposing the subset of
+    the :obj:`requests.Response` interface used by sessions.'''
+
+    def __init__(self, status_code, headers, content, elapsed, url=None):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.elapsed = timedelta(seconds=elapsed)
+        self.url = url
+        self.request = None
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+class ReplayTransport():
+    ''' Transport serving responses recorded by a :obj:`RecordingTransport`.
+
+    Requests are matched to recorded ones by method, path, parameters and
+    JSON body, ignoring the API server and the scrubbed secrets. When a request was
+    recorded several times, the recorded responses are served in turn, in a
+    loop.
+
+    Example
+    -------
+    .. code-block:: python
+
+        transport = ReplayTransport('questrade.cassette.gz', latency=0.05)
+        sess = Session('any refresh token', transport=transport)
+        sess.get_accounts()
+
+    Attributes
+    ----------
+    latency : :obj:`float`
+        Number of seconds each response is delayed by, or ``None`` to delay
+        them by their recorded latency.
+    jitter : :obj:`float`
+        Maximum number of seconds added to or removed from the latency, at
+        random.
+
+    '''
+
+    def __init__(self, cassette, latency=0, jitter=0):
+        '''Constructor.
+
+        Parameters
+        ----------
+        cassette : :obj:`str` or :obj:`list` of :obj:`dict`
+            Path of a cassette file, or recorded interactions.
+        latency : :obj:`float`, optional
+            Number of seconds each response is delayed by, or ``None`` to
+            delay them by their recorded latency.
+        jitter : :obj:`float`, optional
+            Maximum number of seconds added to or removed from the latency,
+            at random.
+
+        '''
+        if isinstance(cassette, str):
+            cassette = load_cassette(cassette)
+        self.latency = latency
+        self.jitter = jitter
+        self._interactions = OrderedDict()
+        for interaction in cassette:
+            response = (
+                interaction['status'],
+                interaction['headers'],
+                interaction['body'].encode('utf-8'),
+                interaction['elapsed']
+            )
+            self._interactions.setdefault(
+                interaction['key'], []).append(response)
+        self._served = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, params=None, **kwargs):
+        '''Serves the recorded response of a request.
+
+        Raises
+        ------
+        :obj:`LookupError`
+            If the request was not recorded.
+
+        '''
+        key = _key(method, url, params, kwargs.get('json'))
+        with self._lock:
+            responses = self._interactions.get(key)
+            if not responses:
+                raise LookupError('No recorded response for {}.'.format(key))
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        status, headers, content, elapsed = responses[served % len(responses)]
+        delay = elapsed if self.latency is None else self.latency
+        if self.jitter:
+            delay += random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        return ReplayResponse(status, headers, content, max(delay, 0), url)
+
+    def close(self):
+        pass
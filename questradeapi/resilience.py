@@ -0,0 +1,192 @@
+import random
+import threading
+import time
+
+import requests
+import urllib3
+
+from .exceptions import CircuitOpenError
+
+class RetryPolicy():
+    ''' Policy deciding how failed requests are retried.
+
+    Delays grow exponentially with the number of attempts and are drawn at
+    random below that bound ("full jitter"), so that many clients failing at
+    once do not retry in lockstep.
+
+    Attributes
+    ----------
+    max_attempts : :obj:`int`
+        Maximum number of attempts of a request, including the first one.
+    backoff : :obj:`float`
+        Upper bound in seconds of the delay before the first retry.
+    max_backoff : :obj:`float`
+        Upper bound in seconds of any delay.
+    retry_statuses : :obj:`tuple` of :obj:`int`
+        Server error statuses after which idempotent requests are retried.
+
+    '''
+
+    def __init__(self, max_attempts=4, backoff=0.5, max_backoff=30,
+        retry_statuses=(500, 502, 503, 504)):
+        '''Constructor.
+
+        Parameters
+        ----------
+        max_attempts : :obj:`int`, optional
+            Maximum number of attempts of a request, including the first one.
+        backoff : :obj:`float`, optional
+            Upper bound in seconds of the delay before the first retry.
+        max_backoff : :obj:`float`, optional
+            Upper bound in seconds of any delay.
+        retry_statuses : :obj:`tuple` of :obj:`int`, optional
+            Server error statuses after which idempotent requests are retried.
+
+        '''
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+
+    def delay(self, attempt, retry_after=None):
+        '''Returns the number of seconds to wait before retrying.
+
+        Parameters
+        ----------
+        attempt : :obj:`int`
+            Number of attempts made so far.
+        retry_after : :obj:`str`, optional
+            Value of the ``Retry-After`` header of the response, which takes
+            precedence when it is a number of seconds.
+
+        Returns
+        -------
+        :obj:`float`
+            Delay in seconds.
+
+        '''
+        if retry_after is not None:
+            try:
+                return min(max(float(retry_after), 0), self.max_backoff)
+            except ValueError:
+                pass
+        bound = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return random.uniform(0, bound)
+
+    @staticmethod
+    def not_sent(exception):
+        '''Tells whether a failed request is known not to have reached the
+        server, in which case it can safely be sent again even if it is not
+        idempotent.
+
+        Parameters
+        ----------
+        exception : :obj:`requests.exceptions.RequestException`
+            Exception raised by the transport.
+
+        Returns
+        -------
+        :obj:`bool`
+            Whether the connection to the server could not be established.
+
+        '''
+        if isinstance(exception, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(exception, requests.exceptions.ConnectionError):
+            reason = getattr(exception.args[0], 'reason', None) \
+                if exception.args else None
+            # Includes subclasses, such as name resolution failures.
+            return isinstance(reason, urllib3.exceptions.NewConnectionError)
+        return False
+
+class CircuitBreaker():
+    ''' Per-host circuit breaker.
+
+    After `failure_threshold` consecutive failures of requests to a host, the
+    circuit of that host opens and requests to it fail immediately with a
+    :obj:`questradeapi.exceptions.CircuitOpenError`. After `reset_timeout`
+    seconds, a single trial request is let through: the circuit closes if it
+    succeeds and opens again otherwise.
+
+    Attributes
+    ----------
+    failure_threshold : :obj:`int`
+        Number of consecutive failures opening the circuit.
+    reset_timeout : :obj:`float`
+        Number of seconds the circuit stays open before a trial request.
+
+    '''
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        '''Constructor.
+
+        Parameters
+        ----------
+        failure_threshold : :obj:`int`, optional
+            Number of consecutive failures opening the circuit.
+        reset_timeout : :obj:`float`, optional
+            Number of seconds the circuit stays open before a trial request.
+
+        '''
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = {}
+        self._opened_at = {}
+        self._lock = threading.Lock()
+
+    def before_request(self, host):
+        '''Checks that a request to a host may be sent.
+
+        Parameters
+        ----------
+        host : :obj:`str`
+            Server the request is sent to.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.CircuitOpenError`
+            If the circuit of the host is open.
+
+        '''
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return
+            retry_in = opened_at + self.reset_timeout - time.monotonic()
+            if retry_in > 0:
+                raise CircuitOpenError(host, retry_in)
+            # Let a single trial request through, the next ones wait for its
+            # outcome to be recorded.
+            self._opened_at[host] = time.monotonic()
+
+    def record_success(self, host):
+        '''Records a successful request, closing the circuit of the host.'''
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+
+    def record_failure(self, host):
+        '''Records a failed request, opening the circuit of the host once the
+        failure threshold is reached.'''
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.failure_threshold:
+                self._opened_at[host] = time.monotonic()
+
+    def state(self, host):
+        '''Returns the state of the circuit of a host.
+
+        Returns
+        -------
+        :obj:`str`, {'closed', 'open', 'half-open'}
+            State of the circuit.
+
+        '''
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return 'closed'
+            if opened_at + self.reset_timeout > time.monotonic():
+                return 'open'
+            return 'half-open'
@@ -1,5 +1,28 @@
+import importlib
+import json
+import threading
 import time
+from datetime import timedelta
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+import requests.adapters
+
+from . import columnar, models, utils
+from .cache import ResponseCache
+from .exceptions import QuestradeAPIError
+from .instrumentation import RequestEvent, TokenRefreshEvent
+from .ratelimit import RateLimiter
+from .resilience import CircuitBreaker, RetryPolicy
+from .singleflight import MicroBatcher, SingleFlight
+
+def _fastest_json_decoder():
+    '''Returns the fastest available function decoding JSON documents.'''
+    try:
+        return importlib.import_module('orjson').loads
+    except ImportError:
+        return json.loads
 
 class Session():
     ''' A QuestradeAPI session that allows the user to perform API calls.
@@ -19,20 +42,167 @@ class Session():
 
     ACCESS_TOKEN_HOST = 'https://login.questrade.com'
     ACCESS_TOKEN_ENDPOINT = '/oauth2/token'
-
-    def __init__(self, refresh_token):
+    MAX_IDS_LENGTH = 1500
+    MAX_CANDLES = 2000
+    HISTORY_WINDOW = timedelta(days=30)
+
+    # Shortest possible duration of each candlestick interval, in seconds.
+    CANDLE_INTERVALS = {
+        'OneMinute': 60,
+        'TwoMinutes': 2 * 60,
+        'ThreeMinutes': 3 * 60,
+        'FourMinutes': 4 * 60,
+        'FiveMinutes': 5 * 60,
+        'TenMinutes': 10 * 60,
+        'FifteenMinutes': 15 * 60,
+        'TwentyMinutes': 20 * 60,
+        'HalfHour': 30 * 60,
+        'OneHour': 60 * 60,
+        'TwoHours': 2 * 60 * 60,
+        'FourHours': 4 * 60 * 60,
+        'OneDay': 24 * 60 * 60,
+        'OneWeek': 7 * 24 * 60 * 60,
+        'OneMonth': 28 * 24 * 60 * 60,
+        'OneYear': 365 * 24 * 60 * 60
+    }
+
+    def __init__(self, refresh_token, transport=None, pool_size=10, 
+        timeout=30, refresh_margin=60, auto_refresh=False, 
+        on_token_refresh=None, rate_limiter=None, max_workers=4, cache=None,
+        retry_policy=None, circuit_breaker=None, instrumentation=None, 
+        json_decoder=None, coalesce=False, quote_batch_window=None):
         '''Constructor.
 
         Parameters
         ----------
         refresh_token : :obj:`str`
             Initial refresh token used to get an access token.
+        transport : :obj:`requests.Session`, optional
+            Transport used to perform the HTTP requests. Any object exposing
+            the :obj:`requests.Session` ``request`` and ``close`` methods can
+            be used. Defaults to a pooled, keep-alive :obj:`requests.Session`.
+        pool_size : :obj:`int`, optional
+            Maximum number of connections kept alive per host by the default
+            transport.
+        timeout : :obj:`float`, optional
+            Number of seconds to wait for the server before giving up on a
+            request. ``None`` waits forever.
+        refresh_margin : :obj:`float`, optional
+            Number of seconds before its expiry at which the access token is
+            considered stale and gets refreshed.
+        auto_refresh : :obj:`bool`, optional
+            Refresh the access token in a background thread ahead of its
+            expiry so that requests never wait on the login server.
+        on_token_refresh : callable, optional
+            Called with the data returned by the login server every time the
+            refresh token is redeemed. Since refresh tokens can only be
+            redeemed once, this can be used to persist the new refresh token
+            so that it survives a restart.
+        rate_limiter : :obj:`questradeapi.ratelimit.RateLimiter`, optional
+            Limiter pacing the requests to stay within Questrade's quotas. A
+            limiter can be shared by sessions using the same credentials.
+            Defaults to a new limiter with the documented quotas; pass
+            ``False`` to disable rate limiting.
+        max_workers : :obj:`int`, optional
+            Maximum number of requests a single call splitting its work in
+            several requests (e.g. :meth:`get_quotes` with many ids) keeps
+            in flight at once.
+        cache : :obj:`questradeapi.cache.ResponseCache`, optional
+            Cache serving the reference data returned by :meth:`get_symbols`,
+            :meth:`get_option_chain` and :meth:`get_markets`. Pass ``True``
+            to use a cache with the default settings. Disabled by default,
+            or if ``False``.
+        retry_policy : :obj:`questradeapi.resilience.RetryPolicy`, optional
+            Policy deciding how failed requests are retried. Defaults to a
+            policy with the default settings; pass ``False`` to never retry.
+        circuit_breaker : :obj:`questradeapi.resilience.CircuitBreaker`, \
+        optional
+            Circuit breaker failing requests fast while the API server is
+            down. Defaults to a breaker with the default settings; pass
+            ``False`` to disable it.
+        instrumentation : \
+        :obj:`questradeapi.instrumentation.Instrumentation`, optional
+            Hooks called around every request and token refresh, e.g. a
+            :obj:`questradeapi.instrumentation.MetricsRecorder`.
+        json_decoder : callable, optional
+            Function decoding the body of the responses, given as
+            :obj:`bytes`. Defaults to :func:`orjson.loads` if `orjson` is
+            installed and to :func:`json.loads` otherwise.
+        coalesce : :obj:`bool`, optional
+            Send identical GET requests made concurrently only once, every
+            caller receiving the same response dictionary, which must
+            therefore not be modified. Disabled by default.
+        quote_batch_window : :obj:`float`, optional
+            Number of seconds during which concurrent :meth:`get_quotes`
+            calls for a single id are merged into a single request listing
+            all their ids. Disabled by default.
 
         '''
         self.refresh_token = refresh_token
         self.access_token = None
         self.access_valid_until = 0
         self.api_server = None
+        self.timeout = timeout
+        self.refresh_margin = refresh_margin
+        self.auto_refresh = auto_refresh
+        self.on_token_refresh = on_token_refresh
+        self._token_lock = threading.Lock()
+        self._refresh_timer = None
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+        self.max_workers = max_workers
+        if cache is True:
+            cache = ResponseCache()
+        elif cache is False:
+            cache = None
+        self.cache = cache
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        self.retry_policy = retry_policy
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker()
+        self.circuit_breaker = circuit_breaker
+        self.instrumentation = instrumentation
+        if json_decoder is None:
+            json_decoder = _fastest_json_decoder()
+        self.json_decoder = json_decoder
+        self._single_flight = SingleFlight() if coalesce else None
+        self._quote_batcher = None
+        if quote_batch_window:
+            self._quote_batcher = MicroBatcher(
+                quote_batch_window, self._fetch_quotes)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        if transport is None:
+            transport = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size
+            )
+            transport.mount('https://', adapter)
+            transport.mount('http://', adapter)
+        self.transport = transport
+
+    def close(self):
+        '''Stops the background token refresh and closes the connections kept
+        alive by the transport.'''
+        with self._token_lock:
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
+            self.auto_refresh = False
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     def _get_access_data(self):
         '''Method used to get the data required to acces the API server.
@@ -45,14 +215,109 @@ class Session():
             API server associated with the returned access token.
 
         '''
-        now = time.time()
-        if now > self.access_valid_until:
-            token_data = self.redeem_refresh_token()
+        valid_until = self.access_valid_until
+        if time.time() > valid_until - self.refresh_margin:
+            self._refresh_access_data(valid_until)
+        return (self.access_token, self.api_server)
+
+    def _refresh_access_data(self, valid_until):
+        '''Redeems the refresh token unless another thread already did so.
+
+        Only one redeem request is ever in flight: concurrent callers wait for
+        it to complete and then use its result, since the refresh token they
+        would otherwise redeem has been consumed.
+
+        Parameters
+        ----------
+        valid_until : :obj:`float`
+            Expiry of the access token the caller considers stale.
+
+        '''
+        with self._token_lock:
+            if self.access_valid_until != valid_until:
+                return
+            now = time.time()
+            if self.instrumentation is None:
+                token_data = self._redeem()
+            else:
+                token_data = self._instrumented_redeem()
             self.refresh_token = token_data['refresh_token']
             self.access_token = token_data['access_token']
-            self.access_valid_until = now + token_data['expires_in']
+            if self.api_server is not None \
+                and token_data['api_server'] != self.api_server:
+                # Connections to the previous API server are of no more use.
+                self.transport.close()
             self.api_server = token_data['api_server']
-        return (self.access_token, self.api_server)
+            # Set last: callers not taking the lock use the token and server
+            # as soon as the expiry tells them they are valid.
+            self.access_valid_until = now + token_data['expires_in']
+            if self.on_token_refresh is not None:
+                self.on_token_refresh(token_data)
+            if self.auto_refresh:
+                self._schedule_refresh()
+
+    def _redeem(self):
+        '''Redeems the refresh token, failing if the login server rejected
+        it.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.QuestradeAPIError`
+            If the response holds no access token.
+
+        '''
+        token_data = self.redeem_refresh_token()
+        if 'access_token' not in token_data:
+            raise QuestradeAPIError(token_data)
+        return token_data
+
+    def _instrumented_redeem(self):
+        '''Redeems the refresh token, reporting it to the instrumentation.'''
+        start = time.time()
+        started = time.perf_counter()
+        error = None
+        try:
+            return self._redeem()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.instrumentation.on_token_refresh(TokenRefreshEvent(
+                start, time.perf_counter() - started, error))
+
+    def refresh_access_token(self, access_token=None):
+        '''Forces the access token to be refreshed.
+
+        Parameters
+        ----------
+        access_token : :obj:`str`, optional
+            Access token rejected by the server. If given, the token is only
+            refreshed if it is still the current one, so that many callers
+            rejected with the same token only trigger a single refresh.
+
+        '''
+        valid_until = self.access_valid_until
+        if access_token is None or access_token == self.access_token:
+            self._refresh_access_data(valid_until)
+
+    def _schedule_refresh(self):
+        '''Schedules the background refresh of the current access token.'''
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        valid_until = self.access_valid_until
+        delay = max(valid_until - self.refresh_margin - time.time(), 0)
+        self._refresh_timer = threading.Timer(
+            delay, self._background_refresh, (valid_until,))
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _background_refresh(self, valid_until):
+        '''Entry point of the background refresh thread.'''
+        try:
+            self._refresh_access_data(valid_until)
+        except Exception:
+            # The next request will retry the redeem and surface the error.
+            pass
 
     def redeem_refresh_token(self):
         ''' Redeems the given refresh token to the questrade login server.
@@ -67,11 +332,389 @@ class Session():
             'grant_type': 'refresh_token',
             'refresh_token': self.refresh_token
         }
-        r = requests.post(
-            'https://login.questrade.com/oauth2/token',
-            params=params
+        r = self.transport.request(
+            'POST',
+            self.ACCESS_TOKEN_HOST + self.ACCESS_TOKEN_ENDPOINT,
+            params=params,
+            timeout=self.timeout
         )
-        return r.json()
+        return self.json_decoder(r.content)
+
+    def _request(self, method, endpoint, params):
+        '''Performs an authenticated request to the Questrade API.
+
+        Idempotent requests (GET and DELETE) are retried after connection
+        errors and server errors. Other requests, such as order placements,
+        are only retried when the server is known not to have processed them:
+        when it rejected them for exceeding the rate limit, or when the
+        connection to it could not be established. Requests rejected with a
+        401 are retried once with a refreshed access token.
+
+        Parameters
+        ----------
+        method : :obj:`str`
+            HTTP method of the request.
+        endpoint : :obj:`str`
+            The webservice endpoint te request is sent to.
+        params : :obj:`dict`
+            The parameters to include in the request: in the query string,
+            or as a JSON body for POST requests.
+
+        Returns
+        -------
+        :obj:`dict`
+            Dictionary containing the response properties.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.CircuitOpenError`
+            If the API server has been failing and is not tried again yet.
+        :obj:`requests.exceptions.RequestException`
+            If the request could not be completed after all the attempts.
+
+        '''
+        idempotent = method in ('GET', 'DELETE')
+        if method == 'POST':
+            # Bodies hold lists of structures, which query strings cannot.
+            payload = {'json': {
+                name: value for name, value in (params or {}).items()
+                if value is not None
+            }}
+        else:
+            payload = {'params': params}
+        max_attempts = self.retry_policy.max_attempts \
+            if self.retry_policy else 1
+        reauthenticated = False
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.rate_limiter:
+                self.rate_limiter.acquire(endpoint)
+            access_token, api_server = self._get_access_data()
+            if self.circuit_breaker:
+                self.circuit_breaker.before_request(api_server)
+            headers = {'Authorization': 'Bearer {}'.format(access_token)}
+            if self.instrumentation is not None:
+                start = time.time()
+                started = time.perf_counter()
+            try:
+                r = self.transport.request(
+                    method,
+                    api_server + endpoint,
+                    headers=headers,
+                    timeout=self.timeout,
+                    **payload
+                )
+            except requests.exceptions.RequestException as e:
+                if self.instrumentation is not None:
+                    self._record_request(
+                        method, endpoint, attempt, start, started, error=e)
+                if self.circuit_breaker:
+                    self.circuit_breaker.record_failure(api_server)
+                retryable = idempotent or RetryPolicy.not_sent(e)
+                if not retryable or attempt >= max_attempts:
+                    raise
+                time.sleep(self.retry_policy.delay(attempt))
+                continue
+
+            if self.circuit_breaker:
+                if r.status_code >= 500:
+                    self.circuit_breaker.record_failure(api_server)
+                else:
+                    self.circuit_breaker.record_success(api_server)
+            if self.rate_limiter:
+                self.rate_limiter.update(endpoint, r.status_code, r.headers)
+
+            # A request rejected for exceeding the quota was not processed
+            # and can be sent again once the limiter lets it through.
+            retryable = attempt < max_attempts and (r.status_code == 429 or 
+                idempotent and r.status_code in self.retry_policy.retry_statuses)
+            reauthenticate = r.status_code == 401 and not reauthenticated
+            if self.instrumentation is not None:
+                if retryable or reauthenticate:
+                    self._record_request(
+                        method, endpoint, attempt, start, started, r)
+                else:
+                    decoding = time.perf_counter()
+                    data = self.json_decoder(r.content)
+                    self._record_request(
+                        method, endpoint, attempt, start, started, r,
+                        time.perf_counter() - decoding)
+                    return data
+
+            if reauthenticate:
+                self.refresh_access_token(access_token)
+                reauthenticated = True
+                attempt -= 1
+                continue
+            if retryable:
+                time.sleep(self.retry_policy.delay(
+                    attempt, r.headers.get('Retry-After')))
+                continue
+            return self.json_decoder(r.content)
+
+    def _record_request(self, method, endpoint, attempt, start, started, 
+        r=None, decode_time=0.0, error=None):
+        '''Reports an attempt of a request to the instrumentation.
+
+        Parameters
+        ----------
+        method : :obj:`str`
+            HTTP method of the request.
+        endpoint : :obj:`str`
+            The webservice endpoint the request was sent to.
+        attempt : :obj:`int`
+            Number of the attempt.
+        start : :obj:`float`
+            Unix time at which the request was sent.
+        started : :obj:`float`
+            Performance counter value when the request was sent.
+        r : :obj:`requests.Response`, optional
+            Response received, if any.
+        decode_time : :obj:`float`, optional
+            Seconds spent decoding the response.
+        error : :obj:`Exception`, optional
+            Exception raised by the transport, if any.
+
+        '''
+        duration = time.perf_counter() - started
+        status_code = None
+        server_time = duration - decode_time
+        bytes_out = 0
+        bytes_in = 0
+        remaining = None
+        if r is not None:
+            status_code = r.status_code
+            elapsed = getattr(r, 'elapsed', None)
+            if elapsed is not None:
+                server_time = elapsed.total_seconds()
+            request = getattr(r, 'request', None)
+            if request is not None:
+                bytes_out = len(request.url or '') + len(request.body or '')
+            bytes_in = len(r.content or b'')
+            try:
+                remaining = int(r.headers['X-RateLimit-Remaining'])
+            except (KeyError, TypeError, ValueError):
+                pass
+        self.instrumentation.on_request(RequestEvent(
+            method, endpoint, status_code, attempt, start, duration,
+            server_time, decode_time, bytes_out, bytes_in, remaining, error))
+
+    def _map(self, func, iterable):
+        '''Applies a function to every item of an iterable concurrently.
+
+        At most `max_workers` calls are in flight at once, and items are only
+        consumed from `iterable` as results are consumed from the returned
+        generator.
+
+        Returns
+        -------
+        generator
+            Results of the calls, in the same order as `iterable`.
+
+        '''
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers)
+            executor = self._executor
+        pending = deque()
+        for item in iterable:
+            if len(pending) >= self.max_workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(func, item))
+        while pending:
+            yield pending.popleft().result()
+
+    def _chunk_ids(self, ids):
+        '''Deduplicates ids and joins them in comma-separated chunks short
+        enough to fit in a request URL.
+
+        Parameters
+        ----------
+        ids : :obj:`list`
+            Ids (or names) to chunk.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`str`
+            Chunks of ids, preserving the order of first occurrence.
+
+        '''
+        chunks = []
+        chunk = []
+        length = 0
+        for id in OrderedDict.fromkeys(map(str, ids)):
+            if chunk and length + len(id) > self.MAX_IDS_LENGTH:
+                chunks.append(','.join(chunk))
+                chunk = []
+                length = 0
+            chunk.append(id)
+            length += len(id) + 1
+        if chunk:
+            chunks.append(','.join(chunk))
+        return chunks
+
+    def _get_batched(self, endpoint, param, ids, key):
+        '''Performs GET requests listing many ids, split in chunks sent
+        concurrently.
+
+        Parameters
+        ----------
+        endpoint : :obj:`str`
+            The webservice endpoint the requests are sent to.
+        param : :obj:`str`
+            Name of the parameter listing the ids.
+        ids : :obj:`list`
+            Ids (or names) to request.
+        key : :obj:`str`
+            Property of the responses holding the list of results.
+
+        Returns
+        -------
+        :obj:`dict`
+            Dictionary containing the merged response properties, or the
+            first error response returned by the server.
+
+        '''
+        chunks = self._chunk_ids(ids)
+        if len(chunks) <= 1:
+            return self.do_get(endpoint, {param: ''.join(chunks)})
+        responses = self._map(
+            lambda chunk: self.do_get(endpoint, {param: chunk}),
+            chunks
+        )
+        merged = {key: []}
+        for response in responses:
+            if key not in response:
+                return response
+            merged[key].extend(response[key])
+        return merged
+
+    def _split_range(self, start_time, end_time, span):
+        '''Splits a time range in consecutive windows.
+
+        Parameters
+        ----------
+        start_time : :obj:`datetime`
+            Beginning of the range.
+        end_time : :obj:`datetime`
+            End of the range.
+        span : :obj:`timedelta`
+            Maximum duration of a window.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`tuple`
+            Start and end of each window. Consecutive windows share their
+            boundary.
+
+        '''
+        windows = []
+        window_start = start_time
+        while window_start < end_time:
+            window_end = min(window_start + span, end_time)
+            windows.append((window_start, window_end))
+            window_start = window_end
+        return windows
+
+    def _convert(self, response, key, converter, format, model=None):
+        '''Converts the list of results of a response to the given format.
+
+        Parameters
+        ----------
+        response : :obj:`dict`
+            Response returned by the server.
+        key : :obj:`str`
+            Property of the response holding the list of results.
+        converter : callable
+            Function converting the list of results to a columnar format, or
+            ``None`` if the results only convert to models.
+        format : :obj:`str`
+            Requested format. The response is returned as is if ``None``.
+        model : :obj:`questradeapi.models.Model` subclass, optional
+            Model of the results, used if `format` is ``'objects'``.
+
+        '''
+        if format is None:
+            return response
+        if key not in response:
+            raise QuestradeAPIError(response)
+        if format == models.FORMAT and model is not None:
+            return model.from_list(response[key])
+        if converter is None:
+            raise ValueError('Unknown format {!r}, expected {!r}.'.format(
+                format, models.FORMAT))
+        return converter(response[key], format)
+
+    def _cached_get(self, endpoint, params={}):
+        '''Performs a GET request, unless its response is cached.
+
+        Error responses are not cached.
+
+        Returns
+        -------
+        :obj:`dict`
+            Dictionary containing the response properties.
+
+        '''
+        if self.cache is None:
+            return self.do_get(endpoint, params)
+        key = ResponseCache.key(endpoint, params)
+        response = self.cache.get(key)
+        if response is None:
+            response = self.do_get(endpoint, params)
+            if 'code' not in response:
+                self.cache.set(key, response, endpoint)
+        return response
+
+    def _get_cached_symbols(self, param, values):
+        '''Retrieves symbols by id or name, only requesting the ones missing
+        from the cache.
+
+        Each symbol is cached individually, under both its id and its name,
+        so that any later lookup listing it can be served from the cache.
+
+        Parameters
+        ----------
+        param : :obj:`str`, {'ids', 'names'}
+            Whether `values` are symbol ids or names.
+        values : :obj:`list`
+            Symbol ids or names.
+
+        Returns
+        -------
+        :obj:`dict`
+            Dictionary containing the response properties.
+
+        '''
+        endpoint = 'v1/symbols'
+        symbols = OrderedDict()
+        for value in values:
+            value = str(value).upper()
+            if value not in symbols:
+                symbols[value] = self.cache.get(
+                    ResponseCache.key(endpoint, {param: value}))
+        missing = [value for value, symbol in symbols.items() if symbol is None]
+        if missing:
+            response = self._get_batched(endpoint, param, missing, 'symbols')
+            if 'symbols' not in response:
+                return response
+            for symbol in response['symbols']:
+                id = str(symbol['symbolId'])
+                name = symbol['symbol'].upper()
+                self.cache.set(
+                    ResponseCache.key(endpoint, {'ids': id}), symbol, endpoint)
+                self.cache.set(
+                    ResponseCache.key(endpoint, {'names': name}), symbol,
+                    endpoint)
+                value = id if param == 'ids' else name
+                if value in symbols:
+                    symbols[value] = symbol
+        return {
+            'symbols': [
+                symbol for symbol in symbols.values() if symbol is not None
+            ]
+        }
 
     def do_get(self, endpoint, params={}):
         ''' Performs a GET request to the Questrade API.
@@ -89,10 +732,11 @@ class Session():
             Dictionary containing the response properties.
             
         '''
-        access_token, api_server = self._get_access_data()
-        headers = {'Authorization': 'Bearer {}'.format(access_token)}
-        r = requests.get(api_server + endpoint, headers=headers, params=params)
-        return r.json()
+        if self._single_flight is not None:
+            key = (endpoint, json.dumps(params, sort_keys=True, default=str))
+            return self._single_flight.do(
+                key, self._request, 'GET', endpoint, params)
+        return self._request('GET', endpoint, params)
 
     def do_post(self, endpoint, params={}):
         ''' Performs a POST request to the Questrade API.
@@ -102,7 +746,8 @@ class Session():
         endpoint : :obj:`str`
             The webservice endpoint te request is sent to.
         params : :obj:`dict`, optional
-            The parameters to include in the request.
+            The parameters sent as the JSON body of the request. Parameters
+            set to ``None`` are left out.
 
         Returns
         -------
@@ -110,10 +755,7 @@ class Session():
             Dictionary containing the response properties.
             
         '''
-        access_token, api_server = self._get_access_data()
-        headers = {'Authorization': 'Bearer {}'.format(access_token)}
-        r = requests.post(api_server + endpoint, headers=headers, params=params)
-        return r.json()
+        return self._request('POST', endpoint, params)
 
     def do_delete(self, endpoint, params={}):
         ''' Performs a DELETE request to the Questrade API.
@@ -131,10 +773,7 @@ class Session():
             Dictionary containing the response properties.
 
         '''
-        access_token, api_server = self._get_access_data()
-        headers = {'Authorization': 'Bearer {}'.format(access_token)}
-        r = requests.delete(api_server + endpoint, headers=headers, params=params)
-        return r.json()
+        return self._request('DELETE', endpoint, params)
 
     def get_time(self):
         '''Retrieve current server time.
@@ -159,13 +798,16 @@ class Session():
         '''
         return self.do_get('v1/accounts')
 
-    def get_positions(self, id):
+    def get_positions(self, id, format=None):
         ''' Retrives positions in a specified account.
 
         Parameters
         ----------
         id : :obj:`str`
             Account number
+        format : :obj:`str`, {'objects'}, optional
+            Return a list of :obj:`questradeapi.models.Position` instead of
+            the response dictionary.
 
         Returns
         -------
@@ -173,15 +815,20 @@ class Session():
             Dictionary containing the response properties.
 
         '''
-        return self.do_get('v1/accounts/{}/positions'.format(id))
+        response = self.do_get('v1/accounts/{}/positions'.format(id))
+        return self._convert(
+            response, 'positions', None, format, models.Position)
 
-    def get_balances(self, id):
+    def get_balances(self, id, format=None):
         ''' Retrieves per-currency and combined balances for a specified account.
 
         Parameters
         ----------
         id : :obj:`str`
             Account number
+        format : :obj:`str`, {'objects'}, optional
+            Return the lists of balances of the response as lists of
+            :obj:`questradeapi.models.Balance`.
 
         Returns
         -------
@@ -189,9 +836,16 @@ class Session():
             Dictionary containing the response properties.
 
         '''
-        return self.do_get('v1/accounts/{}/balances'.format(id))
+        response = self.do_get('v1/accounts/{}/balances'.format(id))
+        if format is None:
+            return response
+        return {
+            key: self._convert(response, key, None, format, models.Balance)
+            for key in ('perCurrencyBalances', 'combinedBalances',
+                'sodPerCurrencyBalances', 'sodCombinedBalances')
+        }
 
-    def get_executions(self, id, start_time=None, end_time=None):
+    def get_executions(self, id, start_time=None, end_time=None, format=None):
         ''' Retrieves executions for a specific account.
 
         Parameters
@@ -202,6 +856,9 @@ class Session():
             Start of the time range. Defaults to today 00:00am.
         end_time : :obj:`datetime`, optional
             End of the time range. Defaults to todat 11:59pm.
+        format : :obj:`str`, {'objects'}, optional
+            Return a list of :obj:`questradeapi.models.Execution` instead of
+            the response dictionary.
 
         Returns
         -------
@@ -213,11 +870,13 @@ class Session():
         if start_time:
             params.update({'startTime': utils.add_local_tz(start_time)})
         if end_time:
-            params.update({'end_time': utils.add_local_tz(end_time)})
-        return self.do_get('v1/accounts/{}/executions'.format(id), params)
+            params.update({'endTime': utils.add_local_tz(end_time)})
+        response = self.do_get('v1/accounts/{}/executions'.format(id), params)
+        return self._convert(
+            response, 'executions', None, format, models.Execution)
 
     def get_orders(self, id, state_filter=None, start_time=None, end_time=None, 
-        order_ids=None):
+        order_ids=None, format=None):
         ''' Retrieves orders for a specified account.
 
         Parameters
@@ -232,6 +891,9 @@ class Session():
             End of the time range. Defaults to todat 11:59pm.
         order_ids : int, optional
             Retrieve specific orders details.
+        format : :obj:`str`, {'objects'}, optional
+            Return a list of :obj:`questradeapi.models.Order` instead of the
+            response dictionary.
 
         Note
         ----
@@ -254,7 +916,8 @@ class Session():
             params.update({'stateFilter': state_filter})
         if order_ids:
             params.update({'ids': ','.join(map(str, order_ids))})
-        return self.do_get('v1/accounts/{}/orders'.format(id), params)
+        response = self.do_get('v1/accounts/{}/orders'.format(id), params)
+        return self._convert(response, 'orders', None, format, models.Order)
 
     def get_activities(self, id, start_time=None, end_time=None):
         ''' Retrieve account activities, including cash transactons, dividends,
@@ -280,9 +943,132 @@ class Session():
             params.update({'startTime': utils.add_local_tz(start_time)})
         if end_time:
             params.update({'endTime': utils.add_local_tz(end_time)})
-        return self.do_get('v1/accoutns/{}/activities'.format(id), params)
+        return self.do_get('v1/accounts/{}/activities'.format(id), params)
+
+    def _iter_history(self, fetch, key, start_time, end_time, record_key):
+        '''Retrieves the records of a range of any length, split in windows
+        fetched concurrently.
+
+        Parameters
+        ----------
+        fetch : callable
+            Called with the start and end of a window, returns the response
+            for that window.
+        key : :obj:`str`
+            Property of the responses holding the list of records.
+        start_time : :obj:`datetime`
+            Beginning of the range.
+        end_time : :obj:`datetime`
+            End of the range.
+        record_key : callable
+            Returns the value identifying a record, used to drop the records
+            returned for two consecutive windows.
+
+        Yields
+        ------
+        :obj:`dict`
+            Records, in the order of the windows.
 
-    def get_symbols(self, names=None, ids=None, id=None):
+        '''
+        windows = self._split_range(start_time, end_time, self.HISTORY_WINDOW)
+        responses = self._map(lambda window: fetch(*window), windows)
+        previous_keys = set()
+        for response in responses:
+            if key not in response:
+                raise QuestradeAPIError(response)
+            keys = set()
+            for record in response[key]:
+                value = record_key(record)
+                keys.add(value)
+                if value not in previous_keys:
+                    yield record
+            previous_keys = keys
+
+    def iter_executions_history(self, id, start_time, end_time):
+        ''' Retrieves the executions of a specific account over a range of any
+        length.
+
+        The range is split in windows short enough to be accepted by
+        :meth:`get_executions`. Windows are fetched concurrently and
+        executions are yielded as soon as they are available, so that memory
+        usage does not grow with the length of the range.
+
+        Parameters
+        ----------
+        id : :obj:`str`
+            Account number
+        start_time : :obj:`datetime`
+            Start of the time range.
+        end_time : :obj:`datetime`
+            End of the time range.
+
+        Yields
+        ------
+        :obj:`dict`
+            Execution structure.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.QuestradeAPIError`
+            If the server returns an error for one of the windows.
+
+        '''
+        return self._iter_history(
+            lambda start, end: self.get_executions(id, start, end),
+            'executions', start_time, end_time, lambda record: record['id'])
+
+    def iter_orders_history(self, id, start_time, end_time, 
+        state_filter='All'):
+        ''' Retrieves the orders of a specified account over a range of any
+        length. See :meth:`iter_executions_history`.
+
+        Parameters
+        ----------
+        id : :obj:`str`
+            Account number
+        start_time : :obj:`datetime`
+            Start of the time range.
+        end_time : :obj:`datetime`
+            End of the time range.
+        state_filter : :obj:`str`, {'All', 'Open', 'Close'}
+            Retreive all, active or closed orders.
+
+        Yields
+        ------
+        :obj:`dict`
+            Order structure.
+
+        '''
+        return self._iter_history(
+            lambda start, end: self.get_orders(id, state_filter, start, end),
+            'orders', start_time, end_time, lambda record: record['id'])
+
+    def iter_activities_history(self, id, start_time, end_time):
+        ''' Retrieves the activities of an account over a range of any length.
+        See :meth:`iter_executions_history`.
+
+        Parameters
+        ----------
+        id : :obj:`str`
+            Account number
+        start_time : :obj:`datetime`
+            Start of the time range.
+        end_time : :obj:`datetime`
+            End of the time range.
+
+        Yields
+        ------
+        :obj:`dict`
+            Activity structure.
+
+        '''
+        # Activities have no identifier, the whole record identifies them.
+        return self._iter_history(
+            lambda start, end: self.get_activities(id, start, end),
+            'activities', start_time, end_time, 
+            lambda record: json.dumps(record, sort_keys=True))
+
+    def get_symbols(self, names=None, ids=None, id=None, format=None):
         ''' Retrieves detailed information about one or more symbol.
 
         Parameters
@@ -293,6 +1079,9 @@ class Session():
             List of symbol ids.
         id : :obj:`int`
             Internal symbol identifier. Mutually exclusive with 'ids' parameter.
+        format : :obj:`str`, {'objects'}, optional
+            Return a list of :obj:`questradeapi.models.Symbol` instead of the
+            response dictionary.
 
         Returns
         -------
@@ -303,19 +1092,35 @@ class Session():
         is specified, it takes precedence over 'ids', which takes precedence 
         over 'id'.
 
+        Long lists of names or ids are split in several requests sent
+        concurrently, and repeated entries are only requested once. The
+        symbols are returned in the order they were first listed.
+
+        If the session has a cache, symbols are cached individually and only
+        the ones missing from the cache are requested.
+
         '''
-        params={}
         endpoint = 'v1/symbols'
-        if names:
+        if self.cache is not None and (names or ids or id):
+            if names:
+                if isinstance(names, str):
+                    names = names.split(',')
+                response = self._get_cached_symbols('names', names)
+            else:
+                response = self._get_cached_symbols('ids', ids or [id])
+        elif names:
             if isinstance(names, str):
-                params.update({'names': names})
+                response = self.do_get(endpoint, {'names': names})
             else:
-                params.update({'names': ','.join(names)})
+                response = self._get_batched(
+                    endpoint, 'names', names, 'symbols')
         elif ids:
-            params.update({'ids': ','.join(map(str, ids))})
-        elif id:
-            endpoint += '/' + str(id)
-        return self.do_get(endpoint, params)
+            response = self._get_batched(endpoint, 'ids', ids, 'symbols')
+        else:
+            if id:
+                endpoint += '/' + str(id)
+            response = self.do_get(endpoint)
+        return self._convert(response, 'symbols', None, format, models.Symbol)
 
     def get_symbols_search(self, prefix, offset=None):
         ''' Retrieves symbol(s) using several search criteria.
@@ -338,16 +1143,21 @@ class Session():
             params.update({'offset': offset})
         return self.do_get('v1/symbols/search', params)
 
-    def get_option_chain(self, id):
+    def get_option_chain(self, id, format=None):
         '''Retrieves an option chain for a particular underlying symbol.
 
         Parameters
         ----------
         id : :obj:`int`
             Internal symbol identifier.
+        format : :obj:`str`, {'objects'}, optional
+            Return a list of :obj:`questradeapi.models.OptionChain`, one per
+            expiry date, instead of the response dictionary.
 
         '''
-        return self.do_get('v1/symbols/{}/options'.format(id))
+        response = self._cached_get('v1/symbols/{}/options'.format(id))
+        return self._convert(
+            response, 'optionChain', None, format, models.OptionChain)
 
     def get_markets(self):
         '''Retrieves information about supported markets.
@@ -358,9 +1168,9 @@ class Session():
             Dictionary containing the response properties.
 
         '''
-        return self.do_get('v1/markets')
+        return self._cached_get('v1/markets')
 
-    def get_quotes(self, id=None, ids=None):
+    def get_quotes(self, id=None, ids=None, format=None):
         '''Retrieves a single Level 1 market data quote for one or more symbols.
 
         Parameters
@@ -368,21 +1178,49 @@ class Session():
         id : :obj:`int`
             Internal symbol identifier (mutually exclusive with 'ids' argument).
         ids : :obj:`list` of :obj:`int`
-            List of symbol ids.
+            List of symbol ids. Long lists are split in several requests sent
+            concurrently, and repeated ids are only requested once.
+        format : :obj:`str`, {'numpy', 'pandas', 'arrow', 'objects'}, optional
+            Return the quotes as columns of the given format instead of the
+            response dictionary. See :func:`questradeapi.columnar.convert`.
+            With ``'objects'``, return a list of
+            :obj:`questradeapi.models.Quote`.
 
         Returns
         -------
         :obj:`dict`
-            Dictionary containing the response properties.
+            Dictionary containing the response properties. Quotes are in the
+            order their ids were first listed.
 
         '''
         endpoint = 'v1/markets/quotes'
-        if id:
+        if id and self._quote_batcher is not None:
+            response = self._quote_batcher.get(str(id))
+        elif id:
             endpoint += '/' + str(id)
-            return self.do_get(endpoint)
+            response = self.do_get(endpoint)
         else:
-            params = {'ids': ','.join(map(str, ids))}
-            return self.do_get(endpoint, params)
+            response = self._get_batched(endpoint, 'ids', ids, 'quotes')
+        return self._convert(
+            response, 'quotes', columnar.convert_quotes, format, models.Quote)
+
+    def _fetch_quotes(self, ids):
+        '''Retrieves the quotes of the single-id :meth:`get_quotes` calls
+        merged by the quote batcher.
+
+        Returns
+        -------
+        :obj:`dict`
+            Response of each id, as if it had been requested alone.
+
+        '''
+        response = self._get_batched('v1/markets/quotes', 'ids', ids, 'quotes')
+        if 'quotes' not in response:
+            return {id: response for id in ids}
+        responses = {id: {'quotes': []} for id in ids}
+        for quote in response['quotes']:
+            responses[str(quote['symbolId'])] = {'quotes': [quote]}
+        return responses
 
     def get_quotes_options(self, filters=None, ids=None):
         ''' Retrieves a single Level 1 market data quote and Greek data for one 
@@ -403,9 +1241,9 @@ class Session():
 
         '''
         params = {}
-        params.update({'optionIds': ids})
+        params.update({'optionIds': list(ids) if ids else None})
         params.update({'filters': filters})
-        return self.do_get('v1/markets/quotes/options', params)
+        return self.do_post('v1/markets/quotes/options', params)
 
     def get_quotes_strategies(self, variants):
         '''Retrieve a calculated L1 market data quote for a single or many 
@@ -424,9 +1262,9 @@ class Session():
 
         '''
         params = {'variants': variants}
-        return self.do_get('v1/markets/quotes/strategies', params)
+        return self.do_post('v1/markets/quotes/strategies', params)
 
-    def get_candles(self, id, start_time, end_time, interval):
+    def get_candles(self, id, start_time, end_time, interval, format=None):
         ''' Retrieves historical market data in the form of OHLC candlesticks for a 
         specified symbol. This call is limited to returning 2,000 candlesticks in
         a single response.
@@ -444,6 +1282,11 @@ class Session():
         'TwentyMinutes', 'HalfHour', 'OneHour', 'TwoHours', 'FourHours', \
         'OneDay', 'OneWeek', 'OneMonth', 'OneYear'}
             Interval of a single candlestick.
+        format : :obj:`str`, {'numpy', 'pandas', 'arrow', 'objects'}, optional
+            Return the candlesticks as columns of the given format instead of
+            the response dictionary. See :func:`questradeapi.columnar.convert`.
+            With ``'objects'``, return a list of
+            :obj:`questradeapi.models.Candle`.
         
         Note
         ----
@@ -462,7 +1305,74 @@ class Session():
             'endTime': utils.add_local_tz(end_time), 
             'interval': interval
         }
-        return do_get('v1/markets/candles/{}'.format(id), params)
+        response = self.do_get('v1/markets/candles/{}'.format(id), params)
+        return self._convert(response, 'candles', columnar.convert_candles, 
+            format, models.Candle)
+
+    def get_candles_range(self, id, start_time, end_time, interval, 
+        format=None):
+        ''' Retrieves historical market data in the form of OHLC candlesticks for a
+        specified symbol over a range of any length.
+
+        The range is split in windows small enough for each of them to be
+        retrieved by a single :meth:`get_candles` call. Windows are fetched
+        concurrently and candlesticks are yielded in chronological order as
+        soon as they are available, so that memory usage does not grow with
+        the length of the range.
+
+        Parameters
+        ----------
+        id : :obj:`int`
+            Internal symbol indentifier.
+        start_time : :obj:`datetime`
+            Beginning of the candlestick range.
+        end_time : :obj:`datetime`
+            End of the candlestick range.
+        interval : :obj:`str`
+            Interval of a single candlestick. See :meth:`get_candles`.
+        format : :obj:`str`, {'numpy', 'pandas', 'arrow', 'objects'}, optional
+            Yield the candlesticks of each window as columns of the given
+            format instead of yielding them one by one. With ``'objects'``,
+            yield candlesticks one by one as :obj:`questradeapi.models.Candle`.
+
+        Yields
+        ------
+        :obj:`dict`
+            Candlestick structure, or columns of a window of candlesticks if
+            `format` is specified.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.QuestradeAPIError`
+            If the server returns an error for one of the windows.
+
+        '''
+        span = timedelta(
+            seconds=self.CANDLE_INTERVALS[interval] * (self.MAX_CANDLES - 1))
+        windows = self._split_range(start_time, end_time, span)
+        responses = self._map(
+            lambda window: self.get_candles(id, window[0], window[1], interval),
+            windows
+        )
+        # Consecutive windows share their boundary candlestick.
+        previous_starts = set()
+        for response in responses:
+            if 'candles' not in response:
+                raise QuestradeAPIError(response)
+            candles = [
+                candle for candle in response['candles']
+                if candle['start'] not in previous_starts
+            ]
+            previous_starts = set(
+                candle['start'] for candle in response['candles'])
+            if format is None:
+                for candle in candles:
+                    yield candle
+            elif format == models.FORMAT:
+                for candle in candles:
+                    yield models.Candle.from_dict(candle)
+            else:
+                yield columnar.convert_candles(candles, format)
 
     def post_order(self, account_id, symbol_id, quantity, iceberg_quantity, 
         limit_price, stop_price, all_or_none, anonymous, order_type, 
@@ -531,11 +1441,11 @@ class Session():
             'timeInForce': time_in_force,
             'action': action,
             'primaryRoute': primary_route,
-            'secondary_route': secondary_route
+            'secondaryRoute': secondary_route
         }
         return self.do_post(endpoint, params)
 
-    def delete_order(account_id, order_id):
+    def delete_order(self, account_id, order_id):
         ''' Allows to cancel an existing order.
 
         Arguments
@@ -551,7 +1461,7 @@ class Session():
             Dictionary containing the response properties.
 
         '''
-        endpoint = 'v1/accounts/{}/order/{}'.format(account_id, order_id)
+        endpoint = 'v1/accounts/{}/orders/{}'.format(account_id, order_id)
         return self.do_delete(endpoint)
 
     def post_bracket_order(self, account_id, symbol_id, primary_route, 
@@ -590,7 +1500,7 @@ class Session():
             'secondaryRoute': secondary_route,
             'components': components
         }
-        return self.do_post('v1/accounts/{}/orders/bracket', params)
+        return self.do_post(endpoint, params)
 
     def post_multi_leg_strategy_order(self, account_id, symbol_id, limit_price, 
         order_type, time_in_force, primary_route, secondary_route, legs, 
@@ -654,7 +1564,7 @@ class Session():
             Dictionary containing the response properties.
 
         '''
-        endpoint = '/v1/accounts/{}/orders/strategy'.format(account_id)
+        endpoint = 'v1/accounts/{}/orders/strategy'.format(account_id)
         if impact:
             endpoint += '/impact'
         params = {
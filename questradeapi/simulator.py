@@ -0,0 +1,887 @@
+'''
+Local simulator of the Questrade API, for load testing.
+
+The simulator serves synthetic data on localhost for the endpoints used by
+:obj:`questradeapi.Session`, while reproducing the behaviours that matter
+under load: single-use refresh tokens, expiring access tokens, per-second
+rate limits answered with 429 responses, and random latencies and failures.
+
+It can also be run as a load generator, driving sessions against a
+simulator and reporting their throughput and latency::
+
+    python -m questradeapi.simulator --duration 10 --concurrency 32
+
+As with the Questrade servers, the rate limit headers report the hourly quota,
+including on the 429 responses to requests over the per-second limit: use
+``--no-rate-limit`` to measure the client alone.
+'''
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+from .columnar import NAT, timestamp_ns
+from .ratelimit import RateLimiter
+from .session import Session
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # Load tests open many connections at once.
+    request_queue_size = 1024
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are sent separately: without this, delayed
+    # acknowledgements hold the body of keep-alive responses for 40 ms.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        content = self.rfile.read(length) if length else b''
+        params = {
+            name: values[-1] for name, values in parse_qs(url.query).items()
+        }
+        try:
+            data = json.loads(content.decode('utf-8')) if content else None
+        except ValueError:
+            status, body, headers = _error(400, 1001, 'Invalid JSON body.')
+        else:
+            status, body, headers = self.server.simulator.handle(
+                self.command, url.path, params,
+                self.headers.get('Authorization'), data)
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_DELETE = _handle
+
+def _error(status, code, message):
+    return status, {'code': code, 'message': message}, {}
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+class Simulator():
+    ''' Local simulator of the Questrade API.
+
+    The login server and the API server are both served by a single HTTP
+    server on localhost. Use :meth:`session` to create sessions connected to
+    it.
+
+    Example
+    -------
+    .. code-block:: python
+
+        with Simulator(latency=0.05, error_rate=0.01) as simulator:
+            sess = simulator.session()
+            print(sess.get_quotes(ids=[1, 2, 3]))
+
+    Attributes
+    ----------
+    url : :obj:`str`
+        Address of the simulator, once started.
+    token_ttl : :obj:`float`
+        Number of seconds access tokens are valid for.
+    rate_limits : :obj:`dict`
+        Number of requests allowed per second for each quota category of
+        :obj:`questradeapi.ratelimit.RateLimiter`. ``None`` disables rate
+        limiting.
+    hourly_limits : :obj:`dict`
+        Number of requests allowed per hour for each quota category. The
+        ``X-RateLimit-Remaining`` and ``X-RateLimit-Reset`` headers report
+        this quota, as Questrade does.
+    latency : :obj:`float`
+        Median number of seconds responses are delayed by.
+    latency_sigma : :obj:`float`
+        Shape of the log-normal distribution of the latencies.
+    error_rate : :obj:`float`
+        Fraction of the requests failing with a 500 status.
+    throttle_rate : :obj:`float`
+        Fraction of the requests failing with a 429 status regardless of the
+        rate limits.
+    stats : :obj:`collections.Counter`
+        Number of responses served per status.
+
+    '''
+
+    ACCESS_TOKEN_ENDPOINT = Session.ACCESS_TOKEN_ENDPOINT
+
+    HOURLY_LIMITS = {
+        RateLimiter.ACCOUNT: 30000,
+        RateLimiter.MARKET: 15000
+    }
+
+    def __init__(self, port=0, token_ttl=1800, rate_limits=RateLimiter.LIMITS,
+        hourly_limits=None, latency=0.0, latency_sigma=0.5, error_rate=0.0,
+        throttle_rate=0.0, accounts=2, symbols=100, seed=None):
+        '''Constructor.
+
+        Parameters
+        ----------
+        port : :obj:`int`, optional
+            Port to listen on. Defaults to any free port.
+        token_ttl : :obj:`float`, optional
+            Number of seconds access tokens are valid for.
+        rate_limits : :obj:`dict`, optional
+            Requests allowed per second per quota category. Defaults to the
+            documented quotas; ``None`` disables rate limiting.
+        hourly_limits : :obj:`dict`, optional
+            Requests allowed per hour per quota category. Defaults to
+            :attr:`HOURLY_LIMITS`.
+        latency : :obj:`float`, optional
+            Median number of seconds responses are delayed by.
+        latency_sigma : :obj:`float`, optional
+            Shape of the log-normal distribution of the latencies.
+        error_rate : :obj:`float`, optional
+            Fraction of the requests failing with a 500 status.
+        throttle_rate : :obj:`float`, optional
+            Fraction of the requests failing with a 429 status.
+        accounts : :obj:`int`, optional
+            Number of accounts.
+        symbols : :obj:`int`, optional
+            Number of symbols, with ids starting at 1.
+        seed : :obj:`int`, optional
+            Seed of the random latencies, failures and data.
+
+        '''
+        self.port = port
+        self.token_ttl = token_ttl
+        self.rate_limits = dict(rate_limits) if rate_limits else None
+        self.hourly_limits = dict(hourly_limits or self.HOURLY_LIMITS)
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.account_numbers = [str(10000000 + i) for i in range(accounts)]
+        self.symbol_count = symbols
+        self.url = None
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._refresh_tokens = set()
+        self._access_tokens = {}
+        self._windows = {}
+        self._hours = {}
+        self._orders = {number: {} for number in self.account_numbers}
+        self._order_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        '''Starts serving in a background thread.
+
+        Returns
+        -------
+        :obj:`str`
+            Address of the simulator.
+
+        '''
+        self._server = _Server(('127.0.0.1', self.port), _Handler)
+        self._server.simulator = self
+        self.url = 'http://127.0.0.1:{}'.format(self._server.server_port)
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self.url
+
+    def stop(self):
+        '''Stops serving.'''
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def issue_refresh_token(self):
+        '''Issues a refresh token, as the Questrade website does.
+
+        Returns
+        -------
+        :obj:`str`
+            Refresh token that can be redeemed once.
+
+        '''
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._refresh_tokens.add(token)
+        return token
+
+    def session(self, session_class=Session, **kwargs):
+        '''Creates a session connected to the simulator.
+
+        Parameters
+        ----------
+        session_class : type, optional
+            :obj:`questradeapi.Session` or
+            :obj:`questradeapi.AsyncSession`.
+        **kwargs
+            Additional keyword arguments passed to the session.
+
+        Returns
+        -------
+        :obj:`questradeapi.Session` or :obj:`questradeapi.AsyncSession`
+            Session logging in to the simulator with a new refresh token.
+
+        '''
+        session = session_class(self.issue_refresh_token(), **kwargs)
+        getattr(session, 'session', session).ACCESS_TOKEN_HOST = self.url
+        return session
+
+    def _delay(self):
+        if self.latency > 0:
+            time.sleep(self.latency * math.exp(
+                self._random.gauss(0, self.latency_sigma)))
+
+    def _redeem(self, params):
+        token = params.get('refresh_token')
+        with self._lock:
+            if params.get('grant_type') != 'refresh_token' \
+                or token not in self._refresh_tokens:
+                return _error(400, 1017, 'Invalid refresh token.')
+            self._refresh_tokens.discard(token)
+            refresh_token = uuid.uuid4().hex
+            access_token = uuid.uuid4().hex
+            self._refresh_tokens.add(refresh_token)
+            self._access_tokens[access_token] = time.time() + self.token_ttl
+        return 200, {
+            'access_token': access_token,
+            'token_type': 'Bearer',
+            'expires_in': self.token_ttl,
+            'refresh_token': refresh_token,
+            'api_server': self.url + '/'
+        }, {}
+
+    @staticmethod
+    def _count(windows, category, window, limit):
+        '''Counts a request in the current window of a category, unless its
+        limit is reached.
+
+        Returns
+        -------
+        :obj:`tuple`
+            Whether the request is allowed, and the number of requests left in
+            the window.
+
+        '''
+        current, count = windows.get(category, (window, 0))
+        if current != window:
+            count = 0
+        allowed = count < limit
+        if allowed:
+            count += 1
+        windows[category] = (window, count)
+        return allowed, limit - count
+
+    def _throttle(self, path):
+        '''Applies the per-second and hourly rate limits of the category of an
+        endpoint.
+
+        Returns
+        -------
+        :obj:`tuple`
+            Whether the request is allowed, and the rate limit headers. These
+            report the hourly quota, even for a request over the per-second
+            limit.
+
+        '''
+        category = RateLimiter.classify(path)
+        second = int(time.time())
+        hour = second // 3600
+        with self._lock:
+            allowed, _ = self._count(self._windows, category, second,
+                self.rate_limits[category])
+            if allowed:
+                allowed, remaining = self._count(self._hours, category, hour,
+                    self.hourly_limits[category])
+            else:
+                remaining = self._remaining(category, hour)
+        return allowed, {
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset': str((hour + 1) * 3600)
+        }
+
+    def _remaining(self, category, hour):
+        '''Number of requests left in the hourly quota of a category.'''
+        current, count = self._hours.get(category, (hour, 0))
+        if current != hour:
+            count = 0
+        return self.hourly_limits[category] - count
+
+    def handle(self, method, path, params, authorization, body=None):
+        '''Handles a request.
+
+        Parameters
+        ----------
+        method : :obj:`str`
+            HTTP method.
+        path : :obj:`str`
+            Path of the URL.
+        params : :obj:`dict`
+            Query parameters.
+        authorization : :obj:`str`
+            Value of the ``Authorization`` header.
+        body : :obj:`dict`, optional
+            Decoded JSON body of a POST request.
+
+        Returns
+        -------
+        :obj:`tuple`
+            Status, body and headers of the response.
+
+        '''
+        self._delay()
+        if path == self.ACCESS_TOKEN_ENDPOINT:
+            response = self._redeem(params)
+        else:
+            response = self._handle_api(method, path.lstrip('/'), params,
+                authorization, body or {})
+        with self._lock:
+            self.stats[response[0]] += 1
+        return response
+
+    def _handle_api(self, method, path, params, authorization, body):
+        token = (authorization or '').replace('Bearer ', '', 1)
+        with self._lock:
+            expiry = self._access_tokens.get(token)
+        if expiry is None or expiry < time.time():
+            return _error(401, 1017, 'Access token is invalid.')
+        headers = {}
+        if self.rate_limits is not None:
+            allowed, headers = self._throttle(path)
+            if not allowed:
+                status, body, _ = _error(429, 1006, 'Rate limit exceeded.')
+                return status, body, headers
+        if self._random.random() < self.throttle_rate:
+            status, data, _ = _error(429, 1006, 'Rate limit exceeded.')
+            return status, data, headers
+        if self._random.random() < self.error_rate:
+            status, data, _ = _error(500, 1000, 'Internal server error.')
+            return status, data, headers
+        if method == 'POST':
+            params = body
+        try:
+            data = self._route(method, path.split('/'), params)
+        except (KeyError, TypeError, ValueError):
+            return _error(400, 1001, 'Invalid argument.')
+        if data is None:
+            return _error(404, 1002, 'Not found.')
+        return 200, data, headers
+
+    def _route(self, method, parts, params):
+        '''Serves the data of an API endpoint, or ``None`` if it does not
+        exist. The `params` of a POST request are its JSON body.'''
+        if parts[0] != 'v1' or len(parts) < 2:
+            return None
+        resource, rest = parts[1], parts[2:]
+        if resource == 'time' and not rest:
+            return {'time': _iso(time.time())}
+        if resource == 'accounts':
+            return self._route_accounts(method, rest, params)
+        if resource == 'markets':
+            return self._route_markets(method, rest, params)
+        if resource == 'symbols':
+            return self._route_symbols(rest, params)
+        return None
+
+    def _route_accounts(self, method, rest, params):
+        if not rest:
+            return {'accounts': [
+                {'type': 'Margin', 'number': number, 'status': 'Active',
+                 'isPrimary': i == 0, 'isBilling': i == 0,
+                 'clientAccountType': 'Individual'}
+                for i, number in enumerate(self.account_numbers)
+            ], 'userId': 1}
+        number = rest[0]
+        if number not in self._orders or len(rest) < 2:
+            return None
+        kind = rest[1]
+        if kind == 'positions':
+            return {'positions': [
+                self._position(symbol_id)
+                for symbol_id in range(1, min(self.symbol_count, 10) + 1)
+            ]}
+        if kind == 'balances':
+            balances = [self._balance('CAD'), self._balance('USD')]
+            return {
+                'perCurrencyBalances': balances,
+                'combinedBalances': balances,
+                'sodPerCurrencyBalances': balances,
+                'sodCombinedBalances': balances
+            }
+        if kind == 'executions':
+            return {'executions': []}
+        if kind == 'activities':
+            return {'activities': []}
+        if kind == 'orders':
+            return self._route_orders(method, number, rest[2:], params)
+        return None
+
+    def _route_orders(self, method, number, rest, params):
+        orders = self._orders[number]
+        if method == 'GET' and not rest:
+            with self._lock:
+                listed = list(orders.values())
+            if params.get('stateFilter') == 'Open':
+                listed = [o for o in listed if o['state'] != 'Canceled']
+            return {'orders': listed}
+        if method == 'DELETE' and len(rest) == 1:
+            with self._lock:
+                order = orders.get(int(rest[0]))
+                if order is None:
+                    return None
+                order['state'] = 'Canceled'
+            return {'orderId': order['id']}
+        if method == 'POST':
+            kind = rest[0] if rest and rest[0] in ('bracket', 'strategy') \
+                else None
+            if kind == 'bracket':
+                components = params['components']
+            elif kind == 'strategy':
+                components = [params]
+                if not params['legs']:
+                    raise ValueError(params)
+            else:
+                components = [params]
+            if rest and rest[-1] == 'impact':
+                quantity = sum(
+                    float(c.get('quantity') or 1) for c in components)
+                price = float(params.get('limitPrice')
+                    or components[0].get('limitPrice') or 100)
+                return {
+                    'estimatedCommissions': 4.95,
+                    'buyingPowerEffect': -quantity * price,
+                    'buyingPowerResult': 100000 - quantity * price,
+                    'maintExcessEffect': -quantity * price / 2,
+                    'maintExcessResult': 50000 - quantity * price / 2,
+                    'side': params.get('action', 'Buy'),
+                    'tradeValueCalculation': '',
+                    'price': price
+                }
+            placed = []
+            with self._lock:
+                for component in components:
+                    order_id = next(self._order_ids)
+                    order = {
+                        'id': order_id,
+                        'symbolId': int(params['symbolId']),
+                        'totalQuantity': float(
+                            component.get('quantity') or 0),
+                        'side': component.get('action'),
+                        'orderType': component.get('orderType'),
+                        'limitPrice': component.get('limitPrice'),
+                        'state': 'Accepted',
+                        'creationTime': _iso(time.time())
+                    }
+                    if kind == 'strategy':
+                        order['strategyType'] = params.get('strategy')
+                        order['legs'] = params['legs']
+                    orders[order_id] = order
+                    placed.append(order)
+            return {'orderId': placed[0]['id'], 'orders': placed}
+        return None
+
+    def _route_markets(self, method, rest, params):
+        if not rest:
+            return {'markets': [{'name': 'TSX'}, {'name': 'NYSE'}]}
+        if rest[0] == 'quotes':
+            if rest[1:] in (['options'], ['strategies']):
+                # Served as POST only, with the request in the JSON body.
+                if method != 'POST':
+                    return None
+                if rest[1] == 'options':
+                    return {'optionQuotes': self._option_quotes(params)}
+                return {'strategyQuotes': [
+                    self._strategy_quote(variant)
+                    for variant in params['variants']
+                ]}
+            if len(rest) == 1:
+                ids = params['ids'].split(',')
+                return {'quotes': [self._quote(int(id)) for id in ids]}
+            return {'quotes': [self._quote(int(rest[1]))]}
+        if rest[0] == 'candles' and len(rest) == 2:
+            return {'candles': self._candles(int(rest[1]), params)}
+        return None
+
+    def _route_symbols(self, rest, params):
+        if not rest:
+            if 'ids' in params:
+                ids = [int(id) for id in params['ids'].split(',')]
+            else:
+                ids = [
+                    int(name[3:]) for name in params['names'].split(',')
+                    if name.startswith('SYM')
+                ]
+            return {'symbols': [self._symbol(id) for id in ids]}
+        if rest[0] == 'search':
+            prefix = params.get('prefix', '').upper()
+            return {'symbols': [
+                {'symbol': 'SYM{}'.format(id), 'symbolId': id}
+                for id in range(1, self.symbol_count + 1)
+                if 'SYM{}'.format(id).startswith(prefix)
+            ][:20]}
+        symbol_id = int(rest[0])
+        if len(rest) == 1:
+            return {'symbols': [self._symbol(symbol_id)]}
+        if rest[1] == 'options':
+            return {'optionChain': self._option_chain(symbol_id)}
+        return None
+
+    def _price(self, symbol_id, timestamp):
+        '''Deterministic synthetic price of a symbol at a time.'''
+        return round(50 + symbol_id % 100 + 5 * math.sin(
+            symbol_id + timestamp / 3600), 2)
+
+    def _quote(self, symbol_id):
+        price = self._price(symbol_id, time.time())
+        return {
+            'symbol': 'SYM{}'.format(symbol_id),
+            'symbolId': symbol_id,
+            'tier': '',
+            'bidPrice': round(price - 0.01, 2),
+            'bidSize': 100,
+            'askPrice': round(price + 0.01, 2),
+            'askSize': 100,
+            'lastTradePriceTrHrs': price,
+            'lastTradePrice': price,
+            'lastTradeSize': 100,
+            'lastTradeTick': 'Equal',
+            'lastTradeTime': _iso(time.time()),
+            'volume': 1000000,
+            'openPrice': price,
+            'highPrice': price,
+            'lowPrice': price,
+            'delay': 0,
+            'isHalted': False,
+            'high52w': price * 1.2,
+            'low52w': price * 0.8,
+            'VWAP': price
+        }
+
+    def _option_quotes(self, params):
+        '''Quotes of the options requested by id, or by filters on the chain of
+        their underlying.'''
+        ids = list(params.get('optionIds') or [])
+        for option_filter in params.get('filters') or []:
+            underlying_id = int(option_filter['underlyingId'])
+            for expiry in self._option_chain(underlying_id):
+                for strike in expiry['chainPerRoot'][0]['chainPerStrikePrice']:
+                    low = option_filter.get('minStrikePrice')
+                    high = option_filter.get('maxStrikePrice')
+                    if low is not None and strike['strikePrice'] < low \
+                        or high is not None and strike['strikePrice'] > high:
+                        continue
+                    kind = option_filter.get('optionType')
+                    if kind in (None, 'Call'):
+                        ids.append(strike['callSymbolId'])
+                    if kind in (None, 'Put'):
+                        ids.append(strike['putSymbolId'])
+        if not ids and not params.get('filters'):
+            raise ValueError(params)
+        return [self._quote(int(id)) for id in ids]
+
+    def _strategy_quote(self, variant):
+        legs = variant['legs']
+        price = sum(
+            (1 if leg.get('action') == 'Buy' else -1) * leg.get('ratio', 1)
+            * self._price(int(leg['symbolId']), time.time())
+            for leg in legs)
+        return {
+            'variantId': variant['variantId'],
+            'bidPrice': round(price - 0.01, 2),
+            'askPrice': round(price + 0.01, 2),
+            'underlying': 'SYM{}'.format(int(legs[0]['symbolId'])),
+            'underlyingId': int(legs[0]['symbolId']),
+            'openPrice': None,
+            'volatility': 0,
+            'delta': 0,
+            'gamma': 0,
+            'theta': 0,
+            'vega': 0,
+            'rho': 0,
+            'isRealTime': True
+        }
+
+    def _candles(self, symbol_id, params):
+        start = timestamp_ns(params['startTime'])
+        end = timestamp_ns(params['endTime'])
+        if NAT in (start, end):
+            raise ValueError(params)
+        step = Session.CANDLE_INTERVALS[params['interval']]
+        start, end = start // 10 ** 9, end // 10 ** 9
+        start -= start % step
+        candles = []
+        for candle_start in range(start, end, step)[:Session.MAX_CANDLES]:
+            open_price = self._price(symbol_id, candle_start)
+            close_price = self._price(symbol_id, candle_start + step)
+            candles.append({
+                'start': _iso(candle_start),
+                'end': _iso(candle_start + step),
+                'low': min(open_price, close_price),
+                'high': max(open_price, close_price),
+                'open': open_price,
+                'close': close_price,
+                'volume': 1000,
+                'VWAP': (open_price + close_price) / 2
+            })
+        return candles
+
+    def _symbol(self, symbol_id):
+        return {
+            'symbol': 'SYM{}'.format(symbol_id),
+            'symbolId': symbol_id,
+            'description': 'Simulated symbol {}'.format(symbol_id),
+            'securityType': 'Stock',
+            'listingExchange': 'TSX',
+            'currency': 'CAD',
+            'isTradable': True,
+            'isQuotable': True,
+            'hasOptions': True,
+            'prevDayClosePrice': self._price(symbol_id, time.time() - 86400)
+        }
+
+    def _position(self, symbol_id):
+        price = self._price(symbol_id, time.time())
+        return {
+            'symbol': 'SYM{}'.format(symbol_id),
+            'symbolId': symbol_id,
+            'openQuantity': 100,
+            'closedQuantity': 0,
+            'currentMarketValue': price * 100,
+            'currentPrice': price,
+            'averageEntryPrice': 50,
+            'closedPnl': 0,
+            'openPnl': (price - 50) * 100,
+            'totalCost': 5000,
+            'isRealTime': True,
+            'isUnderReorg': False
+        }
+
+    def _balance(self, currency):
+        return {
+            'currency': currency,
+            'cash': 100000,
+            'marketValue': 50000,
+            'totalEquity': 150000,
+            'buyingPower': 300000,
+            'maintenanceExcess': 100000,
+            'isRealTime': True
+        }
+
+    def _option_chain(self, symbol_id):
+        price = self._price(symbol_id, time.time())
+        today = datetime.now(timezone.utc).date()
+        chain = []
+        for week in range(1, 5):
+            expiry = today + timedelta(weeks=week)
+            strikes = [round(price * (1 + k / 20.0)) for k in range(-5, 6)]
+            chain.append({
+                'expiryDate': '{}T00:00:00.000000-05:00'.format(
+                    expiry.isoformat()),
+                'description': 'SYM{}'.format(symbol_id),
+                'listingExchange': 'MX',
+                'optionExerciseType': 'American',
+                'chainPerRoot': [{
+                    'root': 'SYM{}'.format(symbol_id),
+                    'multiplier': 100,
+                    'chainPerStrikePrice': [
+                        {
+                            'strikePrice': strike,
+                            'callSymbolId': symbol_id * 100000
+                                + week * 1000 + i * 2,
+                            'putSymbolId': symbol_id * 100000
+                                + week * 1000 + i * 2 + 1
+                        }
+                        for i, strike in enumerate(strikes)
+                    ]
+                }]
+            })
+        return chain
+
+def _percentile(values, fraction):
+    if not values:
+        return float('nan')
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def _report(latencies, errors, duration):
+    '''Formats the results of a load test.'''
+    latencies.sort()
+    lines = [
+        'requests: {}'.format(len(latencies)),
+        'errors: {}'.format(sum(errors.values())),
+        'throughput: {:.1f} calls/s'.format(len(latencies) / duration),
+    ]
+    for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99),
+        ('p99.9', 0.999)):
+        lines.append('{}: {:.2f} ms'.format(
+            name, _percentile(latencies, fraction) * 1000))
+    if latencies:
+        lines.append('max: {:.2f} ms'.format(latencies[-1] * 1000))
+    for error, count in errors.most_common():
+        lines.append('  {}: {}'.format(error, count))
+    return '\n'.join(lines)
+
+def _calls(session, simulator, symbols):
+    '''Returns the calls issued by the load generator.'''
+    account = simulator.account_numbers[0]
+    ids = list(range(1, symbols + 1))
+    return [
+        lambda: session.get_quotes(ids=ids),
+        lambda: session.get_quotes(id=random.choice(ids)),
+        lambda: session.get_positions(account),
+        lambda: session.get_balances(account),
+        lambda: session.get_symbols(ids=ids[:10]),
+    ]
+
+def run_load(simulator, duration=10, concurrency=16, use_async=False,
+    symbols=50, **session_kwargs):
+    ''' Drives sessions against a simulator and measures the latency of the
+    calls.
+
+    Parameters
+    ----------
+    simulator : :obj:`Simulator`
+        Started simulator.
+    duration : :obj:`float`, optional
+        Number of seconds the load is applied for.
+    concurrency : :obj:`int`, optional
+        Number of calls in flight at once.
+    use_async : :obj:`bool`, optional
+        Drive an :obj:`questradeapi.AsyncSession` from an event loop instead
+        of a :obj:`questradeapi.Session` from threads.
+    symbols : :obj:`int`, optional
+        Number of symbols quoted by the calls.
+    **session_kwargs
+        Additional keyword arguments passed to the session.
+
+    Returns
+    -------
+    :obj:`tuple`
+        Sorted latencies in seconds of the successful calls, and
+        :obj:`collections.Counter` of the errors raised.
+
+    '''
+    latencies = []
+    errors = Counter()
+    deadline = time.monotonic() + duration
+
+    def record(started, error):
+        if error is None:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors[type(error).__name__] += 1
+
+    if not use_async:
+        session = simulator.session(
+            pool_size=concurrency, max_workers=concurrency, **session_kwargs)
+        calls = _calls(session, simulator, symbols)
+
+        def worker():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    random.choice(calls)()
+                except Exception as e:
+                    record(started, e)
+                else:
+                    record(started, None)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        session.close()
+    else:
+        from .asyncsession import AsyncSession
+        session = simulator.session(
+            AsyncSession, max_workers=concurrency, **session_kwargs)
+        calls = _calls(session, simulator, symbols)
+
+        async def worker():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    await random.choice(calls)()
+                except Exception as e:
+                    record(started, e)
+                else:
+                    record(started, None)
+
+        async def main():
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        # A loop of its own, since there may be no current loop.
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(main())
+        finally:
+            loop.close()
+        session.close()
+    latencies.sort()
+    return latencies, errors
+
+def main(argv=None):
+    '''Runs a load test against a local simulator and prints a report.'''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--async', dest='use_async', action='store_true',
+        help='drive an AsyncSession instead of a Session')
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.02,
+        help='median server latency in seconds')
+    parser.add_argument('--latency-sigma', type=float, default=0.5)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--token-ttl', type=float, default=1800)
+    parser.add_argument('--no-rate-limit', action='store_true',
+        help='disable the rate limits of the simulator and the client')
+    args = parser.parse_args(argv)
+
+    rate_limits = None if args.no_rate_limit else RateLimiter.LIMITS
+    session_kwargs = {}
+    if args.no_rate_limit:
+        session_kwargs['rate_limiter'] = False
+    simulator = Simulator(
+        token_ttl=args.token_ttl, rate_limits=rate_limits,
+        latency=args.latency, latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        symbols=max(args.symbols, 1))
+    with simulator:
+        started = time.perf_counter()
+        latencies, errors = run_load(
+            simulator, args.duration, args.concurrency, args.use_async,
+            args.symbols, **session_kwargs)
+        elapsed = time.perf_counter() - started
+    print(_report(latencies, errors, elapsed))
+    print('responses: {}'.format(dict(sorted(simulator.stats.items()))))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+class SingleFlight():
+    ''' Coalesces concurrent calls sharing the same key.
+
+    While a call for a key is in flight, further calls for the same key do
+    not run their function: they wait for the call in flight and share its
+    result, or its exception.
+
+    '''
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        '''Calls a function, unless a call with the same key is in flight.
+
+        Parameters
+        ----------
+        key : hashable
+            Key identifying identical calls.
+        func : callable
+            Function called with the remaining arguments.
+
+        Returns
+        -------
+        object
+            Result of the call, possibly made by another thread.
+
+        '''
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        '''Returns the number of calls in flight.'''
+        with self._lock:
+            return len(self._calls)
+
+class MicroBatcher():
+    ''' Merges the calls made within a short window into a single batched
+    call.
+
+    The first call of a window waits `window` seconds, then fetches the keys
+    requested by every call of the window at once and hands each call its
+    own result.
+
+    Attributes
+    ----------
+    window : :obj:`float`
+        Number of seconds during which calls are merged.
+    fetch : callable
+        Called with the list of keys of a window, in the order they were
+        first requested. Returns a :obj:`dict` mapping each key to its result.
+
+    '''
+
+    def __init__(self, window, fetch):
+        '''Constructor.
+
+        Parameters
+        ----------
+        window : :obj:`float`
+            Number of seconds during which calls are merged.
+        fetch : callable
+            Called with the list of keys of a window, returns a :obj:`dict`
+            mapping each key to its result.
+
+        '''
+        self.window = window
+        self.fetch = fetch
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        '''Returns the result of a key, fetched along with the keys requested
+        by the other calls of the same window.
+
+        Parameters
+        ----------
+        key : hashable
+            Key to fetch.
+
+        Returns
+        -------
+        object
+            Result of the key, or ``None`` if `fetch` did not return it.
+
+        '''
+        with self._lock:
+            leader = self._pending is None
+            if leader:
+                self._pending = OrderedDict()
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = Future()
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                pending, self._pending = self._pending, None
+            try:
+                results = self.fetch(list(pending))
+            except BaseException as e:
+                for waiter in pending.values():
+                    waiter.set_exception(e)
+            else:
+                for pending_key, waiter in pending.items():
+                    waiter.set_result(results.get(pending_key))
+        return future.result()
@@ -0,0 +1,199 @@
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from .exceptions import QuestradeAPIError
+
+Delta = namedtuple('Delta', ('account_id', 'kind', 'key', 'previous', 'current'))
+Delta.__doc__ = '''Change of the state of an account.
+
+Attributes
+----------
+account_id : :obj:`str`
+    Account number.
+kind : :obj:`str`, {'position', 'balance', 'order'}
+    Kind of state that changed.
+key : :obj:`int` or :obj:`str`
+    Symbol id of a position, currency of a balance or id of an order.
+previous : object
+    Previous value, or ``None`` if it did not exist.
+current : object
+    Current value, or ``None`` if it no longer exists. Orders that are no
+    longer open have their final state, such as ``'Executed'`` or
+    ``'Canceled'``.
+'''
+
+Balance = namedtuple(
+    'Balance', ('cash', 'market_value', 'total_equity', 'buying_power'))
+Balance.__doc__ = '''Balance of an account in a given currency.'''
+
+class AccountSnapshot():
+    ''' Incrementally maintained state of a set of accounts.
+
+    Each call to :meth:`refresh` retrieves the positions, balances and open
+    orders of every account concurrently, and returns only what changed since
+    the previous call, so that consumers do work proportional to the changes
+    rather than to the size of the portfolio.
+
+    The state is kept in compact structures: the quantity held of each
+    position, a :obj:`Balance` per currency and the state of each open order.
+    Open orders include the ones placed up to :attr:`OPEN_ORDERS_LOOKBACK`
+    ago, such as good-till-canceled orders from earlier days. Orders that are
+    no longer open are looked up by id, so that their deltas tell the state
+    they ended in.
+
+    Attributes
+    ----------
+    session : :obj:`questradeapi.Session`
+        Session used to retrieve the state of the accounts.
+    account_ids : :obj:`list` of :obj:`str`
+        Account numbers.
+    positions : :obj:`dict`
+        Open quantity of each symbol id, per account.
+    balances : :obj:`dict`
+        :obj:`Balance` of each currency, per account.
+    orders : :obj:`dict`
+        State of each open order id, per account.
+
+    '''
+
+    POSITION = 'position'
+    BALANCE = 'balance'
+    ORDER = 'order'
+    # How far back open orders are looked up. Without a start time, the API
+    # only returns the orders placed today.
+    OPEN_ORDERS_LOOKBACK = timedelta(days=365)
+
+    def __init__(self, session, account_ids):
+        '''Constructor.
+
+        Parameters
+        ----------
+        session : :obj:`questradeapi.Session`
+            Session used to retrieve the state of the accounts.
+        account_ids : :obj:`list` of :obj:`str`
+            Account numbers.
+
+        '''
+        self.session = session
+        self.account_ids = [str(id) for id in account_ids]
+        self.positions = {id: {} for id in self.account_ids}
+        self.balances = {id: {} for id in self.account_ids}
+        self.orders = {id: {} for id in self.account_ids}
+
+    def _fetch(self, request):
+        '''Performs one of the requests of a refresh.'''
+        account_id, kind = request
+        if kind == self.POSITION:
+            response = self.session.get_positions(account_id)
+            key = 'positions'
+        elif kind == self.BALANCE:
+            response = self.session.get_balances(account_id)
+            key = 'perCurrencyBalances'
+        else:
+            # From midnight, so that the requests are the same all day long.
+            today = datetime.now(timezone.utc).replace(
+                tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+            response = self.session.get_orders(account_id, state_filter='Open',
+                start_time=today - self.OPEN_ORDERS_LOOKBACK)
+            key = 'orders'
+        if key not in response:
+            raise QuestradeAPIError(response)
+        return response[key]
+
+    def _fetch_closed(self, lookup):
+        '''Retrieves the final state of orders that are no longer open.'''
+        account_id, order_ids = lookup
+        response = self.session.get_orders(account_id, order_ids=order_ids)
+        if 'orders' not in response:
+            raise QuestradeAPIError(response)
+        return {order['id']: order['state'] for order in response['orders']}
+
+    def _parse(self, kind, records):
+        '''Reduces records to the compact state of their kind.'''
+        if kind == self.POSITION:
+            return {
+                record['symbolId']: record['openQuantity']
+                for record in records
+                if record['openQuantity']
+            }
+        if kind == self.BALANCE:
+            return {
+                record['currency']: Balance(
+                    record['cash'],
+                    record['marketValue'],
+                    record['totalEquity'],
+                    record['buyingPower']
+                )
+                for record in records
+            }
+        return {record['id']: record['state'] for record in records}
+
+    @staticmethod
+    def _diff(account_id, kind, previous, current, final={}):
+        '''Lists the changes between two states, reporting the keys that
+        disappeared with their `final` value, if known.'''
+        deltas = []
+        for key, value in current.items():
+            old = previous.get(key)
+            if old != value:
+                deltas.append(Delta(account_id, kind, key, old, value))
+        for key, old in previous.items():
+            if key not in current:
+                deltas.append(
+                    Delta(account_id, kind, key, old, final.get(key)))
+        return deltas
+
+    def refresh(self):
+        '''Retrieves the current state of the accounts.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`Delta`
+            Changes since the previous refresh. On the first refresh, the
+            whole state is reported as new.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.QuestradeAPIError`
+            If the server returns an error for one of the requests. The state
+            is left unchanged.
+
+        '''
+        states = {
+            self.POSITION: self.positions,
+            self.BALANCE: self.balances,
+            self.ORDER: self.orders
+        }
+        requests = [
+            (account_id, kind)
+            for account_id in self.account_ids
+            for kind in states
+        ]
+        results = list(self.session._map(self._fetch, requests))
+        parsed = [
+            (account_id, kind, self._parse(kind, records))
+            for (account_id, kind), records in zip(requests, results)
+        ]
+
+        lookups = []
+        for account_id, kind, current in parsed:
+            if kind == self.ORDER:
+                closed = [id for id in self.orders[account_id]
+                    if id not in current]
+                if closed:
+                    lookups.append((account_id, closed))
+        final = dict(zip(
+            (account_id for account_id, _ in lookups),
+            self.session._map(self._fetch_closed, lookups)
+        ))
+
+        deltas = []
+        updates = []
+        for account_id, kind, current in parsed:
+            previous = states[kind][account_id]
+            deltas.extend(self._diff(account_id, kind, previous, current,
+                final.get(account_id, {}) if kind == self.ORDER else {}))
+            updates.append((states[kind], account_id, current))
+        for state, account_id, current in updates:
+            state[account_id] = current
+        return deltas
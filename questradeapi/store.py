@@ -0,0 +1,219 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from . import columnar
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _to_ns(date):
+    '''Converts a naive UTC datetime to nanoseconds since the epoch.'''
+    delta = date - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000000 \
+        + delta.microseconds * 1000
+
+def _from_ns(ns):
+    '''Converts nanoseconds since the epoch to a naive UTC datetime.'''
+    return _EPOCH + timedelta(microseconds=ns // 1000)
+
+class CandleStore():
+    ''' Local persistent store of historical candlesticks.
+
+    Candlesticks are kept in a SQLite database, partitioned by symbol and
+    interval. :meth:`sync` only downloads the candlesticks missing since the
+    last stored one, and :meth:`query` serves range reads from disk without
+    any network access.
+
+    Like the :obj:`questradeapi.Session` calls, dates are naive
+    :obj:`datetime` objects in UTC.
+
+    Attributes
+    ----------
+    session : :obj:`questradeapi.Session`
+        Session used to download the candlesticks.
+    path : :obj:`str`
+        Path of the SQLite database.
+
+    '''
+
+    COLUMNS = (
+        'start', 'end', 'low', 'high', 'open', 'close', 'volume', 'VWAP'
+    )
+
+    def __init__(self, session, path):
+        '''Constructor.
+
+        Parameters
+        ----------
+        session : :obj:`questradeapi.Session`
+            Session used to download the candlesticks.
+        path : :obj:`str`
+            Path of the SQLite database. Created if it does not exist.
+
+        '''
+        self.session = session
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS candles ('
+                'symbol_id INTEGER NOT NULL, '
+                'interval TEXT NOT NULL, '
+                'start_ns INTEGER NOT NULL, '
+                'start TEXT, end TEXT, low REAL, high REAL, open REAL, '
+                'close REAL, volume REAL, VWAP REAL, '
+                'PRIMARY KEY (symbol_id, interval, start_ns)'
+                ') WITHOUT ROWID'
+            )
+
+    def close(self):
+        '''Closes the database.'''
+        with self._lock:
+            self._connection.close()
+
+    def last(self, symbol_id, interval):
+        '''Returns the start of the most recent stored candlestick.
+
+        Parameters
+        ----------
+        symbol_id : :obj:`int`
+            Internal symbol identifier.
+        interval : :obj:`str`
+            Interval of a single candlestick.
+
+        Returns
+        -------
+        :obj:`datetime`
+            Start of the last stored candlestick, or ``None`` if there is none.
+
+        '''
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT MAX(start_ns) FROM candles '
+                'WHERE symbol_id = ? AND interval = ?',
+                (symbol_id, interval)
+            ).fetchone()
+        return None if row[0] is None else _from_ns(row[0])
+
+    def insert(self, symbol_id, interval, candles):
+        '''Stores candlesticks, replacing the ones with the same start.
+
+        Parameters
+        ----------
+        symbol_id : :obj:`int`
+            Internal symbol identifier.
+        interval : :obj:`str`
+            Interval of a single candlestick.
+        candles : iterable of :obj:`dict`
+            Candlestick structures as returned by the API.
+
+        Returns
+        -------
+        :obj:`int`
+            Number of candlesticks stored.
+
+        '''
+        rows = [
+            (symbol_id, interval, columnar.timestamp_ns(candle['start'])) +
+            tuple(candle.get(column) for column in self.COLUMNS)
+            for candle in candles
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO candles VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+        return len(rows)
+
+    def sync(self, symbol_ids, interval, start_time=None, end_time=None,
+        batch_size=10000):
+        '''Downloads the candlesticks missing from the store.
+
+        For each symbol, only the range between the last stored candlestick
+        and `end_time` is requested. The last stored candlestick is requested
+        again since it may have been incomplete when it was stored.
+
+        Parameters
+        ----------
+        symbol_ids : :obj:`list` of :obj:`int`
+            Internal symbol identifiers.
+        interval : :obj:`str`
+            Interval of a single candlestick.
+        start_time : :obj:`datetime`, optional
+            Beginning of the range downloaded for symbols that have no stored
+            candlesticks yet. Required if there are such symbols.
+        end_time : :obj:`datetime`, optional
+            End of the range. Defaults to now.
+        batch_size : :obj:`int`, optional
+            Number of candlesticks written to the database at once.
+
+        Returns
+        -------
+        :obj:`dict`
+            Number of candlesticks stored for each symbol id.
+
+        '''
+        if end_time is None:
+            end_time = datetime.now(timezone.utc).replace(tzinfo=None)
+        counts = {}
+        for symbol_id in symbol_ids:
+            begin = self.last(symbol_id, interval) or start_time
+            if begin is None:
+                raise ValueError(
+                    'No candlesticks stored for symbol {}, a start_time is '
+                    'required.'.format(symbol_id))
+            counts[symbol_id] = 0
+            batch = []
+            candles = self.session.get_candles_range(
+                symbol_id, begin, end_time, interval)
+            for candle in candles:
+                batch.append(candle)
+                if len(batch) >= batch_size:
+                    counts[symbol_id] += self.insert(symbol_id, interval, batch)
+                    batch = []
+            counts[symbol_id] += self.insert(symbol_id, interval, batch)
+        return counts
+
+    def query(self, symbol_id, interval, start_time=None, end_time=None,
+        format=None):
+        '''Reads stored candlesticks.
+
+        Parameters
+        ----------
+        symbol_id : :obj:`int`
+            Internal symbol identifier.
+        interval : :obj:`str`
+            Interval of a single candlestick.
+        start_time : :obj:`datetime`, optional
+            Beginning of the range. Defaults to the first stored candlestick.
+        end_time : :obj:`datetime`, optional
+            End of the range. Defaults to the last stored candlestick.
+        format : :obj:`str`, {'numpy', 'pandas', 'arrow'}, optional
+            Return the candlesticks as columns of the given format. See
+            :func:`questradeapi.columnar.convert`.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`dict`
+            Candlestick structures in chronological order, or their columns if
+            `format` is specified.
+
+        '''
+        sql = 'SELECT {} FROM candles WHERE symbol_id = ? AND interval = ?'
+        sql = sql.format(', '.join(self.COLUMNS))
+        params = [symbol_id, interval]
+        if start_time is not None:
+            sql += ' AND start_ns >= ?'
+            params.append(_to_ns(start_time))
+        if end_time is not None:
+            sql += ' AND start_ns <= ?'
+            params.append(_to_ns(end_time))
+        sql += ' ORDER BY start_ns'
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        candles = [dict(zip(self.COLUMNS, row)) for row in rows]
+        if format is None:
+            return candles
+        return columnar.convert_candles(candles, format)
@@ -0,0 +1,446 @@
+'''
+Streaming of real-time data over WebSockets.
+
+The `websockets` package is an optional dependency required by this module.
+'''
+
+import asyncio
+import functools
+import json
+from collections import deque, namedtuple
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+from .exceptions import QuestradeAPIError
+from .utils import _import_optional
+
+_CLOSED = object()
+
+class Stream():
+    ''' Base class of the WebSocket streams offered by the Questrade API.
+
+    A stream first asks the API server for the port it streams on, connects to
+    it and authenticates with the session's access token. It reconnects with
+    an exponential backoff when the connection is lost, refreshing the access
+    token if it was rejected.
+
+    Received items are delivered to the callbacks registered with
+    :meth:`subscribe` and can be consumed with ``async for``. Iteration
+    applies backpressure: once `maxsize` items are waiting to be consumed, no
+    more data is read from the connection until the consumer catches up.
+
+    Attributes
+    ----------
+    session : :obj:`questradeapi.Session`
+        Session used to authenticate the stream.
+    maxsize : :obj:`int`
+        Maximum number of items waiting to be consumed by iteration.
+
+    '''
+
+    def __init__(self, session, maxsize=1000, reconnect_delay=1,
+        max_reconnect_delay=30):
+        '''Constructor.
+
+        Parameters
+        ----------
+        session : :obj:`questradeapi.Session`
+            Session used to authenticate the stream.
+        maxsize : :obj:`int`, optional
+            Maximum number of items waiting to be consumed by iteration.
+        reconnect_delay : :obj:`float`, optional
+            Number of seconds to wait before the first reconnection attempt.
+        max_reconnect_delay : :obj:`float`, optional
+            Maximum number of seconds between two reconnection attempts.
+
+        '''
+        self.session = session
+        self.maxsize = maxsize
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._callbacks = []
+        self._queues = []
+        self._task = None
+        self._websocket = None
+        self._closed = False
+
+    def subscribe(self, callback):
+        '''Registers a callback called with every item received.
+
+        Parameters
+        ----------
+        callback : callable or coroutine function
+            Called with each item. Coroutine functions are awaited before the
+            next item is delivered.
+
+        '''
+        self._callbacks.append(callback)
+
+    def _stream_port(self):
+        '''Requests the port of the stream. Blocking.
+
+        Returns
+        -------
+        :obj:`int`
+            Port of the stream on the API server.
+
+        '''
+        raise NotImplementedError
+
+    def _parse(self, message):
+        '''Extracts the items of a message.
+
+        Returns
+        -------
+        :obj:`list`
+            Items of the message.
+
+        '''
+        raise NotImplementedError
+
+    async def _on_connect(self, disconnected_at):
+        '''Called after each successful authentication.
+
+        Parameters
+        ----------
+        disconnected_at : :obj:`datetime`
+            Time (naive UTC) at which the previous connection was lost, or
+            ``None`` on the first connection.
+
+        '''
+
+    async def _deliver(self, item):
+        for callback in self._callbacks:
+            result = callback(item)
+            if asyncio.iscoroutine(result):
+                await result
+        for queue in self._queues:
+            await queue.put(item)
+
+    async def _connect(self):
+        '''Opens and authenticates a connection to the stream.
+
+        Returns
+        -------
+        object
+            The open WebSocket connection.
+
+        '''
+        websockets = _import_optional('websockets')
+        loop = asyncio.get_event_loop()
+        port = await loop.run_in_executor(None, self._stream_port)
+        access_token, api_server = await loop.run_in_executor(
+            None, self.session._get_access_data)
+        server = urlparse(api_server)
+        scheme = 'wss' if server.scheme == 'https' else 'ws'
+        uri = '{}://{}:{}/'.format(scheme, server.hostname, port)
+        websocket = await websockets.connect(uri)
+        await websocket.send(access_token)
+        response = json.loads(await websocket.recv())
+        if not response.get('success'):
+            await websocket.close()
+            await loop.run_in_executor(
+                None, self.session.refresh_access_token, access_token)
+            raise ConnectionError('Stream authentication failed.')
+        return websocket
+
+    async def run(self):
+        '''Connects to the stream and delivers the items received until
+        :meth:`close` is called.
+
+        Raises
+        ------
+        :obj:`questradeapi.exceptions.QuestradeAPIError`
+            If the API server refuses to open the stream.
+
+        '''
+        websockets = _import_optional('websockets')
+        delay = self.reconnect_delay
+        connected = False
+        disconnected_at = None
+        try:
+            while not self._closed:
+                try:
+                    self._websocket = await self._connect()
+                    delay = self.reconnect_delay
+                    await self._on_connect(disconnected_at)
+                    connected = True
+                    disconnected_at = None
+                    async for message in self._websocket:
+                        for item in self._parse(json.loads(message)):
+                            await self._deliver(item)
+                except (OSError, ConnectionError,
+                    websockets.exceptions.WebSocketException):
+                    pass
+                finally:
+                    if self._websocket is not None:
+                        await self._websocket.close()
+                        self._websocket = None
+                    if connected and disconnected_at is None:
+                        disconnected_at = datetime.now(timezone.utc).replace(
+                            tzinfo=None)
+                if self._closed:
+                    break
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+        finally:
+            self._closed = True
+            for queue in self._queues:
+                # Make room for the sentinel if the consumer is lagging behind.
+                while queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(_CLOSED)
+
+    def start(self):
+        '''Runs the stream in the background of the current event loop.
+
+        Returns
+        -------
+        :obj:`asyncio.Task`
+            Task running the stream.
+
+        '''
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def close(self):
+        '''Stops the stream and ends the iterations in progress.'''
+        self._closed = True
+        if self._task is not None:
+            # The task may be waiting on a lagging consumer, cancel it.
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def __aiter__(self):
+        queue = asyncio.Queue(self.maxsize)
+        self._queues.append(queue)
+        self.start()
+        try:
+            while True:
+                item = await queue.get()
+                if item is _CLOSED:
+                    task = self._task
+                    if not task.cancelled() and task.exception():
+                        raise task.exception()
+                    break
+                yield item
+        finally:
+            self._queues.remove(queue)
+
+class QuoteStream(Stream):
+    ''' Stream of real-time Level 1 quotes for a set of symbols.
+
+    Items are quote structures, as returned by
+    :meth:`questradeapi.Session.get_quotes`.
+
+    Example
+    -------
+    .. code-block:: python
+
+        async for quote in QuoteStream(sess, [8049, 9291]):
+            print(quote['symbol'], quote['lastTradePrice'])
+
+    '''
+
+    def __init__(self, session, ids, **kwargs):
+        '''Constructor.
+
+        Parameters
+        ----------
+        session : :obj:`questradeapi.Session`
+            Session used to authenticate the stream.
+        ids : :obj:`list` of :obj:`int`
+            Internal identifiers of the symbols to stream quotes for.
+        **kwargs
+            Additional keyword arguments passed to :obj:`Stream`.
+
+        '''
+        super().__init__(session, **kwargs)
+        self.ids = ids
+
+    def _stream_port(self):
+        params = {
+            'ids': ','.join(map(str, self.ids)),
+            'stream': 'true',
+            'mode': 'WebSocket'
+        }
+        response = self.session.do_get('v1/markets/quotes', params)
+        if 'streamPort' not in response:
+            raise QuestradeAPIError(response)
+        return response['streamPort']
+
+    def _parse(self, message):
+        return message.get('quotes', [])
+
+OrderEvent = namedtuple('OrderEvent', ('account_id', 'order', 'previous'))
+OrderEvent.__doc__ = '''Change of an order.
+
+Attributes
+----------
+account_id : :obj:`str`
+    Account number.
+order : :obj:`dict`
+    Order structure, as returned by :meth:`questradeapi.Session.get_orders`.
+previous : :obj:`dict`
+    Previously known version of the order, or ``None`` if it is new.
+'''
+
+ExecutionEvent = namedtuple('ExecutionEvent', ('account_id', 'execution'))
+ExecutionEvent.__doc__ = '''New execution.
+
+Attributes
+----------
+account_id : :obj:`str`
+    Account number.
+execution : :obj:`dict`
+    Execution structure, as returned by
+    :meth:`questradeapi.Session.get_executions`.
+'''
+
+class OrderEventStream(Stream):
+    ''' Stream of order and execution notifications for a set of accounts.
+
+    Items are :obj:`OrderEvent` and :obj:`ExecutionEvent` instances. Only
+    actual changes are emitted: the stream reconciles every notification with
+    a local copy of the orders of each account.
+
+    The local orders are seeded with the open orders of each account on the
+    first connection, including the ones placed up to
+    :attr:`OPEN_ORDERS_LOOKBACK` ago, such as good-till-canceled orders from
+    earlier days. After a disconnection, the orders created and the
+    executions made while disconnected are polled with :meth:`get_orders
+    <questradeapi.Session.get_orders>` and :meth:`get_executions
+    <questradeapi.Session.get_executions>`, along with the local orders that
+    were still open, before notifications resume.
+
+    Attributes
+    ----------
+    account_ids : :obj:`list` of :obj:`str`
+        Account numbers to follow.
+    orders : :obj:`dict`
+        Known orders of each account, keyed by order id.
+
+    '''
+
+    MAX_EXECUTION_IDS = 10000
+    # How far back open orders are looked up. Without a start time, the API
+    # only returns the orders placed today.
+    OPEN_ORDERS_LOOKBACK = timedelta(days=365)
+    # States of the orders that can no longer change.
+    FINAL_STATES = ('Executed', 'Canceled', 'PartialCanceled', 'Rejected',
+        'Expired', 'Replaced', 'Failed')
+
+    def __init__(self, session, account_ids, **kwargs):
+        '''Constructor.
+
+        Parameters
+        ----------
+        session : :obj:`questradeapi.Session`
+            Session used to authenticate the stream.
+        account_ids : :obj:`list` of :obj:`str`
+            Account numbers to follow.
+        **kwargs
+            Additional keyword arguments passed to :obj:`Stream`.
+
+        '''
+        super().__init__(session, **kwargs)
+        self.account_ids = [str(id) for id in account_ids]
+        self.orders = {id: {} for id in self.account_ids}
+        self._execution_ids = set()
+        self._execution_order = deque()
+
+    def _stream_port(self):
+        response = self.session.do_get(
+            'v1/notifications', {'mode': 'WebSocket'})
+        if 'streamPort' not in response:
+            raise QuestradeAPIError(response)
+        return response['streamPort']
+
+    def _order_event(self, account_id, order):
+        '''Reconciles an order with the local orders.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`OrderEvent`
+            Event of the change, if the order changed.
+
+        '''
+        orders = self.orders.setdefault(account_id, {})
+        previous = orders.get(order['id'])
+        if previous == order:
+            return []
+        orders[order['id']] = order
+        return [OrderEvent(account_id, order, previous)]
+
+    def _execution_event(self, account_id, execution):
+        '''Deduplicates an execution.
+
+        Returns
+        -------
+        :obj:`list` of :obj:`ExecutionEvent`
+            Event of the execution, if it was not seen before.
+
+        '''
+        if execution['id'] in self._execution_ids:
+            return []
+        self._execution_ids.add(execution['id'])
+        self._execution_order.append(execution['id'])
+        if len(self._execution_order) > self.MAX_EXECUTION_IDS:
+            self._execution_ids.discard(self._execution_order.popleft())
+        return [ExecutionEvent(account_id, execution)]
+
+    def _parse(self, message):
+        account_id = str(message.get('accountNumber', ''))
+        events = []
+        for order in message.get('orders', []):
+            events += self._order_event(account_id, order)
+        for execution in message.get('executions', []):
+            events += self._execution_event(account_id, execution)
+        return events
+
+    async def _on_connect(self, disconnected_at):
+        loop = asyncio.get_event_loop()
+        # From midnight, so that the requests are the same all day long.
+        today = datetime.now(timezone.utc).replace(
+            tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+        for account_id in self.account_ids:
+            if disconnected_at is None:
+                response = await loop.run_in_executor(
+                    None, functools.partial(
+                        self.session.get_orders, account_id,
+                        state_filter='Open',
+                        start_time=today - self.OPEN_ORDERS_LOOKBACK))
+                for order in response.get('orders', []):
+                    self.orders[account_id][order['id']] = order
+                continue
+            orders = await loop.run_in_executor(
+                None, functools.partial(
+                    self.session.get_orders, account_id, state_filter='All',
+                    start_time=disconnected_at))
+            # Orders created before the disconnection may have been filled or
+            # canceled since.
+            open_ids = [
+                id for id, order in self.orders[account_id].items()
+                if order.get('state') not in self.FINAL_STATES
+            ]
+            known = {'orders': []}
+            if open_ids:
+                known = await loop.run_in_executor(
+                    None, functools.partial(
+                        self.session.get_orders, account_id,
+                        order_ids=open_ids))
+            executions = await loop.run_in_executor(
+                None, functools.partial(
+                    self.session.get_executions, account_id,
+                    start_time=disconnected_at))
+            events = []
+            for order in orders.get('orders', []) + known.get('orders', []):
+                events += self._order_event(account_id, order)
+            for execution in executions.get('executions', []):
+                events += self._execution_event(account_id, execution)
+            for event in events:
+                await self._deliver(event)
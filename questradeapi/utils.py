@@ -1,5 +1,16 @@
+import importlib
+
 from tzlocal import get_localzone
 
+def _import_optional(module):
+    ''' Imports an optional dependency, failing with a helpful message.'''
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        raise ImportError(
+            "The '{}' package is required for this feature.".format(
+                module.split('.')[0]))
+
 def add_local_tz(date):
     ''' Add the local time zone to the given date and returns a new date.
 
@@ -49,9 +60,9 @@ def create_option_id_filter(option_type, underlying_id, expiry_date,
     option_id_filter = {
         'optionType': option_type,
         'underlyingId': underlying_id,
-        'expiry_date': expiry_date,
+        'expiryDate': expiry_date,
         'minStrikePrice': min_strike_price,
-        'maxStrikePrice': maxStrikePrice
+        'maxStrikePrice': max_strike_price
     }
     return option_id_filter
 
@@ -23,4 +23,12 @@ setuptools.setup(
         'requests',
         'tzlocal',
     ),
+    extras_require={
+        'numpy': ('numpy',),
+        'pandas': ('numpy', 'pandas'),
+        'arrow': ('pyarrow',),
+        'stream': ('websockets',),
+        'opentelemetry': ('opentelemetry-api',),
+        'fastjson': ('orjson',),
+    },
 )
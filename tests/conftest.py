@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+import uuid
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from questradeapi import Session
+
+Request = namedtuple('Request', ('method', 'path', 'params', 'body', 'headers'))
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are sent separately: without this, delayed
+    # acknowledgements hold the body of keep-alive responses for 40 ms.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        content = self.rfile.read(length) if length else b''
+        request = Request(
+            self.command,
+            url.path.lstrip('/'),
+            {name: values[-1] for name, values in parse_qs(url.query).items()},
+            json.loads(content.decode('utf-8')) if content else None,
+            dict(self.headers)
+        )
+        status, body, headers = self.server.fake.handle(request)
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_DELETE = _handle
+
+class FakeServer():
+    ''' Local HTTP server standing in for the login and API servers.
+
+    The login server issues new tokens for any refresh token. API requests
+    are answered by the handler routed to their method and path, called with
+    the :obj:`Request` and returning a body, or a status, body and headers
+    tuple. Unrouted requests are answered with a 404.
+
+    '''
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.redeems = 0
+        self.expires_in = 1800
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.fake = self
+        self.url = 'http://127.0.0.1:{}'.format(self._server.server_port)
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def route(self, method, path, handler):
+        if not callable(handler):
+            body = handler
+            handler = lambda request: body
+        self.routes[(method, path)] = handler
+
+    def handle(self, request):
+        if request.path == Session.ACCESS_TOKEN_ENDPOINT.lstrip('/'):
+            with self._lock:
+                self.redeems += 1
+            return 200, {
+                'access_token': uuid.uuid4().hex,
+                'refresh_token': uuid.uuid4().hex,
+                'expires_in': self.expires_in,
+                'token_type': 'Bearer',
+                'api_server': self.url + '/'
+            }, {}
+        with self._lock:
+            self.requests.append(request)
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            return 404, {'code': 1002, 'message': 'Not found.'}, {}
+        response = handler(request)
+        if isinstance(response, tuple):
+            return response
+        return 200, response, {}
+
+    def session(self, session_class=Session, **kwargs):
+        session = session_class('refresh-token', **kwargs)
+        getattr(session, 'session', session).ACCESS_TOKEN_HOST = self.url
+        return session
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+@pytest.fixture
+def server():
+    fake = FakeServer()
+    yield fake
+    fake.close()
+
+def run(coroutine):
+    '''Runs a coroutine to completion in a new event loop.'''
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+from questradeapi import AsyncSession
+
+from conftest import run
+
+def test_mirrored_call(server):
+    server.route('GET', 'v1/time', {'time': '2018-01-01T00:00:00.000000-05:00'})
+    session = server.session(AsyncSession)
+    try:
+        response = run(session.get_time())
+    finally:
+        session.close()
+    assert response == {'time': '2018-01-01T00:00:00.000000-05:00'}
+    assert server.requests[0].headers['Authorization'].startswith('Bearer ')
+
+def test_concurrent_calls_redeem_once(server):
+    server.route('GET', 'v1/time', {'time': ''})
+    session = server.session(AsyncSession)
+
+    async def calls():
+        return await asyncio.gather(*(session.get_time() for _ in range(20)))
+
+    try:
+        assert len(run(calls())) == 20
+    finally:
+        session.close()
+    assert server.redeems == 1
+
+def test_gather_accounts(server):
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def positions(request):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return {'positions': [{'symbol': request.path.split('/')[2]}]}
+
+    ids = [str(i) for i in range(12)]
+    for id in ids:
+        server.route('GET', 'v1/accounts/{}/positions'.format(id), positions)
+    session = server.session(AsyncSession, rate_limiter=False)
+    try:
+        responses = run(session.gather_accounts(
+            'get_positions', ids, concurrency=3))
+    finally:
+        session.close()
+    assert [r['positions'][0]['symbol'] for r in responses] == ids
+    assert in_flight[1] == 3
+
+def test_gather_accounts_capped_by_workers(server):
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def balances(request):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return {'perCurrencyBalances': []}
+
+    ids = [str(i) for i in range(8)]
+    for id in ids:
+        server.route('GET', 'v1/accounts/{}/balances'.format(id), balances)
+    session = server.session(AsyncSession, max_workers=2, rate_limiter=False)
+    try:
+        run(session.gather_accounts('get_balances', ids, concurrency=8))
+    finally:
+        session.close()
+    assert in_flight[1] == 2
+
+def test_context_exit_waits_for_calls(server):
+    finished = []
+
+    def slow_time(request):
+        time.sleep(0.2)
+        finished.append(True)
+        return {'time': ''}
+
+    server.route('GET', 'v1/time', slow_time)
+
+    async def main():
+        async with server.session(AsyncSession) as session:
+            # A call still in flight when the context exits.
+            call = asyncio.ensure_future(session.get_time())
+            await asyncio.sleep(0.05)
+        assert finished
+        assert not any(thread.is_alive()
+            for thread in session.executor._threads)
+        return await call
+
+    assert run(main()) == {'time': ''}
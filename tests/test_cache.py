@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+from questradeapi.cache import ResponseCache
+
+SYMBOL = {'symbol': 'AAPL', 'symbolId': 8049}
+SYMBOLS = {
+    '8049': SYMBOL,
+    '9291': {'symbol': 'MSFT', 'symbolId': 9291},
+    '38738': {'symbol': 'BBD.B.TO', 'symbolId': 38738},
+}
+
+def _symbols(request):
+    ids = request.params['ids'].split(',')
+    return {'symbols': [SYMBOLS[id] for id in ids]}
+
+@pytest.mark.parametrize('cache, requests', [(None, 2), (False, 2), (True, 1)])
+def test_symbols_cache_option(server, cache, requests):
+    server.route('GET', 'v1/symbols', {'symbols': [SYMBOL]})
+    session = server.session(cache=cache)
+    try:
+        for _ in range(2):
+            assert session.get_symbols(ids=[8049]) == {'symbols': [SYMBOL]}
+    finally:
+        session.close()
+    assert len(server.requests) == requests
+    assert session.cache is None or isinstance(session.cache, ResponseCache)
+
+def test_entries_expire():
+    cache = ResponseCache(ttls={ResponseCache.MARKETS: 0.05})
+    cache.set('v1/markets?', {'markets': []}, 'v1/markets')
+    cache.set('v1/symbols?ids=8049', SYMBOL, 'v1/symbols')
+    assert cache.get('v1/markets?') == {'markets': []}
+    time.sleep(0.1)
+    assert cache.get('v1/markets?') is None
+    assert cache.get('v1/symbols?ids=8049') == SYMBOL
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'size': 1}
+
+def test_least_recently_used_evicted():
+    cache = ResponseCache(maxsize=2)
+    cache.set('a', 1, 'v1/markets')
+    cache.set('b', 2, 'v1/markets')
+    assert cache.get('a') == 1
+    cache.set('c', 3, 'v1/markets')
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['size'] == 2
+
+def test_key_normalization():
+    key = ResponseCache.key('/v1/symbols/', {'ids': [9291, 8049]})
+    assert key == 'v1/symbols?ids=8049,9291'
+    assert ResponseCache.key('v1/symbols', {'ids': '8049,9291'}) == key
+    assert ResponseCache.key('v1/a', {'b': 1, 'a': 2}) == \
+        ResponseCache.key('v1/a', {'a': 2, 'b': 1})
+
+def test_values_are_copied():
+    cache = ResponseCache()
+    value = {'symbols': [dict(SYMBOL)]}
+    cache.set('v1/symbols?ids=8049', value, 'v1/symbols')
+    value['symbols'].append(None)
+    cached = cache.get('v1/symbols?ids=8049')
+    cached['symbols'][0]['symbol'] = 'MSFT'
+    assert cache.get('v1/symbols?ids=8049') == {'symbols': [SYMBOL]}
+
+def test_backing_file(tmp_path):
+    path = str(tmp_path / 'cache')
+    cache = ResponseCache(maxsize=2, path=path)
+    cache.set('a', 1, 'v1/markets')
+    cache.set('b', 2, 'v1/markets')
+    cache.set('c', 3, 'v1/markets')
+    cache.close()
+    cache = ResponseCache(maxsize=2, path=path)
+    try:
+        assert len(cache._shelf) == 2
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+        assert cache.get('c') == 3
+    finally:
+        cache.close()
+    # Reopening with a smaller size removes the oldest entries.
+    cache = ResponseCache(maxsize=1, path=path)
+    try:
+        assert len(cache._shelf) == 1
+        assert cache.get('c') == 3
+        cache.invalidate()
+        assert len(cache._shelf) == 0
+    finally:
+        cache.close()
+
+def test_symbols_in_any_order_served_from_cache(server):
+    server.route('GET', 'v1/symbols', _symbols)
+    session = server.session(cache=True)
+    try:
+        response = session.get_symbols(ids=[8049, 9291])
+        assert response == {'symbols': [SYMBOLS['8049'], SYMBOLS['9291']]}
+        response = session.get_symbols(ids=[9291, 8049])
+        assert response == {'symbols': [SYMBOLS['9291'], SYMBOLS['8049']]}
+        # Single symbols, by id or by name, are served from the batch.
+        assert session.get_symbols(id=9291) == {'symbols': [SYMBOLS['9291']]}
+        assert session.get_symbols(names='aapl') == {'symbols': [SYMBOL]}
+        assert len(server.requests) == 1
+        # Only the symbols missing from the cache are requested.
+        session.get_symbols(ids=[38738, 8049])
+    finally:
+        session.close()
+    assert [request.params['ids'] for request in server.requests] == \
+        ['8049,9291', '38738']
+
+def test_modified_response_does_not_alter_cache(server):
+    server.route('GET', 'v1/markets', {'markets': [{'name': 'TSX'}]})
+    session = server.session(cache=True)
+    try:
+        session.get_markets()['markets'].clear()
+        assert session.get_markets() == {'markets': [{'name': 'TSX'}]}
+        session.get_markets()['markets'][0]['name'] = 'NYSE'
+        assert session.get_markets() == {'markets': [{'name': 'TSX'}]}
+    finally:
+        session.close()
+    assert len(server.requests) == 1
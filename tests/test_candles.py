@@ -0,0 +1,103 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from questradeapi import QuestradeAPIError, Session
+from questradeapi.models import Candle
+
+START = datetime(2018, 6, 1)
+MINUTE = timedelta(minutes=1)
+
+class FakeMarket():
+    ''' Returns the candlesticks of the requested window, both ends included,
+    tracking the number of concurrent requests.'''
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.windows = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_candles(self, id, start_time, end_time, interval):
+        with self._lock:
+            self.windows.append((start_time, end_time))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        step = timedelta(seconds=Session.CANDLE_INTERVALS[interval])
+        candles = []
+        start = start_time
+        while start <= end_time:
+            candles.append({'start': start.isoformat() + '+00:00',
+                'end': (start + step).isoformat() + '+00:00',
+                'low': 1, 'high': 2, 'open': 1, 'close': 2, 'volume': 100,
+                'VWAP': 1.5})
+            start += step
+        if len(candles) > Session.MAX_CANDLES:
+            return {'code': 1003, 'message': 'Argument length exceeds limit.'}
+        return {'candles': candles}
+
+def _session(market, **kwargs):
+    session = Session('', rate_limiter=False, **kwargs)
+    session.get_candles = market.get_candles
+    return session
+
+def test_windows_within_maximum_candles():
+    market = FakeMarket()
+    session = _session(market)
+    end = START + 5000 * MINUTE
+    candles = list(session.get_candles_range(8, START, end, 'OneMinute'))
+    windows = sorted(market.windows)
+    assert len(windows) == 3
+    assert windows[0][0] == START
+    assert windows[-1][1] == end
+    assert all(previous[1] == window[0]
+        for previous, window in zip(windows, windows[1:]))
+    assert all(window_end - window_start <= (Session.MAX_CANDLES - 1) * MINUTE
+        for window_start, window_end in windows)
+    # The candlestick on the boundary of two windows is yielded once.
+    assert [candle['start'] for candle in candles] == [
+        (START + i * MINUTE).isoformat() + '+00:00' for i in range(5001)]
+
+def test_window_span_depends_on_interval():
+    market = FakeMarket()
+    session = _session(market)
+    end = START + timedelta(days=30)
+    list(session.get_candles_range(8, START, end, 'OneHour'))
+    assert market.windows == [(START, end)]
+
+def test_bounded_concurrency():
+    market = FakeMarket(delay=0.05)
+    session = _session(market, max_workers=3)
+    end = START + 20000 * MINUTE
+    candles = session.get_candles_range(8, START, end, 'OneMinute')
+    assert market.windows == []
+    assert len(list(candles)) == 20001
+    assert len(market.windows) == 11
+    assert market.max_in_flight == 3
+
+def test_formats():
+    market = FakeMarket()
+    session = _session(market)
+    end = START + 3000 * MINUTE
+    candles = list(session.get_candles_range(8, START, end, 'OneMinute',
+        format='objects'))
+    assert len(candles) == 3001
+    assert all(isinstance(candle, Candle) for candle in candles)
+    np = pytest.importorskip('numpy')
+    columns = list(session.get_candles_range(8, START, end, 'OneMinute',
+        format='numpy'))
+    assert [len(window['close']) for window in columns] == [2000, 1001]
+    assert isinstance(columns[0]['close'], np.ndarray)
+
+def test_error_response_raises():
+    session = _session(FakeMarket())
+    session.MAX_CANDLES = 3000
+    with pytest.raises(QuestradeAPIError):
+        list(session.get_candles_range(8, START, START + 5000 * MINUTE,
+            'OneMinute'))
@@ -0,0 +1,92 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from questradeapi import OptionChainIndex
+from questradeapi.greeks import (BLACK76, black_scholes, chain_greeks,
+    implied_volatility)
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+
+def test_black_scholes_textbook_values():
+    # S = K = 100, r = 5%, sigma = 20%, T = 1.
+    call = black_scholes(100, 100, 1, 0.2, 'Call', rate=0.05)
+    assert call['value'] == pytest.approx(10.4506, abs=1e-4)
+    assert call['delta'] == pytest.approx(0.6368, abs=1e-4)
+    assert call['gamma'] == pytest.approx(0.01876, abs=1e-5)
+    assert call['vega'] == pytest.approx(0.3752, abs=1e-4)
+    assert call['theta'] == pytest.approx(-6.4140 / 365, abs=1e-5)
+    # Hull, Options, Futures and Other Derivatives, example 15.6.
+    call = black_scholes(42, 40, 0.5, 0.2, 'Call', rate=0.1)
+    put = black_scholes(42, 40, 0.5, 0.2, 'Put', rate=0.1)
+    assert call['value'] == pytest.approx(4.76, abs=5e-3)
+    assert put['value'] == pytest.approx(0.81, abs=5e-3)
+
+def test_black76_textbook_value():
+    # Hull, example 18.6: put on a futures price.
+    put = black_scholes(20, 20, 4 / 12, 0.25, 'Put', rate=0.09, model=BLACK76)
+    assert put['value'] == pytest.approx(1.12, abs=5e-3)
+
+@pytest.mark.parametrize('model', ['black_scholes', 'black76'])
+def test_put_call_parity(model):
+    strike = np.linspace(50, 150, 21)
+    t, rate, dividend = 0.75, 0.03, 0.01
+    call = black_scholes(100, strike, t, 0.3, 'Call', rate, dividend, model)
+    put = black_scholes(100, strike, t, 0.3, 'Put', rate, dividend, model)
+    carry = rate - dividend if model == 'black_scholes' else 0
+    forward_value = 100 * np.exp((carry - rate) * t)
+    np.testing.assert_allclose(call['value'] - put['value'],
+        forward_value - strike * np.exp(-rate * t), atol=1e-10)
+    np.testing.assert_allclose(call['delta'] - put['delta'],
+        np.exp((carry - rate) * t), atol=1e-12)
+    np.testing.assert_allclose(call['gamma'], put['gamma'])
+    np.testing.assert_allclose(call['vega'], put['vega'])
+
+@pytest.mark.parametrize('model', ['black_scholes', 'black76'])
+def test_implied_volatility_round_trip(model):
+    # Contracts whose value depends on the volatility, see
+    # test_implied_volatility_without_vega for the others.
+    strike = np.repeat(np.linspace(80, 120, 9), 2)
+    option_type = np.tile(['Call', 'Put'], 9)
+    t = np.linspace(0.1, 2, 18)
+    volatility = np.linspace(0.2, 0.9, 18)
+    prices = black_scholes(100, strike, t, volatility, option_type, 0.02,
+        model=model)['value']
+    solved = implied_volatility(prices, 100, strike, t, option_type, 0.02,
+        model=model)
+    np.testing.assert_allclose(solved, volatility, atol=1e-6)
+
+def test_implied_volatility_outside_bounds():
+    solved = implied_volatility([0.5, 150], 100, 50, 1, 'Call')
+    assert np.isnan(solved).all()
+
+def test_implied_volatility_without_vega():
+    # Deep out of the money close to expiry, the price is reached within the
+    # tolerance whatever the volatility.
+    price = black_scholes(100, 60, 0.1, 0.2, 'Put')['value']
+    solved = implied_volatility(price, 100, 60, 0.1, 'Put')
+    assert black_scholes(100, 60, 0.1, solved, 'Put')['value'] \
+        == pytest.approx(price, abs=1e-8)
+
+def test_matches_server_greeks():
+    with open(os.path.join(DATA, 'option_quotes.json')) as f:
+        data = json.load(f)
+    index = OptionChainIndex(data['optionChain'])
+    contracts = index.select()
+    quotes = data['optionQuotes']
+    greeks = chain_greeks(contracts, quotes, data['underlyingPrice'],
+        rate=data['rate'], now=datetime.strptime(
+            data['time'], '%Y-%m-%dT%H:%M:%S+00:00'))
+
+    by_id = {quote['symbolId']: quote for quote in quotes}
+    server = [by_id[id] for id in greeks['symbolId']]
+    assert len(server) == len(contracts) == 36
+    np.testing.assert_allclose(greeks['volatility'] * 100,
+        [quote['volatility'] for quote in server], atol=1e-3)
+    for name in ('delta', 'gamma', 'theta', 'vega'):
+        np.testing.assert_allclose(greeks[name],
+            [quote[name] for quote in server], atol=1e-4, err_msg=name)
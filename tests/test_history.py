@@ -0,0 +1,85 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from questradeapi import QuestradeAPIError, Session
+
+START = datetime(2018, 1, 1)
+DAY = timedelta(days=1)
+
+class FakeAccount():
+    ''' Records of an account, returned by window as the API would.'''
+
+    def __init__(self, key, days):
+        self.key = key
+        self.records = [{'id': day} for day in days]
+        self.windows = []
+        self._lock = threading.Lock()
+
+    def fetch(self, start_time, end_time):
+        with self._lock:
+            self.windows.append((start_time, end_time))
+        if end_time - start_time > Session.HISTORY_WINDOW:
+            return {'code': 1003, 'message': 'Argument length exceeds limit.'}
+        # Both ends of a window are inclusive.
+        return {self.key: [record for record in self.records
+            if start_time <= START + record['id'] * DAY <= end_time]}
+
+def _session(account):
+    session = Session('', rate_limiter=False)
+    session.get_executions = lambda id, start, end: account.fetch(start, end)
+    session.get_activities = lambda id, start, end: account.fetch(start, end)
+    session.get_orders = lambda id, state, start, end: account.fetch(start, end)
+    return session
+
+def test_windows_split_at_maximum_span():
+    account = FakeAccount('executions', range(0, 100, 5))
+    session = _session(account)
+    end = START + 100 * DAY
+    executions = list(session.iter_executions_history('1', START, end))
+    assert [execution['id'] for execution in executions] == \
+        list(range(0, 100, 5))
+    windows = sorted(account.windows)
+    assert windows[0][0] == START
+    assert windows[-1][1] == end
+    assert all(window_end - window_start <= Session.HISTORY_WINDOW
+        for window_start, window_end in windows)
+    # Consecutive windows share their boundary: no overlap and no gap.
+    assert all(previous[1] == window[0]
+        for previous, window in zip(windows, windows[1:]))
+    assert len(windows) == 4
+
+def test_records_on_boundaries_yielded_once():
+    # Records falling on the boundary of two windows are returned for both.
+    days = [0, 30, 60, 61, 90]
+    account = FakeAccount('orders', days)
+    session = _session(account)
+    orders = list(session.iter_orders_history('1', START, START + 90 * DAY))
+    assert [order['id'] for order in orders] == days
+
+def test_empty_windows():
+    account = FakeAccount('activities', [1, 75])
+    session = _session(account)
+    end = START + 80 * DAY
+    iterator = session.iter_activities_history('1', START, end)
+    assert next(iterator)['id'] == 1
+    # The empty window in between does not end the iteration.
+    assert next(iterator)['id'] == 75
+    with pytest.raises(StopIteration):
+        next(iterator)
+    assert len(account.windows) == 3
+    assert max(window[1] for window in account.windows) == end
+
+def test_empty_range_sends_no_request():
+    account = FakeAccount('executions', [1])
+    session = _session(account)
+    assert list(session.iter_executions_history('1', START, START)) == []
+    assert account.windows == []
+
+def test_error_response_raises():
+    account = FakeAccount('executions', [1])
+    session = _session(account)
+    session.HISTORY_WINDOW = 2 * Session.HISTORY_WINDOW
+    with pytest.raises(QuestradeAPIError):
+        list(session.iter_executions_history('1', START, START + 90 * DAY))
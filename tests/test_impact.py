@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+from questradeapi import ImpactEstimator, QuestradeAPIError
+
+SPEC = dict(account_id='26598145', symbol_id=8049, quantity=10,
+    iceberg_quantity=None, limit_price=150, stop_price=None,
+    all_or_none=False, anonymous=False, order_type='Limit',
+    time_in_force='Day', action='Buy', primary_route='AUTO',
+    secondary_route='AUTO')
+
+class FakeSession():
+    ''' Session answering impact requests after a delay, counting them.'''
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def post_order(self, impact=False, **kwargs):
+        assert impact
+        with self._lock:
+            self.calls.append(kwargs)
+        time.sleep(self.delay)
+        if kwargs['quantity'] < 0:
+            return {'code': 1001, 'message': 'Invalid argument.'}
+        value = kwargs['quantity'] * kwargs['limit_price']
+        return {
+            'estimatedCommissions': 4.95,
+            'buyingPowerEffect': -value,
+            'buyingPowerResult': 100000 - value,
+            'maintExcessEffect': -value / 2,
+            'maintExcessResult': 50000 - value / 2,
+        }
+
+def _concurrently(*calls):
+    results = [None] * len(calls)
+
+    def run(i):
+        results[i] = calls[i]()
+
+    threads = [threading.Thread(target=run, args=(i,))
+        for i in range(len(calls))]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_cached_until_ttl_expires():
+    session = FakeSession()
+    estimator = ImpactEstimator(session, ttl=0.1)
+    assert estimator.estimate(SPEC).source == 'server'
+    estimate = estimator.estimate(dict(SPEC))
+    assert estimate.source == 'cache'
+    assert estimate.impact['buyingPowerEffect'] == -1500
+    time.sleep(0.15)
+    assert estimator.estimate(SPEC).source == 'server'
+    assert len(session.calls) == 2
+
+def test_cache_key_ignores_missing_values():
+    session = FakeSession()
+    estimator = ImpactEstimator(session)
+    estimator.estimate(SPEC)
+    spec = {name: value for name, value in SPEC.items() if value is not None}
+    assert estimator.estimate(spec).source == 'cache'
+
+def test_error_not_cached():
+    session = FakeSession()
+    estimator = ImpactEstimator(session)
+    for _ in range(2):
+        with pytest.raises(QuestradeAPIError):
+            estimator.estimate(dict(SPEC, quantity=-1))
+    assert len(session.calls) == 2
+
+def test_interpolation():
+    session = FakeSession()
+    estimator = ImpactEstimator(session, interpolate=True)
+    estimator.estimate(dict(SPEC, quantity=10))
+    estimate = estimator.estimate(dict(SPEC, quantity=20))
+    assert estimate.source == 'interpolated'
+    # Scaled from a single quantity, commissions left unchanged.
+    assert estimate.impact['buyingPowerEffect'] == -3000
+    assert estimate.impact['buyingPowerResult'] == 100000 - 3000
+    assert estimate.impact['estimatedCommissions'] == 4.95
+
+    estimator.clear()
+    estimator.estimate(dict(SPEC, quantity=10))
+    estimator.interpolate = False
+    estimator.estimate(dict(SPEC, quantity=30))
+    estimator.interpolate = True
+    estimate = estimator.estimate(dict(SPEC, quantity=15))
+    assert estimate.impact['maintExcessEffect'] == -1125
+    assert len(session.calls) == 3
+
+def test_interpolation_only_for_same_order():
+    estimator = ImpactEstimator(FakeSession(), interpolate=True)
+    estimator.estimate(SPEC)
+    estimate = estimator.estimate(dict(SPEC, limit_price=151, quantity=20))
+    assert estimate.source == 'server'
+
+def test_debounce_drops_superseded_requests():
+    session = FakeSession()
+    estimator = ImpactEstimator(session, debounce=0.1)
+    results = _concurrently(*(
+        lambda q=q: estimator.estimate(dict(SPEC, quantity=q), draft='ticket')
+        for q in (1, 12, 123)))
+    assert results[:2] == [None, None]
+    assert results[2].impact['buyingPowerEffect'] == -123 * 150
+    assert [call['quantity'] for call in session.calls] == [123]
+
+def test_drafts_debounced_independently():
+    session = FakeSession()
+    estimator = ImpactEstimator(session, debounce=0.05)
+    results = _concurrently(
+        lambda: estimator.estimate(dict(SPEC, quantity=1), draft='a'),
+        lambda: estimator.estimate(dict(SPEC, quantity=2), draft='b'))
+    assert all(result.source == 'server' for result in results)
+    assert len(session.calls) == 2
+
+def test_concurrent_drafts_coalesced():
+    session = FakeSession(delay=0.1)
+    estimator = ImpactEstimator(session, debounce=0)
+    results = _concurrently(*(
+        lambda draft=draft: estimator.estimate(SPEC, draft=draft)
+        for draft in range(5)))
+    assert len(session.calls) == 1
+    assert all(result.impact == results[0].impact for result in results)
+
+def test_forgotten_drafts():
+    estimator = ImpactEstimator(FakeSession(), debounce=0.01)
+    for draft in range(100):
+        estimator.estimate(dict(SPEC, quantity=draft + 1), draft=draft)
+    time.sleep(0.02)
+    estimator.estimate(SPEC, draft='last')
+    assert list(estimator._drafts) == ['last']
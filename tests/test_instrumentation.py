@@ -0,0 +1,121 @@
+import re
+
+import pytest
+
+from questradeapi.instrumentation import (MetricsRecorder, RequestEvent,
+    TokenRefreshEvent, endpoint_name)
+
+# Sample line of the Prometheus text format: name, optional labels, value.
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*'
+    r'(\{([a-zA-Z_][a-zA-Z0-9_]*="[^"]*"(,[a-zA-Z_][a-zA-Z0-9_]*="[^"]*")*)?\})?'
+    r' [-+]?([0-9.]+(e[-+]?[0-9]+)?|Inf|NaN)$')
+
+def _event(endpoint='v1/accounts/123/positions', method='GET', status=200,
+    attempt=1, duration=0.02, error=None, remaining=None):
+    return RequestEvent(method, endpoint, status, attempt, 0.0, duration,
+        duration / 2, duration / 4, 100, 1000, remaining, error)
+
+def test_endpoint_name():
+    assert endpoint_name('v1/accounts/123/positions') == \
+        'v1/accounts/{id}/positions'
+    assert endpoint_name('/v1/symbols/8049/') == 'v1/symbols/{id}'
+    assert endpoint_name('v1/markets/quotes') == 'v1/markets/quotes'
+
+def test_aggregated_per_endpoint():
+    recorder = MetricsRecorder(buckets=(0.01, 0.1))
+    recorder.on_request(_event())
+    recorder.on_request(_event('v1/accounts/456/positions', duration=0.2))
+    recorder.on_request(_event(status=429, attempt=2, duration=0.005))
+    recorder.on_request(_event(attempt=3, error=OSError()))
+    recorder.on_request(_event('v1/time', remaining=10))
+    recorder.on_request(_event('v1/time', remaining=9))
+    key = ('GET', 'v1/accounts/{id}/positions')
+    latency = recorder.latency[key]
+    assert latency.count == 3
+    assert latency.counts == [1, 2]
+    assert latency.sum == pytest.approx(0.225)
+    assert recorder.decode_time[key].sum == pytest.approx(0.225 / 4)
+    assert recorder.bytes_out[key] == 300
+    assert recorder.bytes_in[key] == 3000
+    assert recorder.responses == {key + (200,): 2, key + (429,): 1,
+        ('GET', 'v1/time', 200): 2}
+    assert recorder.errors == {key: 1}
+    assert recorder.retries == {key: 2}
+    assert recorder.rate_limit_remaining == {'v1/time': 9}
+
+def test_token_refresh():
+    recorder = MetricsRecorder(buckets=(0.1, 1))
+    recorder.on_token_refresh(TokenRefreshEvent(0.0, 0.5, None))
+    recorder.on_token_refresh(TokenRefreshEvent(0.0, 0.1, OSError()))
+    assert recorder.token_refresh.counts == [0, 1]
+    assert recorder.token_refresh.sum == 0.5
+    assert recorder.token_refresh_errors == 1
+
+def test_prometheus_format():
+    recorder = MetricsRecorder(buckets=(0.01, 0.1))
+    recorder.on_request(_event())
+    recorder.on_request(_event(duration=0.05, remaining=5))
+    recorder.on_request(_event('v1/time', attempt=2, error=OSError()))
+    recorder.on_token_refresh(TokenRefreshEvent(0.0, 0.05, None))
+    text = recorder.to_prometheus(prefix='qt')
+    assert text.endswith('\n')
+    lines = text.splitlines()
+    endpoint = 'endpoint="v1/accounts/{id}/positions"'
+    labels = endpoint + ',method="GET"'
+    for line in (
+        '# HELP qt_request_duration_seconds Request latency, including '
+            'decoding.',
+        '# TYPE qt_request_duration_seconds histogram',
+        'qt_request_duration_seconds_bucket{' + endpoint + ',le="0.01",method="GET"} 0',
+        'qt_request_duration_seconds_bucket{' + endpoint + ',le="0.1",method="GET"} 2',
+        'qt_request_duration_seconds_bucket{' + endpoint + ',le="+Inf",method="GET"} 2',
+        'qt_request_duration_seconds_count{' + labels + '} 2',
+        'qt_request_bytes_in_total{' + labels + '} 2000',
+        'qt_responses_total{' + labels + ',status="200"} 2',
+        'qt_request_errors_total{endpoint="v1/time",method="GET"} 1',
+        'qt_request_retries_total{endpoint="v1/time",method="GET"} 1',
+        '# TYPE qt_rate_limit_remaining gauge',
+        'qt_rate_limit_remaining{endpoint="v1/accounts/{id}/positions"} 5',
+        'qt_token_refresh_seconds_bucket{le="0.1"} 1',
+        'qt_token_refresh_seconds_count 1',
+        'qt_token_refresh_errors_total 0',
+    ):
+        assert line in lines
+    # Every metric is declared once, before its samples.
+    types = {}
+    for line in lines:
+        if line.startswith('# TYPE '):
+            name, kind = line.split()[2:]
+            assert name not in types
+            types[name] = kind
+        elif not line.startswith('# HELP '):
+            assert SAMPLE.match(line), line
+            name = line.split('{')[0].split(' ')[0]
+            family = re.sub(r'_(bucket|sum|count)$', '', name)
+            assert name in types or types.get(family) == 'histogram', line
+
+def test_prometheus_client_parses_export():
+    parser = pytest.importorskip('prometheus_client.parser')
+    recorder = MetricsRecorder()
+    recorder.on_request(_event(remaining=5))
+    recorder.on_token_refresh(TokenRefreshEvent(0.0, 0.05, None))
+    families = {family.name: family for family in
+        parser.text_string_to_metric_families(recorder.to_prometheus())}
+    assert families['questradeapi_request_duration_seconds'].type == \
+        'histogram'
+    assert families['questradeapi_rate_limit_remaining'].type == 'gauge'
+
+def test_session_records_requests(server):
+    server.route('GET', 'v1/accounts/123/positions', {'positions': []})
+    recorder = MetricsRecorder()
+    session = server.session(instrumentation=recorder)
+    try:
+        session.get_positions('123')
+        session.get_positions('123')
+    finally:
+        session.close()
+    key = ('GET', 'v1/accounts/{id}/positions')
+    assert recorder.latency[key].count == 2
+    assert recorder.responses[key + (200,)] == 2
+    assert recorder.bytes_in[key] == 2 * len(b'{"positions": []}')
+    assert recorder.token_refresh.count == 1
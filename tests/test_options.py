@@ -0,0 +1,76 @@
+import re
+from datetime import date
+
+from questradeapi import OptionChainIndex
+from questradeapi.options import CALL, PUT
+
+CHAIN = [{
+    'expiryDate': '2026-11-20T00:00:00.000000-05:00',
+    'chainPerRoot': [{
+        'root': 'AAPL',
+        'multiplier': 100,
+        'chainPerStrikePrice': [
+            {'strikePrice': strike, 'callSymbolId': 1000 + i,
+             'putSymbolId': 2000 + i}
+            for i, strike in enumerate((90, 100, 110))
+        ]
+    }]
+}]
+
+def _quotes(request):
+    ids = request.body.get('optionIds', [])
+    return {'optionQuotes': [{'symbolId': id} for id in ids]}
+
+def test_quote_posts_chunks(server):
+    server.route('POST', 'v1/markets/quotes/options', _quotes)
+    session = server.session()
+    try:
+        index = OptionChainIndex(CHAIN, session, underlying_id=8049)
+        contracts = index.select(option_type=CALL)
+        quotes = index.quote(contracts, chunk_size=2)
+    finally:
+        session.close()
+    assert [quote['symbolId'] for quote in quotes] == [1000, 1001, 1002]
+    assert sorted(request.body['optionIds'] for request in server.requests) \
+        == [[1000, 1001], [1002]]
+
+def test_quote_by_filters(server):
+    server.route('POST', 'v1/markets/quotes/options', _quotes)
+    session = server.session()
+    try:
+        index = OptionChainIndex(CHAIN, session, underlying_id=8049)
+        filters = index.option_id_filters(index.select(option_type=CALL))
+        session.get_quotes_options(filters=filters)
+    finally:
+        session.close()
+    assert server.requests[0].body == {'filters': filters}
+    assert filters[0]['underlyingId'] == 8049
+    assert filters[0]['expiryDate'] == '2026-11-20T00:00:00.000000-05:00'
+
+def test_filters_format_expiry_dates_as_datetimes():
+    index = OptionChainIndex(CHAIN, underlying_id=8049)
+    contracts = index.select(option_type=PUT)
+    other = contracts[0]._replace(expiry=date(2026, 12, 18))
+    filters = index.option_id_filters(contracts + [other])
+    assert [f['expiryDate'][:10] for f in filters] == \
+        ['2026-11-20', '2026-12-18']
+    assert re.match(r'^2026-12-18T00:00:00[+-]\d\d:\d\d$',
+        filters[1]['expiryDate'])
+    assert (filters[0]['minStrikePrice'], filters[0]['maxStrikePrice']) == \
+        (90, 110)
+
+def test_select_at_zero_distance(server):
+    server.route('GET', 'v1/markets/quotes/8049',
+        {'quotes': [{'symbolId': 8049, 'lastTradePrice': 100}]})
+    session = server.session()
+    try:
+        index = OptionChainIndex(CHAIN, session, underlying_id=8049)
+        contracts = index.select(option_type=CALL, max_distance=0)
+    finally:
+        session.close()
+    assert [contract.strike for contract in contracts] == [100]
+    assert len(server.requests) == 1
+    index = OptionChainIndex(CHAIN)
+    contracts = index.select(max_distance=0, underlying_price=110)
+    assert [(c.strike, c.option_type) for c in contracts] == \
+        [(110, CALL), (110, PUT)]
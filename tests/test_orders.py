@@ -0,0 +1,83 @@
+import pytest
+
+from questradeapi import OrderBatch
+from questradeapi.replay import RecordingTransport, ReplayTransport
+from questradeapi.utils import create_bracket_order_component
+
+ACCOUNT = '26598145'
+
+def _order(request):
+    return {'orderId': 1, 'orders': [{'id': 1, 'state': 'Accepted'}]}
+
+def test_order_sent_as_json_body(server):
+    server.route('POST', 'v1/accounts/{}/orders'.format(ACCOUNT), _order)
+    session = server.session()
+    try:
+        session.post_order(ACCOUNT, 8049, 10, None, 150.5, None, False, False,
+            'Limit', 'Day', 'Buy', 'AUTO', 'AUTO')
+    finally:
+        session.close()
+    request = server.requests[0]
+    assert request.params == {}
+    assert request.body == {
+        'symbolId': 8049, 'quantity': 10, 'limitPrice': 150.5,
+        'isAllOrNone': False, 'isAnonymous': False, 'orderType': 'Limit',
+        'timeInForce': 'Day', 'action': 'Buy', 'primaryRoute': 'AUTO',
+        'secondaryRoute': 'AUTO'
+    }
+
+def test_bracket_batch_sends_components(server):
+    server.route('POST', 'v1/accounts/{}/orders/bracket'.format(ACCOUNT),
+        _order)
+    components = [
+        create_bracket_order_component(10, 'Buy', 150, None, 'Limit', 'Day',
+            'Primary'),
+        create_bracket_order_component(10, 'Sell', 160, None, 'Limit',
+            'GoodTillCanceled', 'Profit'),
+    ]
+    session = server.session()
+    try:
+        results = OrderBatch(session, [dict(type='bracket',
+            account_id=ACCOUNT, symbol_id=8049, primary_route='AUTO',
+            secondary_route='AUTO', components=components)]).submit()
+    finally:
+        session.close()
+    assert results[0].status == 'placed'
+    assert server.requests[0].body['components'] == components
+
+def test_replay_matches_bodies(server):
+    def impact(request):
+        return {'buyingPowerEffect': -request.body['quantity']}
+
+    server.route('POST', 'v1/accounts/{}/orders/impact'.format(ACCOUNT),
+        impact)
+    recording = RecordingTransport()
+    session = server.session(transport=recording)
+    args = (8049, None, 150, None, False, False, 'Limit', 'Day', 'Buy',
+        'AUTO', 'AUTO')
+    try:
+        for quantity in (10, 20):
+            session.post_order(ACCOUNT, args[0], quantity, *args[1:],
+                impact=True)
+    finally:
+        session.close()
+
+    session = server.session(transport=ReplayTransport(
+        recording.interactions))
+    for quantity in (20, 10):
+        assert session.post_order(ACCOUNT, args[0], quantity, *args[1:],
+            impact=True) == {'buyingPowerEffect': -quantity}
+
+def test_spec_with_impact_rejected(server):
+    session = server.session()
+    spec = dict(account_id=ACCOUNT, symbol_id=8049, quantity=10,
+        iceberg_quantity=None, limit_price=150, stop_price=None,
+        all_or_none=False, anonymous=False, order_type='Limit',
+        time_in_force='Day', action='Buy', primary_route='AUTO',
+        secondary_route='AUTO', impact=True)
+    try:
+        with pytest.raises(ValueError):
+            OrderBatch(session, [spec])
+    finally:
+        session.close()
+    assert not server.requests
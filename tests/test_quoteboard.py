@@ -0,0 +1,108 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from questradeapi import QuoteBoard
+from questradeapi.quoteboard import (HEADER_SIZE, SLOT_SIZE, _COUNTER, _QUOTE,
+    _pack)
+
+def _quote(symbol_id, price):
+    return {
+        'symbol': 'SYM{}'.format(symbol_id), 'symbolId': symbol_id,
+        'bidPrice': price - 0.01, 'bidSize': 100, 'askPrice': price + 0.01,
+        'askSize': 200, 'lastTradePriceTrHrs': price, 'lastTradePrice': price,
+        'lastTradeSize': 10, 'lastTradeTime': '2019-01-02T14:30:00+00:00',
+        'volume': 1000, 'openPrice': price, 'highPrice': price,
+        'lowPrice': price, 'VWAP': price, 'delay': 0, 'isHalted': False
+    }
+
+@pytest.fixture
+def board(tmp_path):
+    board = QuoteBoard.create(str(tmp_path / 'quotes'), capacity=4)
+    yield board
+    board.close()
+
+def test_publish_and_get(board):
+    board.publish([_quote(1, 10.5), _quote(2, 20.5)])
+    with QuoteBoard(board.path) as reader:
+        assert reader.get(1) == _quote(1, 10.5)
+        assert reader.get_quotes(ids=[2, 1])['quotes'] \
+            == [_quote(2, 20.5), _quote(1, 10.5)]
+        assert reader.ids() == [1, 2]
+        assert 0 <= reader.age() < 5
+
+def test_slot_overwritten(board):
+    board.publish([_quote(1, 10.5)])
+    reader = QuoteBoard(board.path)
+    assert reader.get(1)['lastTradePrice'] == 10.5
+    board.publish([_quote(1, 11.5)])
+    assert reader.get(1)['lastTradePrice'] == 11.5
+    assert len(reader) == 1
+    reader.close()
+
+def test_unknown_symbol(board):
+    board.publish([_quote(1, 10.5)])
+    assert board.get(3) is None
+    assert board.get_quotes(ids=[3, 1])['quotes'] == [_quote(1, 10.5)]
+
+def test_full_board(board):
+    board.publish([_quote(id, 10) for id in range(4)])
+    with pytest.raises(ValueError):
+        board.publish([_quote(4, 10)])
+
+def test_read_retried_while_slot_written(board):
+    board.publish([_quote(1, 10.5)])
+    reader = QuoteBoard(board.path)
+    reader.get(1)
+    # A writer stopped mid-update: odd sequence, quote partially written.
+    buffer = board._mmap
+    sequence = _COUNTER.unpack_from(buffer, HEADER_SIZE)[0]
+    _COUNTER.pack_into(buffer, HEADER_SIZE, sequence + 1)
+    torn = _pack(_quote(1, 10.5))
+    torn[2] = 11.49
+    _QUOTE.pack_into(buffer, HEADER_SIZE + _COUNTER.size, *torn)
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(reader.get(1)))
+    thread.start()
+    time.sleep(0.05)
+    assert thread.is_alive()
+    _QUOTE.pack_into(buffer, HEADER_SIZE + _COUNTER.size,
+        *_pack(_quote(1, 11.5)))
+    _COUNTER.pack_into(buffer, HEADER_SIZE, sequence + 2)
+    thread.join(1)
+    assert results == [_quote(1, 11.5)]
+    reader.close()
+
+def test_read_of_stuck_slot_times_out(board):
+    board.publish([_quote(1, 10.5)])
+    _COUNTER.pack_into(board._mmap, HEADER_SIZE, 1)
+    board.READ_TIMEOUT = 0.05
+    with pytest.raises(TimeoutError):
+        board.get(1)
+
+def _read_in_process(path, symbol_id, results):
+    with QuoteBoard(path) as reader:
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            quote = reader.get(symbol_id)
+            if quote is not None and quote['lastTradePrice'] == 12.5:
+                results.put(quote)
+                return
+            time.sleep(0.001)
+    results.put(None)
+
+def test_reader_in_another_process(board):
+    board.publish([_quote(1, 10.5)])
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_read_in_process, args=(board.path, 2, results))
+    process.start()
+    board.publish([_quote(2, 12.5)])
+    try:
+        assert results.get(timeout=10) == _quote(2, 12.5)
+    finally:
+        process.join(10)
+    assert process.exitcode == 0
@@ -0,0 +1,42 @@
+import time
+
+from questradeapi.ratelimit import RateLimiter
+
+def _headers(remaining, reset_in, **extra):
+    headers = {
+        'X-RateLimit-Remaining': str(remaining),
+        'X-RateLimit-Reset': str(int(time.time() + reset_in))
+    }
+    headers.update(extra)
+    return headers
+
+def _wait(limiter, endpoint):
+    category = RateLimiter.classify(endpoint)
+    return limiter.buckets[category].reserve()
+
+def test_full_pace_while_quota_lasts():
+    limiter = RateLimiter()
+    limiter.update('v1/accounts', 200, _headers(29990, 3590))
+    assert limiter.buckets[RateLimiter.ACCOUNT].rate == 30
+
+def test_last_requests_spread_until_reset():
+    limiter = RateLimiter()
+    limiter.update('v1/markets/quotes', 200, _headers(10, 100))
+    assert 0.09 < limiter.buckets[RateLimiter.MARKET].rate < 0.11
+
+def test_per_second_429_backs_off_briefly():
+    limiter = RateLimiter()
+    limiter.update('v1/markets/quotes', 429, _headers(14000, 3000))
+    assert 0.5 < _wait(limiter, 'v1/markets/quotes') <= 1
+
+def test_per_second_429_honours_retry_after():
+    limiter = RateLimiter()
+    limiter.update('v1/markets/quotes', 429,
+        _headers(14000, 3000, **{'Retry-After': '2'}))
+    assert 1.5 < _wait(limiter, 'v1/markets/quotes') <= 2
+
+def test_exhausted_quota_blocks_until_reset():
+    limiter = RateLimiter()
+    limiter.update('v1/markets/quotes', 429, _headers(0, 3000))
+    assert _wait(limiter, 'v1/markets/quotes') > 2900
+    assert _wait(limiter, 'v1/accounts') == 0
@@ -0,0 +1,14 @@
+from questradeapi.replay import RecordingTransport, ReplayTransport
+
+def test_cassette_written_on_close_only(server, tmp_path):
+    server.route('GET', 'v1/time', {'time': ''})
+    path = tmp_path / 'session.cassette.gz'
+    recording = RecordingTransport(path=str(path))
+    session = server.session(transport=recording)
+    session.get_time()
+    assert not path.exists()
+
+    session.close()
+    replayed = server.session(transport=ReplayTransport(str(path)))
+    assert replayed.get_time() == {'time': ''}
+    assert server.redeems == 1
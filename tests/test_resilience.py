@@ -0,0 +1,135 @@
+import json
+import time
+
+import pytest
+import requests
+import urllib3
+
+import questradeapi.session
+from questradeapi import CircuitOpenError, Session
+from questradeapi.resilience import CircuitBreaker, RetryPolicy
+
+API_SERVER = 'https://api01.iq.questrade.com/'
+
+class StubResponse():
+
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(body).encode('utf-8')
+
+class StubTransport():
+    ''' Transport answering the login requests and replaying a script of
+    responses or exceptions to the API requests.'''
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = []
+        self.redeems = 0
+
+    def request(self, method, url, **kwargs):
+        if url.endswith(Session.ACCESS_TOKEN_ENDPOINT):
+            self.redeems += 1
+            return StubResponse(200, {
+                'access_token': 'access-{}'.format(self.redeems),
+                'refresh_token': 'refresh-{}'.format(self.redeems),
+                'expires_in': 1800,
+                'api_server': API_SERVER
+            })
+        self.calls.append((method, url, kwargs))
+        outcome = self.script.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(questradeapi.session.time, 'sleep', delays.append)
+    return delays
+
+def _session(transport, **kwargs):
+    kwargs.setdefault('rate_limiter', False)
+    return Session('refresh', transport=transport, **kwargs)
+
+def _connection_error(reason):
+    return requests.exceptions.ConnectionError(
+        urllib3.exceptions.MaxRetryError(None, API_SERVER, reason))
+
+def test_post_read_timeout_not_retried(sleeps):
+    transport = StubTransport(requests.exceptions.ReadTimeout())
+    session = _session(transport)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.do_post('v1/accounts/1/orders', {'symbolId': 1})
+    assert len(transport.calls) == 1
+
+def test_get_read_timeout_retried(sleeps):
+    transport = StubTransport(
+        requests.exceptions.ReadTimeout(), StubResponse(200, {'time': ''}))
+    session = _session(transport)
+    assert session.get_time() == {'time': ''}
+    assert len(transport.calls) == 2
+
+def test_post_not_sent_retried(sleeps):
+    reason = urllib3.exceptions.NewConnectionError(None, 'refused')
+    transport = StubTransport(
+        _connection_error(reason), StubResponse(200, {'orders': []}))
+    session = _session(transport)
+    assert session.do_post('v1/accounts/1/orders') == {'orders': []}
+    assert len(transport.calls) == 2
+
+def test_name_resolution_failure_not_sent():
+    error = getattr(urllib3.exceptions, 'NameResolutionError', None)
+    if error is None:
+        pytest.skip('urllib3 1.x has no NameResolutionError')
+    reason = error('api01.iq.questrade.com', None, OSError('unknown host'))
+    assert RetryPolicy.not_sent(_connection_error(reason))
+
+def test_401_reauthenticates_once(sleeps):
+    transport = StubTransport(
+        StubResponse(401, {'code': 1017}), StubResponse(200, {'time': ''}))
+    session = _session(transport)
+    assert session.get_time() == {'time': ''}
+    assert transport.redeems == 2
+    assert transport.calls[1][2]['headers']['Authorization'] \
+        == 'Bearer access-2'
+
+    transport.script = [
+        StubResponse(401, {'code': 1017}), StubResponse(401, {'code': 1017})]
+    assert session.get_time() == {'code': 1017}
+    assert transport.redeems == 3
+    assert not transport.script
+
+def test_429_honours_retry_after(sleeps):
+    transport = StubTransport(
+        StubResponse(429, {'code': 1006}, {'Retry-After': '2'}),
+        StubResponse(200, {'orders': []}))
+    session = _session(transport)
+    assert session.do_post('v1/accounts/1/orders') == {'orders': []}
+    assert sleeps == [2.0]
+
+def test_circuit_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    transport = StubTransport(
+        StubResponse(500, {'code': 1000}), StubResponse(500, {'code': 1000}),
+        StubResponse(500, {'code': 1000}), StubResponse(200, {'time': ''}))
+    session = _session(transport, retry_policy=False, circuit_breaker=breaker)
+    for _ in range(2):
+        session.get_time()
+    assert breaker.state(API_SERVER) == 'open'
+    with pytest.raises(CircuitOpenError):
+        session.get_time()
+    assert len(transport.calls) == 2
+
+    time.sleep(0.15)
+    assert breaker.state(API_SERVER) == 'half-open'
+    # A failed trial request opens the circuit again.
+    session.get_time()
+    assert breaker.state(API_SERVER) == 'open'
+
+    time.sleep(0.15)
+    assert session.get_time() == {'time': ''}
+    assert breaker.state(API_SERVER) == 'closed'
@@ -0,0 +1,28 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from questradeapi import QuestradeAPIError, Session
+from questradeapi.instrumentation import MetricsRecorder
+
+REJECTED = {'code': 1017, 'message': 'Invalid refresh token.'}
+
+class RejectingTransport():
+
+    def request(self, method, url, **kwargs):
+        return SimpleNamespace(status_code=400, headers={},
+            content=json.dumps(REJECTED).encode('utf-8'))
+
+    def close(self):
+        pass
+
+@pytest.mark.parametrize('instrumentation', [None, MetricsRecorder()])
+def test_rejected_refresh_token(instrumentation):
+    session = Session('refresh', transport=RejectingTransport(),
+        instrumentation=instrumentation)
+    with pytest.raises(QuestradeAPIError):
+        session.get_time()
+    assert session.refresh_token == 'refresh'
+    if instrumentation is not None:
+        assert instrumentation.token_refresh_errors == 1
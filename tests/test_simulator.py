@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from questradeapi.ratelimit import RateLimiter
+from questradeapi.simulator import Simulator, run_load
+from questradeapi.utils import create_strategy_variant_request
+
+@pytest.fixture
+def simulator():
+    with Simulator(rate_limits=None, seed=0) as simulator:
+        yield simulator
+
+def test_option_quotes_by_id_and_filter(simulator):
+    session = simulator.session(rate_limiter=False)
+    quotes = session.get_quotes_options(ids=[100001, 100002])['optionQuotes']
+    assert [q['symbolId'] for q in quotes] == [100001, 100002]
+
+    option_filter = {'underlyingId': 1, 'optionType': 'Call'}
+    quotes = session.get_quotes_options(filters=[option_filter])
+    assert quotes['optionQuotes']
+    assert all(q['symbolId'] % 2 == 0 for q in quotes['optionQuotes'])
+
+def test_body_endpoints_reject_get(simulator):
+    session = simulator.session(rate_limiter=False)
+    response = session.do_get('v1/markets/quotes/options',
+        {'optionIds': '100001'})
+    assert response['code'] == 1002
+    response = session.do_get('v1/markets/quotes/strategies')
+    assert response['code'] == 1002
+
+def test_strategy_quotes(simulator):
+    session = simulator.session(rate_limiter=False)
+    legs = [
+        {'symbolId': 100001, 'ratio': 1, 'action': 'Buy'},
+        {'symbolId': 100003, 'ratio': 1, 'action': 'Sell'}
+    ]
+    variants = [create_strategy_variant_request(1, 'Custom', legs)]
+    quotes = session.get_quotes_strategies(variants)['strategyQuotes']
+    assert [q['variantId'] for q in quotes] == [1]
+
+def test_orders_read_from_body(simulator):
+    session = simulator.session(rate_limiter=False)
+    account = simulator.account_numbers[0]
+    response = session.post_order(account, 5, 10, None, 12.5, None, False,
+        False, 'Limit', 'Day', 'Buy', 'AUTO', 'AUTO')
+    order = response['orders'][0]
+    assert (order['symbolId'], order['totalQuantity'], order['side']) \
+        == (5, 10, 'Buy')
+
+    components = [
+        {'quantity': 10, 'action': 'Buy', 'orderType': 'Limit',
+         'limitPrice': 12.5, 'orderClass': 'Primary'},
+        {'quantity': 10, 'action': 'Sell', 'orderType': 'Limit',
+         'limitPrice': 15, 'orderClass': 'Profit'},
+    ]
+    response = session.post_bracket_order(account, 5, 'AUTO', 'AUTO',
+        components)
+    assert [o['side'] for o in response['orders']] == ['Buy', 'Sell']
+
+def test_per_second_429_reports_hourly_quota():
+    with Simulator(rate_limits={RateLimiter.ACCOUNT: 1,
+        RateLimiter.MARKET: 1}) as simulator:
+        token = simulator.issue_refresh_token()
+        status, body, _ = simulator.handle('POST',
+            Simulator.ACCESS_TOKEN_ENDPOINT,
+            {'grant_type': 'refresh_token', 'refresh_token': token}, None)
+        authorization = 'Bearer ' + body['access_token']
+        statuses = [
+            simulator.handle('GET', '/v1/time', {}, authorization)
+            for _ in range(3)
+        ]
+    # Three requests span at most one second boundary.
+    throttled = [s[0] for s in statuses].index(429)
+    assert statuses[throttled][2]['X-RateLimit-Remaining'] == str(
+        Simulator.HOURLY_LIMITS[RateLimiter.ACCOUNT] - throttled)
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_run_load(simulator, use_async):
+    latencies, errors = run_load(simulator, duration=0.2, concurrency=4,
+        use_async=use_async, symbols=10, rate_limiter=False)
+    assert latencies and latencies == sorted(latencies)
+    assert not errors
+
+def test_run_load_async_outside_main_thread(simulator):
+    # Threads other than the main one have no current event loop.
+    with ThreadPoolExecutor(1) as executor:
+        latencies, errors = executor.submit(run_load, simulator,
+            duration=0.2, concurrency=4, use_async=True, symbols=10,
+            rate_limiter=False).result()
+    assert latencies
+    assert not errors
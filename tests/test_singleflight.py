@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from questradeapi import Session
+from questradeapi.singleflight import MicroBatcher, SingleFlight
+
+def _concurrently(func, count):
+    '''Calls a function from several threads at once, returning its results
+    or exceptions.'''
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = func(i)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_single_flight_shares_result():
+    flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(None)
+        time.sleep(0.1)
+        return object()
+
+    results = _concurrently(lambda i: flight.do('key', func), 10)
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == 0
+
+def test_single_flight_shares_exception():
+    flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(None)
+        time.sleep(0.1)
+        raise ValueError('failed')
+
+    results = _concurrently(lambda i: flight.do('key', func), 10)
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    # Failures are not remembered.
+    with pytest.raises(ValueError):
+        flight.do('key', func)
+    assert len(calls) == 2
+
+def test_micro_batcher_merges_window():
+    fetched = []
+
+    def fetch(keys):
+        fetched.append(keys)
+        return {key: key * 10 for key in keys if key != 3}
+
+    batcher = MicroBatcher(0.1, fetch)
+    results = _concurrently(lambda i: batcher.get(i % 5), 10)
+    assert len(fetched) == 1
+    assert sorted(fetched[0]) == [0, 1, 2, 3, 4]
+    assert results == [None if i % 5 == 3 else i % 5 * 10 for i in range(10)]
+
+def test_micro_batcher_shares_exception():
+    def fetch(keys):
+        raise ValueError(keys)
+
+    batcher = MicroBatcher(0.05, fetch)
+    results = _concurrently(batcher.get, 5)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert results[0] is results[1]
+
+def test_session_coalesces_identical_gets(server):
+    def balances(request):
+        time.sleep(0.1)
+        return {'perCurrencyBalances': []}
+
+    server.route('GET', 'v1/accounts/1/balances', balances)
+    session = server.session(coalesce=True, rate_limiter=False)
+    session.get_time()
+    try:
+        results = _concurrently(lambda i: session.get_balances('1'), 10)
+    finally:
+        session.close()
+    assert results == [{'perCurrencyBalances': []}] * 10
+    assert len(server.requests) == 2
+
+class _FailingTransport():
+
+    def __init__(self):
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        if url.endswith(Session.ACCESS_TOKEN_ENDPOINT):
+            return _TokenResponse()
+        self.calls += 1
+        time.sleep(0.1)
+        raise requests.exceptions.ConnectionError('refused')
+
+    def close(self):
+        pass
+
+class _TokenResponse():
+    status_code = 200
+    headers = {}
+    content = (b'{"access_token": "a", "refresh_token": "r", '
+        b'"expires_in": 1800, "api_server": "https://api01/"}')
+
+def test_session_coalesced_error_reaches_every_caller():
+    transport = _FailingTransport()
+    session = Session('refresh', transport=transport, coalesce=True,
+        rate_limiter=False, retry_policy=False, circuit_breaker=False)
+    results = _concurrently(lambda i: session.get_time(), 10)
+    assert transport.calls == 1
+    assert all(isinstance(result, requests.exceptions.ConnectionError)
+        for result in results)
+
+def test_session_batches_single_quotes(server):
+    def quotes(request):
+        return {'quotes': [
+            {'symbolId': int(id), 'lastTradePrice': int(id) * 10}
+            for id in request.params['ids'].split(',') if id != '3'
+        ]}
+
+    server.route('GET', 'v1/markets/quotes', quotes)
+    session = server.session(quote_batch_window=0.1, rate_limiter=False)
+    try:
+        results = _concurrently(lambda i: session.get_quotes(id=i + 1), 4)
+    finally:
+        session.close()
+    assert len(server.requests) == 1
+    assert sorted(server.requests[0].params['ids'].split(',')) \
+        == ['1', '2', '3', '4']
+    assert results == [
+        {'quotes': [{'symbolId': 1, 'lastTradePrice': 10}]},
+        {'quotes': [{'symbolId': 2, 'lastTradePrice': 20}]},
+        {'quotes': []},
+        {'quotes': [{'symbolId': 4, 'lastTradePrice': 40}]},
+    ]
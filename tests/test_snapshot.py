@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from questradeapi import AccountSnapshot
+from questradeapi.snapshot import Balance, Delta
+
+BALANCE = {'currency': 'CAD', 'cash': 100, 'marketValue': 0,
+    'totalEquity': 100, 'buyingPower': 100}
+
+def test_closed_order_reports_final_state(server):
+    open_orders = [
+        {'id': 5, 'state': 'Accepted'}, {'id': 6, 'state': 'Accepted'}]
+
+    def orders(request):
+        if 'ids' in request.params:
+            assert request.params['ids'] == '5'
+            return {'orders': [{'id': 5, 'state': 'Executed'}]}
+        # Orders placed on earlier days, such as good-till-canceled ones, are
+        # requested too.
+        start = datetime.strptime(request.params['startTime'][:10], '%Y-%m-%d')
+        assert (datetime.now() - start).days >= 364
+        return {'orders': open_orders}
+
+    server.route('GET', 'v1/accounts/1/positions', {'positions': []})
+    server.route('GET', 'v1/accounts/1/balances',
+        {'perCurrencyBalances': [BALANCE]})
+    server.route('GET', 'v1/accounts/1/orders', orders)
+    session = server.session()
+    try:
+        snapshot = AccountSnapshot(session, ['1'])
+        assert set(snapshot.refresh()) == {
+            Delta('1', 'balance', 'CAD', None, Balance(100, 0, 100, 100)),
+            Delta('1', 'order', 5, None, 'Accepted'),
+            Delta('1', 'order', 6, None, 'Accepted'),
+        }
+        assert snapshot.refresh() == []
+        open_orders = [{'id': 6, 'state': 'Accepted'}]
+        assert snapshot.refresh() == [
+            Delta('1', 'order', 5, 'Accepted', 'Executed')]
+        assert snapshot.orders == {'1': {6: 'Accepted'}}
+    finally:
+        session.close()
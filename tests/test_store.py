@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from questradeapi import CandleStore
+
+START = datetime(2018, 6, 1)
+HOUR = timedelta(hours=1)
+
+def _candle(start):
+    price = 100 + start.hour
+    return {
+        'start': start.isoformat() + '.000000+00:00',
+        'end': (start + HOUR).isoformat() + '.000000+00:00',
+        'low': price - 1, 'high': price + 1, 'open': price,
+        'close': price + 0.5, 'volume': 1000, 'VWAP': price
+    }
+
+def _candles(start, end):
+    candles = []
+    while start < end:
+        candles.append(_candle(start))
+        start += HOUR
+    return candles
+
+class FakeSession():
+    ''' Session returning hourly candlesticks, recording the ranges requested.'''
+
+    def __init__(self):
+        self.ranges = []
+
+    def get_candles_range(self, symbol_id, start_time, end_time, interval):
+        self.ranges.append((symbol_id, start_time, end_time, interval))
+        return iter(_candles(start_time, end_time))
+
+@pytest.fixture
+def store(tmp_path):
+    store = CandleStore(FakeSession(), str(tmp_path / 'candles.db'))
+    yield store
+    store.close()
+
+def test_insert_and_query_range(store):
+    assert store.insert(8, 'OneHour', _candles(START, START + 10 * HOUR)) == 10
+    candles = store.query(8, 'OneHour', START + 2 * HOUR, START + 4 * HOUR)
+    assert candles == _candles(START + 2 * HOUR, START + 5 * HOUR)
+    assert len(store.query(8, 'OneHour')) == 10
+    assert store.query(8, 'OneDay') == []
+    assert store.query(9, 'OneHour') == []
+    assert store.last(8, 'OneHour') == START + 9 * HOUR
+
+def test_overlapping_insert_does_not_duplicate(store):
+    store.insert(8, 'OneHour', _candles(START, START + 10 * HOUR))
+    updated = _candles(START + 5 * HOUR, START + 15 * HOUR)
+    updated[0]['close'] = 0
+    store.insert(8, 'OneHour', updated)
+    candles = store.query(8, 'OneHour')
+    assert [candle['start'] for candle in candles] == \
+        [candle['start'] for candle in _candles(START, START + 15 * HOUR)]
+    assert candles[5]['close'] == 0
+
+def test_sync_fetches_only_missing_range(store):
+    end = START + 10 * HOUR
+    assert store.sync([8], 'OneHour', START, end) == {8: 10}
+    later = end + 5 * HOUR
+    # The last stored candlestick is fetched again with the missing ones.
+    assert store.sync([8], 'OneHour', START, later) == {8: 6}
+    assert store.session.ranges == [
+        (8, START, end, 'OneHour'),
+        (8, end - HOUR, later, 'OneHour'),
+    ]
+    assert len(store.query(8, 'OneHour')) == 15
+
+def test_sync_in_batches(store):
+    counts = store.sync([8, 9], 'OneHour', START, START + 10 * HOUR,
+        batch_size=3)
+    assert counts == {8: 10, 9: 10}
+    assert len(store.query(9, 'OneHour')) == 10
+
+def test_sync_requires_start_time_without_stored_candles(store):
+    with pytest.raises(ValueError):
+        store.sync([8], 'OneHour', end_time=START)
+    assert store.session.ranges == []
+
+def test_reopen_existing_file(tmp_path):
+    path = str(tmp_path / 'candles.db')
+    store = CandleStore(FakeSession(), path)
+    store.sync([8], 'OneHour', START, START + 10 * HOUR)
+    store.close()
+    store = CandleStore(FakeSession(), path)
+    try:
+        assert store.query(8, 'OneHour') == _candles(START, START + 10 * HOUR)
+        store.sync([8], 'OneHour', end_time=START + 12 * HOUR)
+        assert store.session.ranges == [
+            (8, START + 9 * HOUR, START + 12 * HOUR, 'OneHour')]
+    finally:
+        store.close()
@@ -0,0 +1,155 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from questradeapi import QuestradeAPIError
+from questradeapi.stream import OrderEvent, OrderEventStream, QuoteStream
+
+from conftest import run
+
+websockets = pytest.importorskip('websockets')
+
+ACCEPTED = {'id': 1, 'state': 'Accepted', 'filledQuantity': 0}
+EXECUTED = {'id': 1, 'state': 'Executed', 'filledQuantity': 10}
+CANCELED = {'id': 2, 'state': 'Canceled', 'filledQuantity': 0}
+
+def test_order_filled_while_disconnected(server):
+    polled_ids = []
+    seed_starts = []
+
+    def orders(request):
+        if 'ids' in request.params:
+            polled_ids.append(request.params['ids'])
+            return {'orders': [EXECUTED]}
+        if request.params['stateFilter'] == 'Open':
+            seed_starts.append(request.params['startTime'])
+            return {'orders': [ACCEPTED]}
+        # No order was created while disconnected.
+        return {'orders': []}
+
+    server.route('GET', 'v1/accounts/123/orders', orders)
+    server.route('GET', 'v1/accounts/123/executions', {'executions': []})
+    connections = []
+
+    async def handler(websocket, *args):
+        await websocket.recv()
+        await websocket.send(json.dumps({'success': True}))
+        connections.append(websocket)
+        if len(connections) == 1:
+            # The first connection drops before order 1 is filled.
+            return
+        await websocket.send(json.dumps(
+            {'accountNumber': 123, 'orders': [CANCELED]}))
+        await websocket.wait_closed()
+
+    session = server.session()
+
+    async def main():
+        async with websockets.serve(handler, '127.0.0.1', 0) as ws_server:
+            port = ws_server.sockets[0].getsockname()[1]
+            server.route('GET', 'v1/notifications', {'streamPort': port})
+            stream = OrderEventStream(session, ['123'], reconnect_delay=0.01)
+            events = []
+            async for event in stream:
+                events.append(event)
+                if len(events) == 2:
+                    break
+            await stream.close()
+            return events
+
+    try:
+        events = run(asyncio.wait_for(main(), 10))
+    finally:
+        session.close()
+    assert polled_ids == ['1']
+    # Orders placed on earlier days, such as good-till-canceled ones, are
+    # seeded too.
+    start = datetime.strptime(seed_starts[0][:10], '%Y-%m-%d')
+    assert (datetime.now() - start).days >= 364
+    assert events == [
+        OrderEvent('123', EXECUTED, ACCEPTED),
+        OrderEvent('123', CANCELED, None),
+    ]
+
+def _quote(symbol_id, price):
+    return {'symbol': 'SYM{}'.format(symbol_id), 'symbolId': symbol_id,
+        'lastTradePrice': price}
+
+def test_quote_stream_parse():
+    stream = QuoteStream(None, [8049])
+    quotes = [_quote(8049, 1.5), _quote(9291, 2.5)]
+    assert stream._parse({'quotes': quotes}) == quotes
+    # Heartbeats carry no quotes.
+    assert stream._parse({}) == []
+
+def test_quote_stream_reconnects(server):
+    port_params = []
+    tokens = []
+
+    async def handler(websocket, *args):
+        tokens.append(await websocket.recv())
+        if len(tokens) == 1:
+            # The first access token is rejected and gets refreshed.
+            await websocket.send(json.dumps({'success': False}))
+            return
+        await websocket.send(json.dumps({'success': True}))
+        await websocket.send(json.dumps(
+            {'quotes': [_quote(8049, len(tokens))]}))
+        if len(tokens) == 2:
+            # The second connection drops after a quote.
+            return
+        await websocket.send(json.dumps({}))
+        await websocket.send(json.dumps(
+            {'quotes': [_quote(9291, 4), _quote(8049, 5)]}))
+        await websocket.wait_closed()
+
+    session = server.session()
+
+    async def main():
+        async with websockets.serve(handler, '127.0.0.1', 0) as ws_server:
+            port = ws_server.sockets[0].getsockname()[1]
+
+            def stream_port(request):
+                port_params.append(request.params)
+                return {'streamPort': port}
+
+            server.route('GET', 'v1/markets/quotes', stream_port)
+            stream = QuoteStream(session, [8049, 9291], reconnect_delay=0.01)
+            received = []
+            stream.subscribe(received.append)
+            quotes = []
+            async for quote in stream:
+                quotes.append(quote)
+                if len(quotes) == 4:
+                    break
+            await stream.close()
+            return quotes, received
+
+    try:
+        quotes, received = run(asyncio.wait_for(main(), 10))
+    finally:
+        session.close()
+    assert quotes == received == [
+        _quote(8049, 2), _quote(8049, 3), _quote(9291, 4), _quote(8049, 5)]
+    assert port_params == 3 * [
+        {'ids': '8049,9291', 'stream': 'true', 'mode': 'WebSocket'}]
+    assert server.redeems == 2
+    assert tokens[0] != tokens[1] == tokens[2]
+
+def test_quote_stream_refused(server):
+    refused = {'code': 1017, 'message': 'Access token is invalid.'}
+    server.route('GET', 'v1/markets/quotes', (400, refused, {}))
+    session = server.session()
+
+    async def main():
+        stream = QuoteStream(session, [8049], reconnect_delay=0.01)
+        with pytest.raises(QuestradeAPIError):
+            async for _ in stream:
+                pass
+
+    try:
+        run(asyncio.wait_for(main(), 10))
+    finally:
+        session.close()